@@ -0,0 +1,313 @@
+"""
+Offline backtest of copy trading: would copying the wallets Brain picks
+have made money, given the Copier's detection delay?
+
+Every buy by a copied wallet is mirrored 'delay' seconds later at the
+token's last traded price, and closed 'delay' seconds after the wallet's
+next sell of that token (copies still open at the end are marked to the
+last price). Slippage is charged on both sides. Everything is computed
+with merge_asof/groupby over the whole trade set, so thousands of wallets
+take seconds.
+
+Wallets are scored on the trades before a split point and copied only
+after it, so scores never see the trades they are judged on.
+
+    python backtest.py --wallets 2000 --delays 0,60,300,900 --thresholds 0,50,70
+    python backtest.py --wallet-file wallets.txt   # real BitQuery history
+    python backtest.py --store trade_history       # trades already fetched
+"""
+
+import argparse
+import json
+import sys
+import pandas as pd
+import config
+from scoring import WalletAggregates, score_metrics, trades_to_legs
+
+SUMMARY_COLUMNS = [
+    "copies",
+    "closed",
+    "hit_rate",
+    "pnl",
+    "realized_pnl",
+    "max_drawdown",
+]
+
+
+def token_prices(legs):
+    """
+    Observed prices (USD per token) from every leg with a size, by time.
+    """
+    priced = legs[(legs["qty"] > 0) & (legs["usd"] > 0)]
+    prices = pd.DataFrame(
+        {
+            "token": priced["token"],
+            "price_time": priced["time"],
+            "price": priced["usd"] / priced["qty"],
+        }
+    )
+    return prices.dropna().sort_values("price_time", kind="stable")
+
+
+def _price_at(frame, time_column, prices, name):
+    # Last observed price of the row's token at or before frame[time_column]
+    frame = frame.sort_values(time_column, kind="stable")
+    merged = pd.merge_asof(
+        frame,
+        prices,
+        left_on=time_column,
+        right_on="price_time",
+        by="token",
+        direction="backward",
+    )
+    return merged.drop(columns="price_time").rename(columns={"price": name})
+
+
+def simulate_copies(
+    legs,
+    delay=0,
+    slippage=None,
+    position_usd=None,
+    wallets=None,
+    start=None,
+    end=None,
+    prices=None,
+):
+    """
+    Mirrors every buy leg of 'wallets' (default: all) made at or after
+    'start'. Returns one row per copy: wallet, token, entry/exit time and
+    price, closed, return and pnl (USD, for a 'position_usd' copy).
+    """
+    slippage = config.BACKTEST_SLIPPAGE if slippage is None else slippage
+    position_usd = position_usd or config.BACKTEST_POSITION_USD
+    prices = token_prices(legs) if prices is None else prices
+    end = end if end is not None else legs["time"].max()
+    delay = pd.Timedelta(seconds=delay)
+
+    buys = legs[legs["side"] == "buy"]
+    if wallets is not None:
+        buys = buys[buys["wallet"].isin({w.lower() for w in wallets})]
+    if start is not None:
+        buys = buys[buys["time"] >= start]
+    buys = buys[["wallet", "token", "time"]].dropna().sort_values("time")
+
+    sells = legs[legs["side"] == "sell"][["wallet", "token", "time"]].dropna()
+    sells = sells.rename(columns={"time": "sell_time"}).sort_values("sell_time")
+
+    # The wallet's next sell of the same token closes the copy
+    copies = pd.merge_asof(
+        buys,
+        sells,
+        left_on="time",
+        right_on="sell_time",
+        by=["wallet", "token"],
+        direction="forward",
+    )
+    copies["entry_time"] = copies["time"] + delay
+    copies["closed"] = copies["sell_time"].notna() & (
+        copies["sell_time"] + delay <= end
+    )
+    copies["exit_time"] = (copies["sell_time"] + delay).where(copies["closed"], end)
+
+    copies = _price_at(copies, "entry_time", prices, "entry_price")
+    copies = _price_at(copies, "exit_time", prices, "exit_price")
+    copies = copies.dropna(subset=["entry_price", "exit_price"])
+
+    copies["return"] = (copies["exit_price"] * (1 - slippage)) / (
+        copies["entry_price"] * (1 + slippage)
+    ) - 1
+    copies["pnl"] = position_usd * copies["return"]
+    return copies[
+        [
+            "wallet",
+            "token",
+            "entry_time",
+            "entry_price",
+            "exit_time",
+            "exit_price",
+            "closed",
+            "return",
+            "pnl",
+        ]
+    ].reset_index(drop=True)
+
+
+def summarize(copies, by="wallet"):
+    """
+    Per-group copy results: copies, closed, hit_rate (share of closed copies
+    that made money), pnl (incl. open copies at the last price),
+    realized_pnl and max_drawdown (largest fall of cumulative pnl from its
+    running peak, in exit order). by=None summarizes the whole portfolio.
+    """
+    copies = copies.sort_values("exit_time", kind="stable")
+    keys = copies[by] if by else pd.Series(0, index=copies.index)
+
+    cumulative = copies["pnl"].groupby(keys).cumsum()
+    # Equity starts at 0, so a first losing copy is a drawdown too
+    peak = cumulative.groupby(keys).cummax().clip(lower=0.0)
+    drawdown = peak - cumulative
+
+    closed = copies["closed"]
+    summary = pd.DataFrame(
+        {
+            "copies": copies["pnl"].groupby(keys).size(),
+            "closed": closed.groupby(keys).sum(),
+            "wins": (closed & (copies["return"] > 0)).groupby(keys).sum(),
+            "pnl": copies["pnl"].groupby(keys).sum(),
+            "realized_pnl": copies["pnl"].where(closed, 0.0).groupby(keys).sum(),
+            "max_drawdown": drawdown.groupby(keys).max(),
+        }
+    )
+    summary["hit_rate"] = (
+        summary["wins"] / summary["closed"].where(summary["closed"] > 0)
+    ).fillna(0.0)
+    return summary[SUMMARY_COLUMNS]
+
+
+def score_as_of(legs, at):
+    """
+    Brain's 0-100 score per wallet using only legs before 'at'.
+    """
+    aggregates = WalletAggregates()
+    aggregates.apply(legs[legs["time"] < at])
+    return score_metrics(aggregates.metrics(now=at))
+
+
+def sweep(legs, delays, thresholds, split=0.5, slippage=None, position_usd=None):
+    """
+    Portfolio results for every (delay, score threshold) pair.
+
+    Wallets are scored on the first 'split' share of the history's time
+    span and copied during the rest. A threshold copies every wallet
+    scoring at or above it. Returns one row per pair.
+    """
+    start, end = legs["time"].min(), legs["time"].max()
+    at = start + (end - start) * split
+    scores = score_as_of(legs, at)
+    prices = token_prices(legs)
+
+    rows = []
+    for delay in delays:
+        copies = simulate_copies(
+            legs,
+            delay=delay,
+            slippage=slippage,
+            position_usd=position_usd,
+            wallets=scores.index,
+            start=at,
+            end=end,
+            prices=prices,
+        )
+        copies["score"] = copies["wallet"].map(scores)
+        for threshold in thresholds:
+            selected = copies[copies["score"] >= threshold]
+            if selected.empty:
+                result = dict.fromkeys(SUMMARY_COLUMNS, 0.0)
+            else:
+                result = summarize(selected, by=None).iloc[0].to_dict()
+            rows.append(
+                {
+                    "delay": delay,
+                    "threshold": threshold,
+                    "wallets": int((scores >= threshold).sum()),
+                    **result,
+                }
+            )
+
+    results = pd.DataFrame(rows)
+    results[["copies", "closed"]] = results[["copies", "closed"]].astype(int)
+    return results
+
+
+def _fake_legs(tokens, wallets, seed):
+    from brain import Brain
+    from cache import ResponseCache
+    from fake_server import FakeMarket, FakeServer
+    from request_scheduler import RequestScheduler
+
+    market = FakeMarket(tokens=tokens, wallets=wallets, seed=seed)
+    with FakeServer(market) as server:
+        # No TTLs, so nothing from the fake market reaches a cache
+        brain = Brain(scheduler=RequestScheduler(), cache=ResponseCache(":memory:"))
+        brain.url = server.bitquery_url
+        trades = brain.get_trade_history(
+            market.wallets,
+            batch_size=config.SCORE_BATCH_SIZE,
+            limit_per_wallet=config.SCORE_HISTORY_PER_WALLET,
+        )
+    return trades_to_legs(trades)
+
+
+def _bitquery_legs(path, chain):
+    from brain import Brain
+
+    with open(path, "r") as f:
+        wallets = [line.strip() for line in f if line.strip()]
+    trades = Brain(chain=chain).get_trade_history(
+        wallets,
+        batch_size=config.SCORE_BATCH_SIZE,
+        limit_per_wallet=config.SCORE_HISTORY_PER_WALLET,
+    )
+    return trades_to_legs(trades)
+
+
+def _stored_legs(path, chain):
+    from trade_store import TradeStore
+
+    return TradeStore(path).read(chain)
+
+
+def _numbers(text):
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy-trading backtest")
+    parser.add_argument("--wallet-file", help="one address per line; uses BitQuery")
+    parser.add_argument("--store", help="trade history directory (see trade_store)")
+    parser.add_argument(
+        "--chain", default=config.TARGET_CHAIN, help="chain of --wallet-file or --store"
+    )
+    parser.add_argument("--wallets", type=int, default=1000, help="fake market size")
+    parser.add_argument("--tokens", type=int, default=20, help="fake market size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--delays",
+        default=",".join(str(d) for d in config.BACKTEST_DELAYS),
+        help="copy delays in seconds, e.g. a polling interval",
+    )
+    parser.add_argument("--thresholds", default="0,50,70,85")
+    parser.add_argument("--split", type=float, default=0.5)
+    parser.add_argument("--slippage", type=float, default=config.BACKTEST_SLIPPAGE)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.store:
+        legs = _stored_legs(args.store, args.chain)
+    elif args.wallet_file:
+        legs = _bitquery_legs(args.wallet_file, args.chain)
+    else:
+        legs = _fake_legs(args.tokens, args.wallets, args.seed)
+    if legs.empty:
+        print("No trades to backtest.")
+        return 1
+
+    results = sweep(
+        legs,
+        delays=_numbers(args.delays),
+        thresholds=_numbers(args.thresholds),
+        split=args.split,
+        slippage=args.slippage,
+    )
+
+    print(f"=== Backtest ({legs['wallet'].nunique()} wallets, {len(legs)} legs) ===")
+    print(results.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results.to_dict(orient="records"), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
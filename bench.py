@@ -0,0 +1,268 @@
+"""
+End-to-end benchmark of Scout -> Brain -> Copier against fake_server.py.
+
+Reports throughput (wallets scored/sec, wallets polled/sec), signal
+detection latency for polling and streaming, and request counts. A trade
+not detected within --detection-timeout seconds is counted as a miss, and
+any miss makes the run exit non-zero. With --baseline, it also exits
+non-zero if any metric regressed beyond --tolerance.
+
+    python bench.py --wallets 2000 --latency 0.05 --json bench.json
+    python bench.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import config
+from brain import Brain
+from cache import ResponseCache
+from copier import Copier
+from fake_server import FakeMarket, FakeServer
+from request_scheduler import RequestScheduler
+from scout import Scout
+from signal_store import SignalStore
+
+# Metric name suffixes and whether a larger value is better
+HIGHER_IS_BETTER = ("_per_sec",)
+LOWER_IS_BETTER = ("_seconds", "_requests", "_misses")
+# Seconds a detection phase waits for its injected trades
+DETECTION_TIMEOUT = 30.0
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    # Pipeline stages print per-item progress; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(
+    tokens=20,
+    wallets=500,
+    latency=0.0,
+    rate_limit=None,
+    buyers_per_token=50,
+    detections=20,
+    detection_timeout=DETECTION_TIMEOUT,
+):
+    """
+    Runs every stage once against a fresh fake market and returns a flat
+    dict of metrics. Detection latencies are None if every trade was missed.
+    """
+    results = {}
+    client_requests = []
+    market = FakeMarket(tokens=tokens, wallets=wallets)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeServer(
+        market, latency=latency, rate_limit=rate_limit
+    ) as server:
+        cache = ResponseCache(os.path.join(tmp, "cache.db"), ttls=config.CACHE_TTLS)
+        # Measure the pipeline, not the production request budget
+        scout = Scout(scheduler=RequestScheduler(), cache=cache)
+        scout.base_url = server.gecko_url
+        brain = Brain(scheduler=RequestScheduler(), cache=cache)
+        brain.url = server.bitquery_url
+        copier = Copier(
+            brain=brain,
+            signals=SignalStore(os.path.join(tmp, "signals.db"), legacy_path=None),
+        )
+
+        def count_request(endpoint, method, url, status, elapsed, attempt, error):
+            client_requests.append((endpoint, status, elapsed))
+
+        brain.http.add_hook(count_request)
+        try:
+            # Phase 1: discovery
+            found, elapsed = _timed(scout.get_trending_tokens, limit=tokens)
+            results["scout_seconds"] = elapsed
+            results["scout_tokens"] = len(found)
+
+            # Phase 2: early buyers (concurrent)
+            def discover():
+                first, candidates = None, set()
+                start = time.perf_counter()
+                for _, buyers in brain.iter_early_buyers(
+                    found,
+                    limit=buyers_per_token,
+                    max_workers=config.DISCOVERY_CONCURRENCY,
+                ):
+                    first = first or time.perf_counter() - start
+                    candidates.update(buyers)
+                return first, sorted(candidates)
+
+            (first, candidates), elapsed = _timed(discover)
+            results["discovery_seconds"] = elapsed
+            results["discovery_first_result_seconds"] = first or 0.0
+            results["candidate_wallets"] = len(candidates)
+
+            # Phase 3: scoring
+            ranked, elapsed = _timed(brain.score_wallets, candidates)
+            results["scoring_seconds"] = elapsed
+            results["wallets_scored_per_sec"] = len(candidates) / max(elapsed, 1e-9)
+            results["wallets_above_threshold"] = len(ranked)
+
+            # Phase 4: one polling pass over every candidate
+            _quiet(copier.update_watchlist, candidates)
+            _, elapsed = _timed(copier._scan_and_log)
+            results["polling_seconds"] = elapsed
+            results["wallets_polled_per_sec"] = len(candidates) / max(elapsed, 1e-9)
+
+            # Phase 5: detection latency, polling back to back
+            targets = candidates[:detections]
+            lags = _poll_detection(server, copier, targets, detection_timeout)
+            results.update(_detection_results("poll", lags, len(targets)))
+
+            # Phase 6: detection latency over the trade stream
+            lags = _stream_detection(server, copier, targets, detection_timeout)
+            results.update(_detection_results("stream", lags, len(targets)))
+        finally:
+            brain.http.hooks.remove(count_request)
+            copier.signals.close()
+
+        results["client_requests"] = len(client_requests)
+        results["client_retries"] = sum(1 for r in client_requests if r[1] == 429)
+        results["server_requests"] = dict(server.requests)
+        results["cache"] = cache.stats()
+
+    return results
+
+
+def _detection_results(mode, lags, expected):
+    return {
+        f"{mode}_detection_p50_seconds": statistics.median(lags) if lags else None,
+        f"{mode}_detection_max_seconds": max(lags) if lags else None,
+        f"{mode}_detection_misses": expected - len(lags),
+    }
+
+
+def _poll_detection(server, copier, wallets, timeout=DETECTION_TIMEOUT):
+    # Returns the lags of the trades detected within 'timeout'
+    injected = {w: (server.inject_trade(w), time.perf_counter()) for w in wallets}
+    deadline = time.perf_counter() + timeout
+    lags = {}
+    while len(lags) < len(wallets) and time.perf_counter() < deadline:
+        with contextlib.redirect_stdout(io.StringIO()):
+            copier._scan_and_log(wallets)
+        for wallet, (trade, at) in injected.items():
+            if wallet not in lags and copier.signals.contains(
+                trade["transaction"]["hash"]
+            ):
+                lags[wallet] = time.perf_counter() - at
+    return list(lags.values())
+
+
+def _stream_detection(server, copier, wallets, timeout=DETECTION_TIMEOUT):
+    # Returns the lags of the trades detected within 'timeout'
+    deadline = time.perf_counter() + timeout
+    copier.is_running = True
+    reader = threading.Thread(
+        target=lambda: _quiet(copier.start_streaming, server.stream_url),
+        daemon=True,
+    )
+    reader.start()
+    # Give the subscription a moment to register with the server
+    while not server._subscribers and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    lags = []
+    for wallet in wallets:
+        if not server._subscribers:
+            break
+        trade = server.inject_trade(wallet)
+        at = time.perf_counter()
+        while not copier.signals.contains(trade["transaction"]["hash"]):
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(0.001)
+        else:
+            lags.append(time.perf_counter() - at)
+
+    # The reader notices at its next keep-alive; joining also restores stdout
+    copier.is_running = False
+    reader.join(timeout=5)
+    return lags
+
+
+def _quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of human-readable regressions against 'baseline'.
+    """
+    regressions = []
+    for name, old in baseline.items():
+        new = results.get(name)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            continue
+        if name.endswith(HIGHER_IS_BETTER) and new < old * (1 - tolerance):
+            regressions.append(f"{name}: {new:.3f} < {old:.3f}")
+        elif name.endswith(LOWER_IS_BETTER) and new > old * (1 + tolerance):
+            regressions.append(f"{name}: {new:.3f} > {old:.3f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline benchmark")
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--wallets", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--rate-limit", type=float, default=None, help="req/sec")
+    parser.add_argument("--detections", type=int, default=20)
+    parser.add_argument(
+        "--detection-timeout", type=float, default=DETECTION_TIMEOUT, help="seconds"
+    )
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        tokens=args.tokens,
+        wallets=args.wallets,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        detections=args.detections,
+        detection_timeout=args.detection_timeout,
+    )
+
+    print("=== Benchmark ===")
+    for name, value in results.items():
+        if isinstance(value, float):
+            print(f"{name:34} {value:12.3f}")
+        else:
+            print(f"{name:34} {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    misses = results["poll_detection_misses"] + results["stream_detection_misses"]
+    if misses:
+        print(f"\n{misses} injected trades were not detected in time.")
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,173 @@
-import requests
 import config
+from cache import get_cache
+from metrics import get_metrics
+from profile_store import PROFILE_FIELDS
+from request_scheduler import get_request_scheduler
+from scoring import WalletAggregates, score_metrics, trades_to_legs
+from transport import get_transport
 import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def trade_time_iso(trade):
+    """
+    Returns a trade's block time as ISO8601 ("2024-01-01T12:00:00Z"),
+    the format BitQuery expects in time filters.
+    """
+    raw = (trade.get("block") or {}).get("timestamp", {}).get("time") or ""
+    return raw.replace(" ", "T") + "Z" if raw and not raw.endswith("Z") else raw
 
 
 class Brain:
-    def __init__(self):
-        self.url = "https://graphql.bitquery.io"
+    def __init__(
+        self, chain=None, profiles=None, trade_store=None, scheduler=None, cache=None
+    ):
+        # Queries are written against a "{root}" placeholder that is filled
+        # with the chain's BitQuery root field, e.g. "ethereum(network: base)"
+        self.chain = chain or config.TARGET_CHAIN
+        self.root = config.CHAINS[self.chain]["bitquery"]
+        self.root_field = self.root.split("(")[0]
+        self.url = config.BITQUERY_URL
         self.headers = {
             "X-API-KEY": config.BITQUERY_API_KEY,
             "Content-Type": "application/json",
         }
+        self.http = get_transport()
+        # The shared scheduler and cache are only opened on first request
+        self._scheduler = scheduler
+        self._cache = cache
+        # Running per-wallet totals, so rescoring only needs new trades
+        self.aggregates = WalletAggregates()
+        # Optional ProfileStore; profiles fresher than PROFILE_MAX_AGE are
+        # reused instead of rescored
+        self.profiles = profiles
+        # Optional TradeStore; fetched legs are appended to it, and wallets
+        # this process has not seen yet start from their stored history
+        self.trade_store = trade_store
+        # Lowercase wallets already looked up in the trade store
+        self._stored_loaded = set()
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            self._scheduler = get_request_scheduler()
+        return self._scheduler
+
+    @scheduler.setter
+    def scheduler(self, scheduler):
+        self._scheduler = scheduler
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_cache()
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+
+    def _post_query(
+        self, query, variables, cache_kind=None, name="query", cacheable=None
+    ):
+        """
+        Sends a GraphQL query and returns the decoded JSON body.
+        With 'cache_kind', successful responses are served from and stored in
+        the response cache under that kind's TTL; error responses never are,
+        nor are responses for which 'cacheable(data)' is false.
+        'name' labels the query in metrics (queries and rows returned, which
+        is what BitQuery's point cost scales with).
+        """
+        query = query.replace("{root}", self.root)
+        raw = {}
+
+        def fetch():
+            # The BitQuery points budget, shared across processes; deferred
+            # behind higher-priority lanes when it is tight
+            self.scheduler.acquire(
+                "bitquery",
+                self.scheduler.estimate_cost("bitquery", variables),
+                lane=config.QUERY_LANES.get(name, "discovery"),
+            )
+            raw["data"] = self.http.post(
+                self.url,
+                endpoint="bitquery",
+                json={"query": query, "variables": variables},
+                headers=self.headers,
+            ).json()
+            metrics = get_metrics()
+            metrics.inc("bitquery_queries_total", query=name, chain=self.chain)
+            if "errors" in raw["data"]:
+                metrics.inc("bitquery_errors_total", query=name, chain=self.chain)
+                return None
+            metrics.inc(
+                "bitquery_rows_total",
+                len(self._dex_trades(raw["data"]) or []),
+                query=name,
+                chain=self.chain,
+            )
+            if cacheable is not None and not cacheable(raw["data"]):
+                return None
+            return raw["data"]
+
+        if cache_kind is None:
+            fetch()
+            return raw["data"]
+
+        request = {"url": self.url, "query": query, "variables": variables}
+        data = self.cache.get_or_fetch(cache_kind, request, fetch)
+        return data if data is not None else raw.get("data")
+
+    def _dex_trades(self, data):
+        return data.get("data", {}).get(self.root_field, {}).get("dexTrades", [])
 
-    def find_early_buyers(self, token_address, limit=50):
+    def find_early_buyers(self, token_address, limit=50, window_seconds=None):
         """
-        Queries BitQuery for the first 'limit' buyers of a token.
+        Returns the first 'limit' unique buyers of a token, earliest first.
+        """
+        return [
+            buyer["address"]
+            for buyer in self.find_early_buyer_entries(
+                token_address, limit=limit, window_seconds=window_seconds
+            )
+        ]
+
+    def find_early_buyer_entries(self, token_address, limit=50, window_seconds=None):
+        """
+        Like find_early_buyers, but returns iter_token_buyers' dicts
+        (address, first-buy time and amount) instead of bare addresses.
+        """
+        with get_metrics().timer(
+            "pipeline_phase_seconds", phase="early_buyers", chain=self.chain
+        ):
+            return list(
+                self.iter_token_buyers(
+                    token_address, max_buyers=limit, window_seconds=window_seconds
+                )
+            )
+
+    def iter_token_buyers(
+        self, token_address, max_buyers=50, window_seconds=None, page_size=None
+    ):
+        """
+        Pages through a token's buys in time order and yields each unique
+        buyer as soon as its page arrives:
+
+            {"address", "first_buy_at", "first_buy_amount",
+             "first_buy_usd", "tx_hash"}
+
+        Stops after 'max_buyers' buyers, or once buys are more than
+        'window_seconds' after the first one (launch). Only the set of seen
+        addresses is kept, so memory does not grow with the trade count.
         """
         query = """
-        query ($token: String!, $limit: Int!) {
-          ethereum(network: ethereum) {
+        query ($token: String!, $limit: Int!, $offset: Int!,
+               $since: ISO8601DateTime, $till: ISO8601DateTime) {
+          {root} {
             dexTrades(
-              options: {limit: $limit, asc: "block.timestamp.time"}
+              options: {limit: $limit, offset: $offset, asc: "block.timestamp.time"}
               buyCurrency: {is: $token}
+              time: {since: $since, till: $till}
             ) {
               transaction {
                 hash
@@ -34,33 +181,105 @@ class Brain:
                 }
               }
               buyAmount
+              buyAmountInUsd: buyAmount(in: USD)
             }
           }
         }
         """
+        page_size = page_size or config.EARLY_BUYERS_PAGE_SIZE
+        seen = set()
+        # Keyset cursor: the last block time reached plus how many trades at
+        # exactly that time were already read, so deep pages stay cheap
+        since, offset, till = None, 0, None
 
-        variables = {"token": token_address, "limit": limit}
+        while len(seen) < max_buyers:
+            variables = {
+                "token": token_address,
+                "limit": page_size,
+                "offset": offset,
+                "since": since,
+                "till": till,
+            }
 
-        try:
-            response = requests.post(
-                self.url,
-                json={"query": query, "variables": variables},
-                headers=self.headers,
-            )
-            data = response.json()
+            # Pages are cached with no expiry, so only ones that can no longer
+            # change: full pages, or any page once the window has closed. A
+            # short page of a live token would hide its later buyers for good.
+            def final(data, till=till):
+                if len(self._dex_trades(data)) >= page_size:
+                    return True
+                now = datetime.datetime.now(datetime.timezone.utc)
+                return till is not None and till < now.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-            if "errors" in data:
-                print(f"BitQuery Error: {data['errors']}")
-                return []
+            try:
+                data = self._post_query(
+                    query,
+                    variables,
+                    cache_kind="early_buyers",
+                    name="early_buyers",
+                    cacheable=final,
+                )
 
-            trades = data.get("data", {}).get("ethereum", {}).get("dexTrades", [])
-            # Use 'taker' as the wallet address
-            wallets = set([t["taker"]["address"] for t in trades if t.get("taker")])
-            return list(wallets)
+                if "errors" in data:
+                    print(f"BitQuery Error: {data['errors']}")
+                    return
 
-        except Exception as e:
-            print(f"Exception in find_early_buyers: {e}")
-            return []
+                trades = self._dex_trades(data)
+            except Exception as e:
+                print(f"Exception in iter_token_buyers: {e}")
+                return
+
+            if not trades:
+                return
+
+            if till is None and window_seconds is not None:
+                launch = datetime.datetime.fromisoformat(
+                    trade_time_iso(trades[0]).replace("Z", "+00:00")
+                )
+                till = (launch + datetime.timedelta(seconds=window_seconds)).strftime(
+                    "%Y-%m-%dT%H:%M:%SZ"
+                )
+
+            for trade in trades:
+                at = trade_time_iso(trade)
+                if till is not None and at > till:
+                    return
+                # Use 'taker' as the wallet address
+                address = (trade.get("taker") or {}).get("address")
+                if not address or address in seen:
+                    continue
+                seen.add(address)
+                yield {
+                    "address": address,
+                    "first_buy_at": at,
+                    "first_buy_amount": trade.get("buyAmount"),
+                    "first_buy_usd": trade.get("buyAmountInUsd"),
+                    "tx_hash": (trade.get("transaction") or {}).get("hash"),
+                }
+                if len(seen) >= max_buyers:
+                    return
+
+            if len(trades) < page_size:
+                return
+
+            last = trade_time_iso(trades[-1])
+            tied = sum(1 for t in trades if trade_time_iso(t) == last)
+            offset = offset + tied if last == since else tied
+            since = last
+
+    def iter_early_buyers(self, tokens, limit=50, max_workers=4, details=False):
+        """
+        Runs find_early_buyers for many tokens on a bounded thread pool.
+        Yields (token, buyers) as each query finishes, fastest first, so
+        callers can start scoring before the slowest token returns.
+        With 'details', buyers are find_early_buyer_entries dicts.
+        """
+        find = self.find_early_buyer_entries if details else self.find_early_buyers
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(find, token["address"], limit): token for token in tokens
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
     def get_recent_trades(self, wallet_address, limit=5):
         """
@@ -68,7 +287,7 @@ class Brain:
         """
         query = """
         query ($wallet: String!, $limit: Int!) {
-          ethereum(network: ethereum) {
+          {root} {
             dexTrades(
               options: {limit: $limit, desc: "block.timestamp.time"}
               taker: {is: $wallet}
@@ -93,54 +312,299 @@ class Brain:
         variables = {"wallet": wallet_address, "limit": limit}
 
         try:
-            response = requests.post(
-                self.url,
-                json={"query": query, "variables": variables},
-                headers=self.headers,
-            )
-            data = response.json()
-            trades = data.get("data", {}).get("ethereum", {}).get("dexTrades", [])
+            data = self._post_query(query, variables, name="recent_trades")
+            trades = self._dex_trades(data)
             return trades
         except Exception as e:
             print(f"Exception in get_recent_trades: {e}")
             return []
 
-    def score_wallets(self, wallets):
+    def get_trades_for_wallets(self, cursors, batch_size=50, limit_per_wallet=10):
+        """
+        Fetches new trades for many wallets using batched taker queries.
+
+        'cursors' maps wallet address -> ISO8601 time; only trades at or after
+        each wallet's own cursor are returned. Wallets are queried in chunks of
+        'batch_size' (one request per chunk, pages of 'limit_per_wallet' per
+        wallet). A full page is followed by the next one, so every trade since
+        the cursors is returned and callers may advance them. Returns a dict of
+        wallet -> trades (oldest first); wallets whose chunk failed are omitted.
+        """
+        query = """
+        query ($wallets: [String!], $since: ISO8601DateTime, $limit: Int!,
+               $offset: Int!) {
+          {root} {
+            dexTrades(
+              options: {limit: $limit, offset: $offset, desc: "block.timestamp.time"}
+              taker: {in: $wallets}
+              time: {since: $since}
+            ) {
+              transaction {
+                hash
+              }
+              taker {
+                address
+              }
+              buyCurrency {
+                symbol
+                address
+              }
+              buyAmount
+              block {
+                height
+                timestamp {
+                  time
+                }
+              }
+            }
+          }
+        }
+        """
+        wallets = list(cursors)
+        results = {}
+
+        for i in range(0, len(wallets), batch_size):
+            chunk = wallets[i : i + batch_size]
+            variables = {
+                "wallets": [w.lower() for w in chunk],
+                "since": min(cursors[w] for w in chunk),
+                "limit": limit_per_wallet * len(chunk),
+                "offset": 0,
+            }
+
+            # Newest first: a full page means older trades since the cursors
+            # are still unread. Trades arriving meanwhile shift the offsets,
+            # which only repeats rows (deduped by tx_hash downstream).
+            trades = []
+            try:
+                while True:
+                    data = self._post_query(query, variables, name="wallet_trades")
+
+                    if "errors" in data:
+                        print(f"BitQuery Error: {data['errors']}")
+                        trades = None
+                        break
+
+                    page = self._dex_trades(data)
+                    trades.extend(page)
+                    if len(page) < variables["limit"]:
+                        break
+                    variables["offset"] += variables["limit"]
+            except Exception as e:
+                print(f"Exception in get_trades_for_wallets: {e}")
+                continue
+            if trades is None:
+                continue
+
+            # BitQuery returns lowercase addresses; map back to the caller's keys
+            by_taker = {w.lower(): w for w in chunk}
+            chunk_results = {w: [] for w in chunk}
+            for trade in reversed(trades):
+                taker = (trade.get("taker") or {}).get("address", "").lower()
+                wallet = by_taker.get(taker)
+                if wallet is None:
+                    continue
+                if trade_time_iso(trade) >= cursors[wallet]:
+                    chunk_results[wallet].append(trade)
+            results.update(chunk_results)
+
+        return results
+
+    def get_trade_history(
+        self, wallets, batch_size=25, limit_per_wallet=100, since_blocks=None
+    ):
+        """
+        Bulk-fetches recent trade history (both swap sides, USD valued) for
+        many wallets, one request per 'batch_size' wallets.
+
+        'since_blocks' maps wallet -> last block already seen; only trades in
+        later blocks are requested (the chunk uses its lowest cursor). Chunks
+        are paged oldest first, 'limit_per_wallet' trades per wallet a page,
+        until a short page, so a busy wallet never crowds out a quiet one and
+        every sell comes with the buys before it. A chunk that fails part way
+        contributes nothing. Returns a flat list of BitQuery dexTrades.
+        """
+        query = """
+        query ($wallets: [String!], $limit: Int!, $offset: Int!,
+               $since_block: Int!) {
+          {root} {
+            dexTrades(
+              options: {limit: $limit, offset: $offset, asc: "block.timestamp.time"}
+              taker: {in: $wallets}
+              height: {gt: $since_block}
+            ) {
+              transaction {
+                hash
+              }
+              taker {
+                address
+              }
+              buyCurrency {
+                symbol
+                address
+              }
+              sellCurrency {
+                symbol
+                address
+              }
+              buyAmount
+              sellAmount
+              buyAmountInUsd: buyAmount(in: USD)
+              sellAmountInUsd: sellAmount(in: USD)
+              block {
+                height
+                timestamp {
+                  time
+                }
+              }
+            }
+          }
+        }
+        """
+        since_blocks = since_blocks or {}
+        # Group wallets with similar cursors so one stale wallet does not
+        # widen the block range for the whole chunk
+        wallets = sorted(wallets, key=lambda w: since_blocks.get(w, 0))
+        trades = []
+
+        for i in range(0, len(wallets), batch_size):
+            chunk = wallets[i : i + batch_size]
+            variables = {
+                "wallets": [w.lower() for w in chunk],
+                "limit": limit_per_wallet * len(chunk),
+                "offset": 0,
+                "since_block": min(since_blocks.get(w, 0) for w in chunk),
+            }
+
+            chunk_trades = []
+            try:
+                while True:
+                    data = self._post_query(query, variables, name="trade_history")
+
+                    if "errors" in data:
+                        print(f"BitQuery Error: {data['errors']}")
+                        chunk_trades = []
+                        break
+
+                    page = self._dex_trades(data)
+                    chunk_trades.extend(page)
+                    if len(page) < variables["limit"]:
+                        break
+                    variables["offset"] += variables["limit"]
+            except Exception as e:
+                print(f"Exception in get_trade_history: {e}")
+                continue
+            trades.extend(chunk_trades)
+
+        return trades
+
+    def score_wallets(self, wallets, source_token=None):
         """
         Analyzes a list of wallets and returns the ones with high 'Win Rate' and 'ROI'.
-        For MVP, this is a mock implementation that simulates fetching history.
-        """
-        scored_wallets = []
-
-        print(f"Analyzing {len(wallets)} wallets...")
-
-        for wallet in wallets:
-            # TODO: In a real implementation, we would query BitQuery again
-            # to get the ENTIRE trade history of this wallet to calculate:
-            # 1. Total Trades
-            # 2. Profitable Trades
-            # 3. Total PnL
-
-            # Mocking score for testing
-            # (We give a fake score between 0 and 100)
-            mock_score = self._calculate_mock_score(wallet)
-
-            if mock_score > 70:
-                scored_wallets.append(
-                    {
-                        "address": wallet,
-                        "score": mock_score,
-                        "reason": "High Win Rate on recent pumps",
-                    }
-                )
 
-        return sorted(scored_wallets, key=lambda x: x["score"], reverse=True)
+        Each wallet's running aggregates (see scoring.WalletAggregates) are
+        kept on the Brain. Unknown wallets get a full history fetch; known
+        wallets only fetch trades after their last seen block. Only wallets
+        scoring above MIN_WALLET_SCORE are returned, best first.
+
+        With a profile store, wallets whose stored profile is younger than
+        PROFILE_MAX_AGE are not rescored; every rescored wallet is saved,
+        with 'source_token' added to its source tokens.
+        """
+        with get_metrics().timer(
+            "pipeline_phase_seconds", phase="scoring", chain=self.chain
+        ):
+            wallets = list(wallets)
+            print(f"Analyzing {len(wallets)} wallets...")
+            if not wallets:
+                return []
+
+            fresh = {}
+            if self.profiles is not None:
+                fresh = self.profiles.fresh(self.chain, wallets, config.PROFILE_MAX_AGE)
+            stale = [w for w in wallets if w.lower() not in fresh]
+
+            profiles = self._score_profiles(stale) if stale else []
+            if self.profiles is not None:
+                self.profiles.save(self.chain, profiles, source_token=source_token)
+                if fresh and source_token:
+                    self.profiles.add_source(self.chain, list(fresh), source_token)
+                # Report the caller's spelling for reused profiles too
+                for wallet in wallets:
+                    if wallet.lower() in fresh:
+                        profile = {f: fresh[wallet.lower()][f] for f in PROFILE_FIELDS}
+                        profiles.append({**profile, "address": wallet})
+
+            ranked = [p for p in profiles if p["score"] > config.MIN_WALLET_SCORE]
+            ranked.sort(key=lambda p: p["score"], reverse=True)
+            return ranked
+
+    def _score_profiles(self, wallets):
+        """
+        Refreshes and scores 'wallets'; returns one profile dict per wallet,
+        whatever its score (wallets without history score 0).
+        """
+        self.refresh_aggregates(wallets)
+        metrics = self.aggregates.metrics(wallets=[w.lower() for w in wallets])
+        metrics["score"] = score_metrics(metrics)
+
+        # Metrics are keyed by lowercase address; report the caller's spelling
+        metrics = metrics.reindex([w.lower() for w in wallets])
+        columns = ["score", "win_rate", "roi", "trades", "closed", "age_days"]
+        metrics[columns] = metrics[columns].fillna(0)
+        metrics["address"] = wallets
+
+        return [
+            {
+                "address": row.address,
+                "score": float(row.score),
+                "reason": (
+                    f"Win rate {row.win_rate:.0%}, ROI {row.roi:+.0%} "
+                    f"over {int(row.closed)} closed trades"
+                ),
+                "win_rate": float(row.win_rate),
+                "roi": float(row.roi),
+                "trades": int(row.trades),
+                "age_days": float(row.age_days),
+            }
+            for row in metrics.itertuples()
+        ]
+
+    def refresh_aggregates(self, wallets):
+        """
+        Applies trades newer than each wallet's last seen block to its
+        running aggregates. Returns the number of trade legs applied.
+        """
+        known = self.aggregates.cursors()
+        if self.trade_store is not None:
+            # Each wallet is looked up once, within TRADE_STORE_READ_DAYS;
+            # one with nothing stored is not scanned for again
+            unseen = [
+                w
+                for w in wallets
+                if w.lower() not in known and w.lower() not in self._stored_loaded
+            ]
+            if unseen:
+                start = datetime.datetime.now(
+                    datetime.timezone.utc
+                ) - datetime.timedelta(days=config.TRADE_STORE_READ_DAYS)
+                self.aggregates.apply(
+                    self.trade_store.read(self.chain, wallets=unseen, start=start)
+                )
+                self._stored_loaded.update(w.lower() for w in unseen)
+                known = self.aggregates.cursors()
+        since_blocks = {w: known.get(w.lower(), 0) for w in wallets}
 
-    def _calculate_mock_score(self, wallet_address):
-        # Deterministic mock score based on address string
-        # This is just so we see diverse output in verification
-        val = sum(ord(c) for c in wallet_address)
-        return val % 100
+        trades = self.get_trade_history(
+            wallets,
+            batch_size=config.SCORE_BATCH_SIZE,
+            limit_per_wallet=config.SCORE_HISTORY_PER_WALLET,
+            since_blocks=since_blocks,
+        )
+        legs = trades_to_legs(trades)
+        if self.trade_store is not None:
+            self.trade_store.append(legs, chain=self.chain)
+        return self.aggregates.apply(legs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import config
+from metrics import get_metrics
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for API responses.
+
+    An in-memory LRU sits in front of a persistent SQLite table. Entries are
+    keyed by a hash of the request (query + variables, or URL) and expire
+    according to a TTL per kind of query. A TTL of None never expires; kinds
+    without a TTL entry are not cached at all.
+    """
+
+    def __init__(self, path="cache.db", ttls=None, max_entries=1024):
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )
+            """)
+        self._conn.commit()
+
+    def get_or_fetch(self, kind, request, fetch):
+        """
+        Returns the cached value for 'request', or calls fetch() and caches
+        its result. Results of None are returned but never cached, so
+        callers can signal errors without poisoning the cache.
+        """
+        if kind not in self.ttls:
+            return fetch()
+
+        key = self._key(kind, request)
+        value = self._get(kind, key)
+        if value is not _MISSING:
+            return value
+
+        self._count(kind, "misses")
+        value = fetch()
+        if value is not None:
+            self._put(kind, key, value)
+        return value
+
+    def stats(self):
+        """
+        Returns {kind: {"memory_hits", "disk_hits", "misses"}}.
+        """
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self._stats.items()}
+
+    def clear(self, kind=None):
+        with self._lock:
+            if kind is None:
+                self._memory.clear()
+                self._conn.execute("DELETE FROM responses")
+            else:
+                for key in [k for k, v in self._memory.items() if v[0] == kind]:
+                    del self._memory[key]
+                self._conn.execute("DELETE FROM responses WHERE kind = ?", (kind,))
+            self._conn.commit()
+
+    def _key(self, kind, request):
+        raw = json.dumps([kind, request], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _get(self, kind, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                _, value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._bump(kind, "memory_hits")
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return _MISSING
+
+            value, expires_at = json.loads(row[0]), row[1]
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return _MISSING
+
+            # Promote to the memory tier
+            self._remember(key, kind, value, expires_at)
+            self._bump(kind, "disk_hits")
+            return value
+
+    def _put(self, kind, key, value):
+        ttl = self.ttls[kind]
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._remember(key, kind, value, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, kind, json.dumps(value), expires_at),
+            )
+            self._conn.commit()
+
+    def _remember(self, key, kind, value, expires_at):
+        self._memory[key] = (kind, value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, kind, field):
+        with self._lock:
+            self._bump(kind, field)
+
+    def _bump(self, kind, field):
+        # Caller holds self._lock
+        counts = self._stats.setdefault(
+            kind, {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        )
+        counts[field] += 1
+        get_metrics().inc("cache_lookups_total", kind=kind, result=field)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Returns the process-wide ResponseCache, creating it from config on first use.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ResponseCache(
+                path=config.CACHE_PATH,
+                ttls=config.CACHE_TTLS,
+                max_entries=config.CACHE_MAX_ENTRIES,
+            )
+        return _shared
@@ -0,0 +1,224 @@
+"""
+Non-interactive command line for cron jobs, systemd units and containers.
+
+    python cli.py scout [--chain base] [--limit 10]
+    python cli.py analyze <token> [--chain base] [--limit 50]
+    python cli.py watch [<wallet> ...] [--top 5]
+    python cli.py backfill [<wallet> ...] [--wallet-file wallets.txt]
+    python cli.py run [--interval 300]
+    python cli.py bench [bench.py options]
+
+Results are printed to stdout as one JSON document; progress messages go
+to stderr. Exit codes: 0 success, 1 error, 2 usage, 3 nothing found.
+
+Each command imports only the modules it needs, so 'scout' and 'watch'
+with explicit wallets start without loading pandas, and nothing here
+loads Streamlit or web3. A cold 'python cli.py scout' against a local
+server stays within COLD_START_BUDGET seconds (checked by test_cli.py).
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_EMPTY = 3
+
+# Seconds for a cold 'cli.py scout' (imports, parsing and its requests)
+# against a local server
+COLD_START_BUDGET = 0.5
+
+
+def _chains(args):
+    import config
+
+    return [args.chain] if args.chain else config.TARGET_CHAINS
+
+
+def cmd_scout(args):
+    from scout import Scout
+
+    scout = Scout()
+    tokens = {
+        chain: scout.get_trending_tokens(limit=args.limit, chain=chain)
+        for chain in _chains(args)
+    }
+    return (EXIT_OK if any(tokens.values()) else EXIT_EMPTY), {"tokens": tokens}
+
+
+def cmd_analyze(args):
+    from brain import Brain
+    from profile_store import get_profile_store
+    from trade_store import get_trade_store
+
+    brain = Brain(
+        args.chain, profiles=get_profile_store(), trade_store=get_trade_store()
+    )
+    buyers = brain.find_early_buyers(args.token, limit=args.limit)
+    wallets = brain.score_wallets(buyers, source_token=args.token) if buyers else []
+    result = {
+        "chain": brain.chain,
+        "token": args.token,
+        "early_buyers": buyers,
+        "wallets": wallets,
+    }
+    return (EXIT_OK if buyers else EXIT_EMPTY), result
+
+
+def cmd_watch(args):
+    import config
+    from copier_daemon import CopierClient
+
+    if args.wallets:
+        picks = [{"address": w, "score": None} for w in args.wallets]
+    else:
+        from discovery import scan_chains
+
+        # The copier follows TARGET_CHAIN only
+        _, ranked = scan_chains(
+            [config.TARGET_CHAIN], token_limit=args.tokens, buyer_limit=args.buyers
+        )
+        picks = ranked[: args.top]
+    if not picks:
+        return EXIT_EMPTY, {"watchlist": []}
+
+    copier = CopierClient()
+    if not copier.spawn():
+        print(f"Copier worker did not start; see {config.COPIER_DAEMON_LOG}.")
+        return EXIT_ERROR, {"watchlist": picks, "worker": None}
+    wallets = [p["address"] for p in picks]
+    copier.update_watchlist(
+        wallets,
+        scores={p["address"]: p["score"] for p in picks if p["score"] is not None},
+    )
+    copier.start()
+    return EXIT_OK, {"watchlist": picks, "worker": copier.health()}
+
+
+def cmd_backfill(args):
+    import config
+    from brain import Brain
+    from profile_store import get_profile_store
+    from trade_store import get_trade_store
+
+    profiles = get_profile_store()
+    chain = args.chain or config.TARGET_CHAIN
+    wallets = list(args.wallets)
+    if args.wallet_file:
+        with open(args.wallet_file, "r") as f:
+            wallets += [line.strip() for line in f if line.strip()]
+    if not wallets:
+        # Default: the watchlist plus profiles that are due a refresh
+        watchlist, _ = profiles.load_watchlist()
+        wallets = watchlist + profiles.stale(chain, config.PROFILE_MAX_AGE)
+    wallets = list(dict.fromkeys(wallets))
+    if not wallets:
+        return EXIT_EMPTY, {"chain": chain, "wallets": 0}
+
+    brain = Brain(chain, profiles=profiles, trade_store=get_trade_store())
+    legs = brain.refresh_aggregates(wallets)
+    ranked = brain.score_wallets(wallets)
+    return EXIT_OK, {
+        "chain": chain,
+        "wallets": len(wallets),
+        "legs": legs,
+        "stored": brain.trade_store is not None,
+        "above_threshold": len(ranked),
+    }
+
+
+def cmd_run(args):
+    import config
+    from copier_daemon import CopierClient
+    from orchestrator import Orchestrator
+
+    copier = CopierClient()
+    if not copier.spawn():
+        print(f"Copier worker did not start; see {config.COPIER_DAEMON_LOG}.")
+        return EXIT_ERROR, {"worker": None}
+    copier.start()
+    # Until SIGINT/SIGTERM; the result is the pipeline's final stats
+    stats = Orchestrator(copier, scan_interval=args.interval).run_forever()
+    return EXIT_OK, stats
+
+
+def cmd_bench(args):
+    import bench
+
+    # bench prints its own report; its exit code flags regressions
+    return bench.main(args.bench_args), None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="AI Wallet Copy Trader (headless)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scout = commands.add_parser("scout", help="trending tokens as JSON")
+    scout.add_argument("--chain", help="default: TARGET_CHAINS")
+    scout.add_argument("--limit", type=int, default=10)
+    scout.set_defaults(func=cmd_scout)
+
+    analyze = commands.add_parser("analyze", help="score a token's early buyers")
+    analyze.add_argument("token")
+    analyze.add_argument("--chain", help="default: TARGET_CHAIN")
+    analyze.add_argument("--limit", type=int, default=50)
+    analyze.set_defaults(func=cmd_analyze)
+
+    watch = commands.add_parser("watch", help="hand wallets to the copier worker")
+    watch.add_argument("wallets", nargs="*", help="default: scan and take --top")
+    watch.add_argument("--top", type=int, default=5)
+    watch.add_argument("--tokens", type=int, default=5, help="tokens scanned")
+    watch.add_argument("--buyers", type=int, default=20, help="buyers per token")
+    watch.set_defaults(func=cmd_watch)
+
+    backfill = commands.add_parser(
+        "backfill", help="fetch trade history and refresh profiles"
+    )
+    backfill.add_argument("wallets", nargs="*", help="default: watchlist + stale")
+    backfill.add_argument("--wallet-file", help="one address per line")
+    backfill.add_argument("--chain", help="default: TARGET_CHAIN")
+    backfill.set_defaults(func=cmd_backfill)
+
+    run = commands.add_parser(
+        "run", help="continuous scout -> score -> watchlist pipeline"
+    )
+    run.add_argument("--interval", type=int, help="seconds between scans")
+    run.set_defaults(func=cmd_run)
+
+    # Everything after 'bench' is passed through to bench.py
+    bench = commands.add_parser("bench", help="run bench.py", add_help=False)
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs one command. Returns its exit code.
+    """
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.func is cmd_bench:
+        args.bench_args = extra
+        return cmd_bench(args)[0]
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    # Pipeline stages print progress; keep stdout for the JSON result
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            code, result = args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    json.dump(result, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# API Keys
+# BIRDEYE_API_KEY = "Not Required (Using GeckoTerminal Free API)"
+BITQUERY_API_KEY = os.getenv("BITQUERY_API_KEY", "YOUR_BITQUERY_KEY_HERE")
+MORALIS_API_KEY = os.getenv("MORALIS_API_KEY", "")
+
+# API endpoints (point these at fake_server.py for offline runs)
+BITQUERY_URL = os.getenv("BITQUERY_URL", "https://graphql.bitquery.io")
+GECKOTERMINAL_URL = os.getenv(
+    "GECKOTERMINAL_URL", "https://api.geckoterminal.com/api/v2"
+)
+
+# Configuration
+TARGET_CHAIN = "ethereum"  # or "base"; the chain the Copier watches
+TARGET_CHAINS = [TARGET_CHAIN]  # chains scanned concurrently per discovery run
+# Per chain: GeckoTerminal network slug, BitQuery root field, the
+# GeckoTerminal request rate for that network and the chain id, Uniswap V2
+# router and wrapped native token used by executor.py. Only EVM networks:
+# every query is written against BitQuery's ethereum dexTrades schema.
+CHAINS = {
+    "ethereum": {
+        "geckoterminal": "eth",
+        "bitquery": "ethereum(network: ethereum)",
+        "requests_per_minute": 60,  # GeckoTerminal calls on this chain
+        "chain_id": 1,
+        "router": "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D",
+        "wrapped_native": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+    },
+    "base": {
+        "geckoterminal": "base",
+        "bitquery": "ethereum(network: base)",
+        "requests_per_minute": 60,  # GeckoTerminal calls on this chain
+        "chain_id": 8453,
+        "router": "0x4752ba5DBc23f44D87826276BF6Fd6b1C372aD24",
+        "wrapped_native": "0x4200000000000000000000000000000000000006",
+    },
+}
+MIN_LIQUIDITY_USD = 10000
+MIN_VOLUME_24H = 50000
+# GeckoTerminal pool listings Scout pages through concurrently
+SCOUT_SOURCES = ["trending_pools", "new_pools"]
+SCOUT_MAX_PAGES = 3  # per source; paging stops once enough tokens qualify
+DISCOVERY_CONCURRENCY = 4  # parallel early-buyer queries per run
+EARLY_BUYERS_PAGE_SIZE = 100  # trades per page when paging through early buys
+# Early-buyer index (wallet <-> token, kept across runs)
+EARLY_INDEX_PATH = "early_buyers.db"
+EARLY_INDEX_MIN_TOKENS = 1  # only score wallets early in this many tokens (1 = all)
+EARLY_INDEX_DAYS = 30  # ... counting first buys in this many days
+
+# Continuous pipeline (orchestrator.py): Scout -> early buyers -> scoring -> copier
+ORCHESTRATOR_SCAN_INTERVAL = 300  # seconds between Scout passes
+ORCHESTRATOR_TOKENS_PER_SCAN = 10  # per chain
+ORCHESTRATOR_BUYERS_PER_TOKEN = 20
+ORCHESTRATOR_TOKEN_REFRESH = 3600  # seconds before a token's buyers are re-queried
+# Bounded hand-offs between stages; a full queue blocks the stage feeding it
+ORCHESTRATOR_QUEUE_SIZES = {"tokens": 20, "candidates": 20, "scored": 50}
+ORCHESTRATOR_WORKERS = {"buyers": 4, "scoring": 2}
+ORCHESTRATOR_WATCHLIST_SIZE = 5
+ORCHESTRATOR_WATCHLIST_INTERVAL = 60  # min seconds between watchlist pushes
+ORCHESTRATOR_RANKED_TTL = 24 * 3600  # seconds a ranking is kept without a rescore
+
+# Scoring Weights
+WEIGHT_WIN_RATE = 0.4
+WEIGHT_ROI = 0.4
+WEIGHT_AGE = 0.2
+SCORE_ROI_CAP = 1.0  # realized ROI (1.0 = +100%) that earns the full ROI weight
+SCORE_AGE_CAP_DAYS = 365  # wallet age that earns the full age weight
+MIN_CLOSED_TRADES = 3  # wallets with fewer closed trades score 0
+MIN_WALLET_SCORE = 70  # only wallets above this are returned by score_wallets
+SCORE_BATCH_SIZE = 25  # wallets per trade-history request
+SCORE_HISTORY_PER_WALLET = 100  # trades per wallet in each history page
+# Backtesting (backtest.py)
+BACKTEST_POSITION_USD = 100  # USD per copied buy
+BACKTEST_SLIPPAGE = 0.01  # charged on entry and exit
+BACKTEST_DELAYS = [0, 60, 300, 900]  # copy delays (seconds) swept by default
+# Wallet profiles and the last watchlist, kept across restarts
+PROFILE_PATH = "profiles.db"
+PROFILE_MAX_AGE = 6 * 3600  # seconds before a stored score is refreshed
+# Token metadata and prices (prices.py)
+PRICE_PATH = "prices.db"  # price history and token metadata
+PRICE_TTL = 60  # seconds a fetched price is reused from memory
+PRICE_BATCH_SIZE = 30  # tokens per GeckoTerminal multi-token request
+# Columnar trade history (needs pyarrow); "" disables it
+TRADE_STORE_PATH = "trade_history"
+TRADE_STORE_READ_DAYS = 180  # days of stored history a wallet new to Brain starts from
+
+# Quote currencies are what positions are priced in, not positions themselves
+QUOTE_TOKENS = [
+    "-",  # native ETH
+    "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",  # WETH
+    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",  # USDC
+    "0xdac17f958d2ee523a2206206994597c13d831ec7",  # USDT
+    "0x6b175474e89094c44da98b954eedeac495271d0f",  # DAI
+]
+
+# HTTP transport (shared by Scout and Brain)
+# Seconds per endpoint; for "stream" this is the longest gap between lines
+HTTP_TIMEOUTS = {"bitquery": 30, "geckoterminal": 10, "stream": 90, "rpc": 10}
+HTTP_MAX_RETRIES = 3  # retries on 429/5xx and connection errors
+HTTP_BACKOFF_BASE = 0.5  # seconds; doubled per attempt with full jitter
+HTTP_POOL_SIZE = 20  # keep-alive connections per host
+
+# Request scheduler (request_scheduler.py): one point budget per provider,
+# spent in priority order. The buckets live in REQUEST_BUDGET_PATH, so every
+# process (discovery, the copier worker and its shards) shares one budget;
+# "" keeps a separate budget per process.
+REQUEST_BUDGETS = {"bitquery": 1000, "geckoterminal": 30}  # points per minute
+REQUEST_BUDGET_PATH = "budgets.db"
+# Estimated points per request: base + per_row * the query's result limit
+REQUEST_COSTS = {
+    "bitquery": {"base": 1, "per_row": 0.01},
+    "geckoterminal": {"base": 1},
+}
+# Lanes, highest priority first: live copier polling, rescoring, discovery
+QUERY_LANES = {
+    "wallet_trades": "live",
+    "trade_history": "rescoring",
+    "early_buyers": "discovery",
+    "recent_trades": "discovery",
+    "trending_pools": "discovery",
+    "new_pools": "discovery",
+    "token_prices": "discovery",
+}
+# Share of each budget that lower lanes leave for the lanes above them
+LANE_RESERVES = {"rescoring": 0.1, "discovery": 0.25}
+
+# Response cache (memory LRU + on-disk SQLite)
+CACHE_PATH = "cache.db"
+CACHE_MAX_ENTRIES = 1024  # in-memory LRU size
+# TTL in seconds per query kind; None = never expires (immutable history)
+CACHE_TTLS = {"early_buyers": None, "trending_pools": 120, "new_pools": 60}
+
+# Dashboard
+DASHBOARD_ANALYSIS_TTL = 600  # seconds a token's scored early buyers are reused
+
+# Copier (wallet polling)
+WATCH_BATCH_SIZE = 50  # wallets per batched BitQuery request
+WATCH_TRADES_PER_WALLET = 10  # result budget per wallet in a batch
+WATCH_LOOKBACK_SECONDS = 900  # first poll window for a newly watched wallet
+WATCH_INDEX_LAG_SECONDS = 60  # overlap between polls to catch late-indexed trades
+WATCH_MIN_INTERVAL = 60  # seconds; high-score / recently active wallets
+WATCH_MAX_INTERVAL = 3600  # seconds; dormant wallets back off up to this
+WATCH_IDLE_BACKOFF = 1.5  # interval multiplier per poll with no new trades
+WATCH_REQUESTS_PER_MINUTE = 30  # global budget for polling requests
+WATCH_MODE = "poll"  # or "stream" to follow STREAM_URL instead of polling
+STREAM_URL = ""  # newline-delimited JSON dexTrades feed
+
+# Execution of copier signals (executor.py)
+EXECUTION_MODE = "paper"  # "paper" (build and record only), "live" or "off"
+EXECUTION_RPC_URL = "http://127.0.0.1:8545"  # JSON-RPC node, e.g. a local anvil
+EXECUTION_FROM = ""  # sender; unlocked dev account when no private key is set
+EXECUTION_PRIVATE_KEY = ""  # signs live orders (needs eth_account)
+EXECUTION_POSITION_ETH = 0.01  # native currency spent per copied buy
+EXECUTION_GAS = 250000
+EXECUTION_GAS_PRICE_GWEI = None  # None = ask the node (eth_gasPrice) at start
+EXECUTION_DEADLINE_SECONDS = 120  # swap deadline after the order is built
+EXECUTION_SLIPPAGE_BPS = 100  # amountOutMin = router quote minus this (1%)
+EXECUTION_SUBMIT_WORKERS = 4  # concurrent JSON-RPC submissions
+
+# Copier background worker (copier_daemon.py)
+COPIER_CONTROL_HOST = "127.0.0.1"
+COPIER_CONTROL_PORT = 8765
+COPIER_DAEMON_LOG = "copier_daemon.log"
+# Watchlist sharding (shards.py): above 1, wallets are split by consistent
+# hashing across this many worker processes, each polling its own share
+COPIER_SHARDS = 1
+SHARD_VNODES = 64  # ring points per shard; more = more even split
+
+# Metrics (see metrics.py)
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus text on localhost
+METRICS_FILE = ""  # e.g. "metrics.json", rewritten every METRICS_FILE_INTERVAL
+METRICS_FILE_INTERVAL = 15  # seconds
+PROFILE_SCANS = False  # cProfile every Copier scan cycle
+SCAN_PROFILE_DIR = "scan_profiles"
+SCAN_PROFILE_KEEP = 20  # newest .prof dumps kept
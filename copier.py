@@ -1,105 +1,283 @@
-import time
 import json
-import os
-from datetime import datetime
-from brain import Brain
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import config
+from brain import Brain, trade_time_iso
+from metrics import get_metrics, scan_profiler
+from scheduler import WatchScheduler
+from signal_store import SignalStore
 
 
 class Copier:
-    def __init__(self):
+    def __init__(self, brain=None, signals=None, profiles=None, executor=None):
         self.active_watchlist = []
+        # wallet -> ISO8601 time of the last poll window, so each poll only
+        # asks for trades that are new
+        self.cursors = {}
         self.is_running = False
-        self.brain = Brain()
-        self.signals_file = "signals.json"
-
-        # Initialize signals file if not exists
-        if not os.path.exists(self.signals_file):
-            with open(self.signals_file, "w") as f:
-                json.dump([], f)
+        self.last_scan_at = None
+        self._wake = threading.Event()
+        self.brain = brain or Brain()
+        # Append-only log; imports a legacy signals.json on first run
+        self.signals = signals or SignalStore()
+        # Per-wallet adaptive polling within a global request budget
+        self.scheduler = WatchScheduler(
+            min_interval=config.WATCH_MIN_INTERVAL,
+            max_interval=config.WATCH_MAX_INTERVAL,
+            idle_backoff=config.WATCH_IDLE_BACKOFF,
+            requests_per_minute=config.WATCH_REQUESTS_PER_MINUTE,
+            batch_size=config.WATCH_BATCH_SIZE,
+        )
+        # Optional execution stage (executor.Executor); new signals are
+        # queued to it as soon as they are detected
+        self.executor = executor
+        # Optional ProfileStore: the watchlist is saved on every change and
+        # the last one is reloaded here, so a restart resumes watching
+        self.profiles = profiles
+        if profiles is not None:
+            wallets, scores = profiles.load_watchlist()
+            if wallets:
+                print(f"[Copier] Reloaded last watchlist ({len(wallets)} wallets).")
+                self.active_watchlist = wallets
+                self.scheduler.set_wallets(wallets, scores=scores)
 
-    def update_watchlist(self, wallets):
+    def update_watchlist(self, wallets, scores=None):
+        """
+        Replaces the watchlist. 'scores' (wallet -> 0-100) sets each wallet's
+        polling priority; wallets kept from the old list keep their schedule.
+        """
         print(f"[Copier] Updating watchlist with {len(wallets)} wallets.")
-        self.active_watchlist = wallets
+        wanted = set(wallets)
+        removed = [w for w in self.active_watchlist if w not in wanted]
+        self.change_watchlist(added=wallets, removed=removed, scores=scores)
+        self.active_watchlist = list(wallets)
+        if self.profiles is not None:
+            self.profiles.save_watchlist(wallets, scores)
+
+    def change_watchlist(self, added=(), removed=(), scores=None):
+        """
+        Applies a membership diff: starts watching 'added' (updating the
+        score of wallets already watched) and stops watching 'removed',
+        leaving every other wallet's schedule and cursor alone.
+        """
+        removed = set(removed) - set(added)
+        current = set(self.active_watchlist) - removed
+        self.active_watchlist = [
+            w for w in self.active_watchlist if w not in removed
+        ] + [w for w in dict.fromkeys(added) if w not in current]
+        for wallet in removed:
+            self.cursors.pop(wallet, None)
+        self.scheduler.remove_wallets(removed)
+        if self.scheduler.add_wallets(added, scores=scores):
+            # New wallets are due now; cut the loop's sleep short
+            self._wake.set()
 
     def start_listening(self):
+        if config.WATCH_MODE == "stream" and config.STREAM_URL:
+            return self.start_streaming(config.STREAM_URL)
+
         self.is_running = True
+        if self.executor is not None:
+            self.executor.start()
         print("[Copier] Started monitoring loop...")
 
         try:
             while self.is_running:
-                print(f"[Copier] Scanning {len(self.active_watchlist)} wallets...")
-                self._scan_and_log()
-
-                # Sleep for 15 minutes (900 seconds)
-                # For demo purposes, we can interrupt this loop or run it once in UI
-                # But in a real daemon, it would wait.
-                # In Streamlit, this loop blocks the UI.
-                # Better approach for UI: Run one scan, then sleep or rely on manual refresh/cron.
-                # For this implementation, we'll sleep briefly to allow stopping.
-                for _ in range(900):
-                    if not self.is_running:
-                        break
-                    time.sleep(1)
+                due = self.scheduler.due()
+                if due:
+                    print(f"[Copier] Scanning {len(due)} due wallets...")
+                    active = set()
+                    try:
+                        active = self._scan_and_log(due)
+                    except Exception as e:
+                        print(f"Exception in Copier scan: {e}")
+                    finally:
+                        # due() parked these wallets; a failed scan must not
+                        # leave them unscheduled (their cursors did not move)
+                        for wallet in due:
+                            self.scheduler.record(wallet, wallet in active)
+
+                # Woken early by stop_listening() or newly added wallets
+                self._wake.wait(self.scheduler.next_wakeup())
+                self._wake.clear()
 
         except KeyboardInterrupt:
             self.stop_listening()
 
-    def _scan_and_log(self):
+    def start_streaming(self, url):
+        """
+        Follows a newline-delimited JSON stream of dexTrades (same shape as
+        the batched poll query) instead of polling. Reconnects with backoff
+        until stop_listening() is called.
+        """
+        self.is_running = True
+        if self.executor is not None:
+            self.executor.start()
+        print(f"[Copier] Following trade stream at {url}...")
+        retry = 1
+
+        try:
+            while self.is_running:
+                try:
+                    response = self.brain.http.get(url, endpoint="stream", stream=True)
+                    response.raise_for_status()
+                    retry = 1
+                    # chunk_size=None yields each chunk as it arrives
+                    self._consume_stream(response.iter_lines(chunk_size=None))
+                except Exception as e:
+                    print(f"Exception in start_streaming: {e}")
+
+                if self.is_running:
+                    time.sleep(retry)
+                    retry = min(retry * 2, 60)
+
+        except KeyboardInterrupt:
+            self.stop_listening()
+
+    def _consume_stream(self, lines):
+        """
+        Logs signals for watched wallets from an iterable of JSON lines.
+        Blank lines are treated as keep-alives.
+        """
+        by_taker = {w.lower(): w for w in self.active_watchlist}
+
+        for line in lines:
+            if not self.is_running:
+                break
+            if not line or not line.strip():
+                continue
+
+            trade = json.loads(line)
+            taker = (trade.get("taker") or {}).get("address", "").lower()
+            wallet = by_taker.get(taker)
+            if wallet is None:
+                continue
+
+            signal = self._build_signal(wallet, trade)
+            if self._is_new_signal(signal):
+                detected_at = time.time()
+                # Only a signal the store accepted is executed, so a repeated
+                # tx_hash never becomes a second order
+                if self._save_signals([signal]):
+                    self._execute(signal, detected_at)
+                    self.scheduler.record(wallet, True)
+                    _record_detection(trade, "stream")
+                    print(f"New Signal: {wallet} bought {signal['token']}")
+
+    def _scan_and_log(self, wallets=None):
         """
-        Checks each wallet for recent trades and logs new ones.
+        Polls wallets (default: the whole watchlist) in batched queries and
+        logs new trades. Returns the set of wallets that had new signals.
         """
-        new_signals = []
-
-        for wallet in self.active_watchlist:
-            recent_trades = self.brain.get_recent_trades(wallet, limit=1)
-
-            for trade in recent_trades:
-                # Simplified signal object
-                timestamp = trade.get("block", {}).get("timestamp", {}).get("time")
-                token_symbol = trade.get("buyCurrency", {}).get("symbol")
-                amount = trade.get("buyAmount")
-                tx_hash = trade.get("transaction", {}).get("hash")
-
-                signal = {
-                    "timestamp": timestamp,
-                    "wallet": wallet,
-                    "token": token_symbol,
-                    "amount": amount,
-                    "tx_hash": tx_hash,
-                    "type": "BUY",
-                }
+        wallets = self.active_watchlist if wallets is None else wallets
+        if not wallets:
+            return set()
+
+        # One scan cycle: timed, and profiled when PROFILE_SCANS is on
+        with scan_profiler("scan"), get_metrics().timer("copier_scan_seconds"):
+            return self._poll(wallets)
+
+    def _poll(self, wallets):
+        poll_started = datetime.now(timezone.utc)
+        default_since = _iso(
+            poll_started - timedelta(seconds=config.WATCH_LOOKBACK_SECONDS)
+        )
+        cursors = {w: self.cursors.get(w, default_since) for w in wallets}
 
+        trades_by_wallet = self.brain.get_trades_for_wallets(
+            cursors,
+            batch_size=config.WATCH_BATCH_SIZE,
+            limit_per_wallet=config.WATCH_TRADES_PER_WALLET,
+        )
+
+        # Trades can show up in the index a little after they happen, so the
+        # next window starts slightly before this poll. Repeats are deduped.
+        next_since = _iso(
+            poll_started - timedelta(seconds=config.WATCH_INDEX_LAG_SECONDS)
+        )
+        candidates = []  # (signal, trade)
+
+        for wallet, trades in trades_by_wallet.items():
+            latest = cursors[wallet]
+
+            for trade in trades:
+                latest = max(latest, trade_time_iso(trade))
+                signal = self._build_signal(wallet, trade)
                 if self._is_new_signal(signal):
-                    new_signals.append(signal)
-                    print(f"New Signal: {wallet} bought {token_symbol}")
+                    candidates.append((signal, trade))
 
-        if new_signals:
-            self._save_signals(new_signals)
+            # Brain pages until a short page, so nothing since the cursor
+            # is left unread and the cursor may move past all of it
+            self.cursors[wallet] = max(latest, next_since)
 
-    def _is_new_signal(self, signal):
-        # Check against existing signals to avoid duplicates
-        try:
-            with open(self.signals_file, "r") as f:
-                existing = json.load(f)
-                # Simple duplicate check by tx_hash
-                existing_hashes = [s.get("tx_hash") for s in existing]
-                return signal.get("tx_hash") not in existing_hashes
-        except Exception:
-            return True
+        # The store drops repeated tx_hashes (e.g. one swap split across
+        # several dexTrades rows); only what it inserted is executed
+        detected_at = time.time()
+        stored = self._save_signals([signal for signal, _ in candidates])
+        stored_ids = {id(signal) for signal in stored}
+        for signal, trade in candidates:
+            if id(signal) in stored_ids:
+                self._execute(signal, detected_at)
+                _record_detection(trade, "poll")
+                print(f"New Signal: {signal['wallet']} bought {signal['token']}")
 
-    def _save_signals(self, new_signals):
-        try:
-            with open(self.signals_file, "r") as f:
-                history = json.load(f)
+        get_metrics().inc("copier_wallets_polled_total", len(wallets))
+        self.last_scan_at = time.time()
+        return {s["wallet"] for s in stored}
+
+    def _build_signal(self, wallet, trade):
+        # Simplified signal object
+        return {
+            "timestamp": trade.get("block", {}).get("timestamp", {}).get("time"),
+            "wallet": wallet,
+            "token": trade.get("buyCurrency", {}).get("symbol"),
+            "token_address": trade.get("buyCurrency", {}).get("address"),
+            "amount": trade.get("buyAmount"),
+            "tx_hash": trade.get("transaction", {}).get("hash"),
+            "type": "BUY",
+        }
 
-            updated_history = new_signals + history
+    def _execute(self, signal, detected_at=None):
+        if self.executor is not None:
+            self.executor.submit(
+                signal, detected_at=time.time() if detected_at is None else detected_at
+            )
 
-            with open(self.signals_file, "w") as f:
-                json.dump(updated_history, f, indent=2)
+    def _is_new_signal(self, signal):
+        # Duplicate check by tx_hash (indexed lookup)
+        return not self.signals.contains(signal.get("tx_hash"))
 
+    def _save_signals(self, new_signals):
+        """
+        Stores signals; returns the ones actually inserted.
+        """
+        if not new_signals:
+            return []
+        try:
+            return self.signals.add(new_signals)
         except Exception as e:
             print(f"Error saving signals: {e}")
+            return []
 
     def stop_listening(self):
         self.is_running = False
+        self._wake.set()
         print("[Copier] Stopped.")
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _record_detection(trade, source):
+    """
+    Counts a new signal and observes its lag: now minus the trade's block time.
+    """
+    metrics = get_metrics()
+    metrics.inc("copier_signals_total", source=source)
+    at = trade_time_iso(trade)
+    if at:
+        traded = datetime.fromisoformat(at.replace("Z", "+00:00"))
+        lag = (datetime.now(timezone.utc) - traded).total_seconds()
+        metrics.observe("signal_detection_lag_seconds", max(lag, 0.0), source=source)
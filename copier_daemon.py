@@ -0,0 +1,301 @@
+"""
+Runs the Copier as a long-lived background worker.
+
+The worker owns one Copier and runs its monitoring loop on a thread. A small
+JSON control server on localhost lets the dashboard and main.py drive it
+without blocking on the loop themselves:
+
+    GET  /health     running state, watchlist size, last scan, signal count,
+                     execution stats, per-shard stats
+    GET  /watchlist  current watchlist
+    GET  /metrics    Prometheus metrics (see metrics.py)
+    POST /start      start the monitoring loop
+    POST /stop       stop the monitoring loop
+    POST /watchlist  {"wallets": [...], "scores": {wallet: score}}
+    POST /shards     {"count": n} resize a sharded copier (COPIER_SHARDS > 1)
+    POST /shutdown   stop and exit the worker
+
+    python copier_daemon.py --start       # run a worker in the foreground
+    python copier_daemon.py --status      # query a running worker
+    python copier_daemon.py --shutdown    # stop it
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+import config
+from metrics import get_metrics, start_export
+
+
+class CopierDaemon:
+    def __init__(self, copier=None, host=None, port=None):
+        if copier is None:
+            from executor import build_executor
+            from profile_store import get_profile_store
+
+            if config.COPIER_SHARDS > 1:
+                from shards import ShardedCopier
+
+                copier = ShardedCopier(
+                    profiles=get_profile_store(), executor=build_executor()
+                )
+            else:
+                from copier import Copier
+
+                copier = Copier(profiles=get_profile_store(), executor=build_executor())
+        self.copier = copier
+        self.started_at = time.time()
+        self._thread = None
+        self._lock = threading.Lock()
+        port = config.COPIER_CONTROL_PORT if port is None else port
+        self.httpd = ThreadingHTTPServer(
+            (host or config.COPIER_CONTROL_HOST, port), self._handler()
+        )
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        return self.httpd.server_address[:2]
+
+    def serve_forever(self):
+        print(f"[CopierDaemon] Control server on {self.address[0]}:{self.address[1]}")
+        self.httpd.serve_forever()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(
+                target=self.copier.start_listening, daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self.copier.stop_listening()
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def shutdown(self):
+        self.stop()
+        executor = getattr(self.copier, "executor", None)
+        if executor is not None:
+            executor.stop()
+        close = getattr(self.copier, "close", None)
+        if close is not None:
+            close()
+        # shutdown() blocks until serve_forever returns, so not from a handler
+        threading.Thread(target=self.httpd.shutdown, daemon=True).start()
+
+    def health(self):
+        copier = self.copier
+        executor = getattr(copier, "executor", None)
+        shards = getattr(copier, "shard_stats", None)
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "running": copier.is_running,
+            "watchlist_size": len(copier.active_watchlist),
+            "last_scan_at": copier.last_scan_at,
+            "signals": copier.signals.count(),
+            "execution": executor.stats() if executor is not None else None,
+            "shards": shards() if shards is not None else None,
+        }
+
+    def _handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    return self._send(200, daemon.health())
+                if self.path == "/metrics":
+                    body = get_metrics().render_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    return self.wfile.write(body)
+                if self.path == "/watchlist":
+                    return self._send(
+                        200, {"wallets": list(daemon.copier.active_watchlist)}
+                    )
+                self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._send(400, {"error": "invalid JSON"})
+
+                if self.path == "/start":
+                    return self._send(200, {"started": daemon.start()})
+                if self.path == "/stop":
+                    daemon.stop()
+                    return self._send(200, {"stopped": True})
+                if self.path == "/watchlist":
+                    wallets = body.get("wallets")
+                    if not isinstance(wallets, list):
+                        return self._send(400, {"error": "'wallets' must be a list"})
+                    daemon.copier.update_watchlist(wallets, scores=body.get("scores"))
+                    return self._send(200, {"watchlist_size": len(wallets)})
+                if self.path == "/shards":
+                    resize = getattr(daemon.copier, "resize", None)
+                    if resize is None:
+                        return self._send(400, {"error": "copier is not sharded"})
+                    try:
+                        count = resize(int(body.get("count", 0)))
+                    except (TypeError, ValueError):
+                        return self._send(400, {"error": "'count' must be a number"})
+                    return self._send(200, {"shards": count})
+                if self.path == "/shutdown":
+                    self._send(200, {"shutdown": True})
+                    return daemon.shutdown()
+                self._send(404, {"error": "not found"})
+
+        return Handler
+
+
+class CopierClient:
+    """
+    Control/status client for a CopierDaemon. Used by the dashboard and
+    main.py; spawn() launches a detached worker if none is answering.
+    """
+
+    def __init__(self, host=None, port=None, timeout=2):
+        self.host = host or config.COPIER_CONTROL_HOST
+        self.port = config.COPIER_CONTROL_PORT if port is None else port
+        self.timeout = timeout
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _get(self, path):
+        response = requests.get(f"{self.base_url}{path}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _post(self, path, payload=None):
+        response = requests.post(
+            f"{self.base_url}{path}", json=payload or {}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def health(self):
+        """
+        Returns the worker's status dict, or None if it is not reachable.
+        """
+        try:
+            return self._get("/health")
+        except requests.RequestException:
+            return None
+
+    def is_alive(self):
+        return self.health() is not None
+
+    def watchlist(self):
+        return self._get("/watchlist")["wallets"]
+
+    def start(self):
+        return self._post("/start")
+
+    def stop(self):
+        return self._post("/stop")
+
+    def update_watchlist(self, wallets, scores=None):
+        return self._post("/watchlist", {"wallets": wallets, "scores": scores})
+
+    def resize_shards(self, count):
+        return self._post("/shards", {"count": count})
+
+    def shutdown(self):
+        return self._post("/shutdown")
+
+    def spawn(self, wait=10):
+        """
+        Starts a detached worker process unless one is already answering,
+        then waits up to 'wait' seconds for it to come up.
+        """
+        if self.is_alive():
+            return True
+
+        log = open(config.COPIER_DAEMON_LOG, "a")
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-u",  # unbuffered, so the log file stays current
+                os.path.abspath(__file__),
+                "--host",
+                self.host,
+                "--port",
+                str(self.port),
+            ],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            start_new_session=True,
+        )
+        log.close()
+
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            if self.is_alive():
+                return True
+            time.sleep(0.2)
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copier background worker")
+    parser.add_argument("--host", default=config.COPIER_CONTROL_HOST)
+    parser.add_argument("--port", type=int, default=config.COPIER_CONTROL_PORT)
+    parser.add_argument(
+        "--start", action="store_true", help="start monitoring immediately"
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="print a running worker's health"
+    )
+    parser.add_argument("--shutdown", action="store_true", help="stop a running worker")
+    args = parser.parse_args()
+
+    if args.status or args.shutdown:
+        client = CopierClient(host=args.host, port=args.port)
+        status = client.health()
+        if status is None:
+            print("No copier worker is running.")
+            sys.exit(1)
+        print(json.dumps(client.shutdown() if args.shutdown else status, indent=2))
+        sys.exit(0)
+
+    daemon = CopierDaemon(host=args.host, port=args.port)
+    # Not METRICS_PORT (main.py may hold it); /metrics on the control port
+    start_export(process="copier")
+    if args.start:
+        daemon.start()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
@@ -1,22 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
 import streamlit as st
 import pandas as pd
+import requests
 from scout import Scout
 from brain import Brain
-from copier import Copier
+from copier_daemon import CopierClient
+from prices import get_price_service
+from profile_store import get_profile_store
+from signal_store import SignalStore
+from trade_store import get_trade_store
 import config
-import json
-import os
 
 # Page Config
 st.set_page_config(page_title="AI Wallet Copy Trader", page_icon="🤖", layout="wide")
 
-# Initialize Session State
-if "copier" not in st.session_state:
-    st.session_state.copier = Copier()
-if "scout" not in st.session_state:
-    st.session_state.scout = Scout()
-if "brain" not in st.session_state:
-    st.session_state.brain = Brain()
+
+# The copier runs in its own worker process (copier_daemon.py) so it keeps
+# going across reruns and browser sessions; the UI only talks to it.
+@st.cache_resource
+def get_copier_client():
+    return CopierClient()
+
+
+@st.cache_resource
+def get_signal_store():
+    return SignalStore()
+
+
+# One Scout/Brain per server process, so their HTTP pools and response
+# caches are shared by every session
+@st.cache_resource
+def get_scout():
+    return Scout()
+
+
+@st.cache_resource
+def get_brain(chain):
+    return Brain(chain, profiles=get_profile_store(), trade_store=get_trade_store())
+
+
+# Results are memoized across reruns and sessions; repeat clicks and other
+# users asking about the same token don't hit the APIs again.
+@st.cache_data(ttl=config.CACHE_TTLS.get("trending_pools") or 120, show_spinner=False)
+def scan_market(limit=10, chains=None):
+    """
+    Trending tokens of every chain in 'chains', scanned concurrently.
+    """
+    chains = chains or [config.TARGET_CHAIN]
+    with ThreadPoolExecutor(max_workers=len(chains)) as pool:
+        results = pool.map(
+            lambda chain: get_scout().get_trending_tokens(limit=limit, chain=chain),
+            chains,
+        )
+        return [token for tokens in results for token in tokens]
+
+
+@st.cache_data(ttl=config.DASHBOARD_ANALYSIS_TTL, show_spinner=False)
+def analyze_token(token_address, chain=None, limit=50):
+    """
+    Returns (buyers, scored_wallets) for a token on 'chain' (default
+    TARGET_CHAIN).
+    """
+    brain = get_brain(chain or config.TARGET_CHAIN)
+    buyers = brain.find_early_buyers(token_address, limit=limit)
+    if not buyers:
+        return buyers, []
+    return buyers, brain.score_wallets(buyers, source_token=token_address)
+
+
+def load_signals(store, filters, page, page_size):
+    """
+    Returns (rows, total) for one page of the signals log.
+
+    The newest page is kept in session state and only the rows stored since
+    the last render are fetched on each rerun; older pages are read with an
+    indexed LIMIT/OFFSET query.
+    """
+    if page > 0:
+        rows = store.query(**filters, limit=page_size, offset=page * page_size)
+        return rows, store.count(**filters)
+
+    key = (tuple(sorted(filters.items())), page_size)
+    view = st.session_state.get("signals_view")
+    if view is None or view["key"] != key:
+        last_id = store.last_id()
+        rows = store.query(**filters, limit=page_size)
+        view = {
+            "key": key,
+            "rows": rows,
+            "total": store.count(**filters),
+            # Rows stored while this page was read are already in 'rows'
+            "last_id": max([last_id] + [r["id"] for r in rows[:1]]),
+        }
+    else:
+        new_rows = store.query(**filters, after_id=view["last_id"], limit=page_size)
+        if new_rows:
+            view["total"] += store.count(**filters, after_id=view["last_id"])
+            view["rows"] = (new_rows + view["rows"])[:page_size]
+            view["last_id"] = max(view["last_id"], new_rows[0]["id"])
+
+    st.session_state.signals_view = view
+    return view["rows"], view["total"]
+
+
+copier_client = get_copier_client()
+copier_status = copier_client.health()
 
 st.title("🤖 AI Wallet Copy Trader")
 
@@ -30,18 +119,40 @@ with st.sidebar:
     else:
         st.error("❌ BitQuery Key Missing")
 
+    # Response cache effectiveness (each hit is a BitQuery/GeckoTerminal call saved)
+    cache_stats = get_brain(config.TARGET_CHAIN).cache.stats()
+    if cache_stats:
+        with st.expander("Cache"):
+            for kind, counts in cache_stats.items():
+                hits = counts["memory_hits"] + counts["disk_hits"]
+                st.caption(f"{kind}: {hits} hits / {counts['misses']} misses")
+
     st.markdown("---")
 
     # Copier Status
-    if st.session_state.copier.is_running:
+    if copier_status and copier_status["running"]:
         st.success("🟢 Copier Active")
+        st.caption(
+            f"Worker pid {copier_status['pid']} · "
+            f"{copier_status['watchlist_size']} wallets · "
+            f"{copier_status['signals']} signals"
+        )
         if st.button("Stop Copier"):
-            st.session_state.copier.stop_listening()
+            copier_client.stop()
             st.rerun()
     else:
         st.warning("🔴 Copier Idle")
         if st.button("Start Copier"):
-            st.session_state.copier.start_listening()
+            if copier_client.spawn():
+                try:
+                    copier_client.start()
+                except requests.RequestException:
+                    st.error(
+                        "Copier worker stopped responding; "
+                        f"see {config.COPIER_DAEMON_LOG}."
+                    )
+            else:
+                st.error("Copier worker did not start; see copier_daemon.log.")
             st.rerun()
 
 # Tabs
@@ -54,11 +165,13 @@ with tab1:
     st.header("Market Discovery")
     st.write("Trending tokens found via GeckoTerminal.")
 
+    chains = st.multiselect("Chains", list(config.CHAINS), default=config.TARGET_CHAINS)
+
     col1, col2 = st.columns([1, 3])
     with col1:
         if st.button("Scan Market Now"):
             with st.spinner("Scanning GeckoTerminal..."):
-                tokens = st.session_state.scout.get_trending_tokens(limit=10)
+                tokens = scan_market(limit=10, chains=tuple(chains))
                 st.session_state.trending_tokens = tokens
                 st.success(f"Found {len(tokens)} tokens.")
 
@@ -67,7 +180,7 @@ with tab1:
         if not df.empty:
             # Format columns
             display_df = df[
-                ["symbol", "address", "liquidity", "volume24h", "pool_address"]
+                ["chain", "symbol", "address", "liquidity", "volume24h", "pool_address"]
             ]
             st.dataframe(
                 display_df,
@@ -90,18 +203,29 @@ with tab2:
     st.write("Analyze early buyers of a specific token.")
 
     token_input = st.text_input("Enter Token Address to Analyze:", placeholder="0x...")
+    # A token from the last market scan is analyzed on its own chain
+    scanned = {
+        t["address"].lower(): t["chain"]
+        for t in st.session_state.get("trending_tokens", [])
+    }
+    token_chain = scanned.get(token_input.strip().lower(), config.TARGET_CHAIN)
+    chain_names = list(config.CHAINS)
+    token_chain = st.selectbox(
+        "Chain",
+        chain_names,
+        index=chain_names.index(token_chain) if token_chain in chain_names else 0,
+    )
 
     if st.button("Find Smart Money"):
         if token_input:
             with st.spinner("Querying BitQuery & Scoring Wallets..."):
-                # 1. Find Early Buyers
-                buyers = st.session_state.brain.find_early_buyers(token_input, limit=50)
+                # Find early buyers and score them (memoized per token)
+                buyers, scored_wallets = analyze_token(
+                    token_input, chain=token_chain, limit=50
+                )
 
                 if buyers:
-                    st.info(f"Found {len(buyers)} early buyers. Scoring them now...")
-
-                    # 2. Score Wallets
-                    scored_wallets = st.session_state.brain.score_wallets(buyers)
+                    st.info(f"Found {len(buyers)} early buyers.")
 
                     # Store in session for Copier
                     st.session_state.last_analysis = scored_wallets
@@ -136,44 +260,102 @@ with tab3:
 
     with col1:
         st.subheader("Active Watchlist")
-        if st.session_state.copier.active_watchlist:
-            st.table(st.session_state.copier.active_watchlist)
+        watchlist = []
+        if copier_status:
+            try:
+                watchlist = copier_client.watchlist()
+            except requests.RequestException:
+                st.error(
+                    "Copier worker stopped responding; "
+                    f"see {config.COPIER_DAEMON_LOG}."
+                )
+        if watchlist:
+            st.table(watchlist)
         else:
             st.info("Watchlist is empty. Analyze tokens in 'Brain' tab to populate.")
 
         if hasattr(st.session_state, "last_analysis"):
             if st.button("Add Top 5 Analysed Wallets to Watchlist"):
-                top_5 = [w["address"] for w in st.session_state.last_analysis[:5]]
-                st.session_state.copier.update_watchlist(top_5)
-                st.success("Watchlist updated!")
+                top_5 = st.session_state.last_analysis[:5]
+                if copier_client.spawn():
+                    try:
+                        copier_client.update_watchlist(
+                            [w["address"] for w in top_5],
+                            scores={w["address"]: w["score"] for w in top_5},
+                        )
+                        st.success("Watchlist updated!")
+                    except requests.RequestException:
+                        st.error(
+                            "Copier worker stopped responding; "
+                            f"see {config.COPIER_DAEMON_LOG}."
+                        )
+                else:
+                    st.error("Copier worker did not start; see copier_daemon.log.")
                 st.rerun()
 
     with col2:
         st.subheader("Live Signals Log")
 
-        # Load signals.json
+        # Filters are applied by the signal store, not in the browser
+        f1, f2 = st.columns(2)
+        wallet_filter = f1.text_input("Wallet", placeholder="0x...").strip()
+        token_filter = f2.text_input("Token", placeholder="Symbol or address").strip()
+        date_range = st.date_input("Date range", value=(), format="YYYY-MM-DD")
+        f3, f4 = st.columns(2)
+        page_size = f3.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+        page = f4.number_input("Page", min_value=1, value=1, step=1) - 1
+
+        filters = {"wallet": wallet_filter or None, "token": token_filter or None}
+        if len(date_range) == 2:
+            start, end = date_range
+            filters["start"] = datetime.combine(start, time.min).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+            filters["end"] = datetime.combine(end, time.max).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+
         try:
-            if os.path.exists("signals.json"):
-                with open("signals.json", "r") as f:
-                    signals_data = json.load(f)
+            signals_data, total = load_signals(
+                get_signal_store(), filters, page, page_size
+            )
 
-                if signals_data:
-                    st.dataframe(
-                        signals_data,
-                        column_config={
-                            "timestamp": "Time",
-                            "wallet": "Wallet",
-                            "token": "Token",
-                            "amount": "Amount",
-                            "type": "Action",
-                        },
-                    )
-                else:
-                    st.info("No signals detected yet.")
+            if signals_data:
+                # The whole page is priced in one batched lookup
+                values = get_price_service().value(
+                    config.TARGET_CHAIN,
+                    [(s.get("token_address"), s.get("amount")) for s in signals_data],
+                )
+                st.dataframe(
+                    [{**s, "value_usd": v} for s, v in zip(signals_data, values)],
+                    column_order=[
+                        "timestamp",
+                        "wallet",
+                        "token",
+                        "amount",
+                        "value_usd",
+                        "type",
+                    ],
+                    column_config={
+                        "timestamp": "Time",
+                        "wallet": "Wallet",
+                        "token": "Token",
+                        "amount": "Amount",
+                        "value_usd": st.column_config.NumberColumn(
+                            "Value now", format="$%.2f"
+                        ),
+                        "type": "Action",
+                    },
+                )
+                pages = -(-total // page_size)
+                st.caption(f"{total} signals · page {page + 1} of {pages}")
             else:
-                st.info("Waiting for signals...")
+                st.info("No signals detected yet.")
         except Exception as e:
             st.error(f"Error reading signals: {e}")
 
-        if st.session_state.copier.is_running:
-            st.caption("Monitoring active... (Updates every 15 mins)")
+        if copier_status and copier_status["running"]:
+            st.caption(
+                "Monitoring active... (each wallet polled every "
+                f"{config.WATCH_MIN_INTERVAL // 60}-{config.WATCH_MAX_INTERVAL // 60} mins)"
+            )
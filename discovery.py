@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import config
+from brain import Brain
+from early_index import get_early_index
+from prices import get_price_service
+from profile_store import get_profile_store
+from scout import Scout
+from trade_store import get_trade_store
+
+
+def scan_chain(
+    chain, scout, brain, token_limit=5, buyer_limit=20, index=None, prices=None
+):
+    """
+    Discovery and analysis for one chain: trending tokens, their early
+    buyers (queried concurrently) and the scored wallets.
+
+    Every token's early buyers are added to the early-buyer 'index'. With
+    EARLY_INDEX_MIN_TOKENS above 1, only wallets that the index has seen
+    early in that many tokens within EARLY_INDEX_DAYS are scored.
+    The pool listings' token prices are added to the 'prices' history.
+    Returns (tokens, ranked_wallets); each wallet is tagged with its chain.
+    """
+    tokens = scout.get_trending_tokens(limit=token_limit, chain=chain)
+    print(f"[{chain}] Found {len(tokens)} trending tokens.")
+    if prices is not None and tokens:
+        prices.record(chain, {t["address"]: t["price"] for t in tokens})
+
+    seen_wallets = set()
+    ranked_wallets = []
+    # Each token's buyers are scored as soon as its query returns
+    for token, entries in brain.iter_early_buyers(
+        tokens,
+        limit=buyer_limit,
+        max_workers=config.DISCOVERY_CONCURRENCY,
+        details=True,
+    ):
+        new_wallets = select_candidates(
+            chain, token["address"], entries, seen_wallets, index
+        )
+        print(
+            f"[{chain}] {token['symbol']}: {len(entries)} early buyers, "
+            f"{len(new_wallets)} new"
+        )
+        if new_wallets:
+            ranked_wallets.extend(
+                brain.score_wallets(new_wallets, source_token=token["address"])
+            )
+
+    for wallet in ranked_wallets:
+        wallet["chain"] = chain
+    return tokens, ranked_wallets
+
+
+def select_candidates(chain, token_address, entries, seen_wallets, index=None):
+    """
+    Records a token's early-buyer 'entries' in 'index' and returns the
+    buyers worth scoring: those not in 'seen_wallets' and, with
+    EARLY_INDEX_MIN_TOKENS above 1, early in that many tokens within
+    EARLY_INDEX_DAYS. The returned wallets are added to 'seen_wallets'.
+    """
+    min_tokens = config.EARLY_INDEX_MIN_TOKENS
+    if index is not None:
+        index.record(chain, token_address, entries)
+
+    new_wallets = [e["address"] for e in entries if e["address"] not in seen_wallets]
+    if index is not None and min_tokens > 1 and new_wallets:
+        # Wallets held back here are checked again at the next token
+        repeat = index.repeat_wallets(
+            min_tokens, config.EARLY_INDEX_DAYS, wallets=new_wallets, chain=chain
+        )
+        repeat = {r["wallet"] for r in repeat}
+        new_wallets = [w for w in new_wallets if w.lower() in repeat]
+    seen_wallets.update(new_wallets)
+    return new_wallets
+
+
+def scan_chains(
+    chains=None,
+    token_limit=5,
+    buyer_limit=20,
+    scout=None,
+    brains=None,
+    index=None,
+    prices=None,
+):
+    """
+    Runs scan_chain for several chains at once (default config.TARGET_CHAINS).
+    Each chain has its own Brain and query template, so a slow chain does
+    not hold up the others; they all draw on the one shared request budget
+    (see request_scheduler.py), and only GeckoTerminal calls are also
+    limited per chain.
+
+    Returns (tokens_by_chain, ranked_wallets) with the wallets of every
+    chain merged into one pool, best score first.
+    """
+    chains = chains or config.TARGET_CHAINS
+    scout = scout or Scout()
+    brains = brains or {}
+    index = index or get_early_index()
+    prices = prices or get_price_service()
+    for chain in chains:
+        if chain not in brains:
+            brains[chain] = Brain(
+                chain, profiles=get_profile_store(), trade_store=get_trade_store()
+            )
+
+    tokens_by_chain = {}
+    ranked_wallets = []
+    with ThreadPoolExecutor(max_workers=len(chains)) as pool:
+        futures = {
+            pool.submit(
+                scan_chain,
+                chain,
+                scout,
+                brains[chain],
+                token_limit,
+                buyer_limit,
+                index,
+                prices,
+            ): chain
+            for chain in chains
+        }
+        for future in as_completed(futures):
+            chain = futures[future]
+            try:
+                tokens, wallets = future.result()
+            except Exception as e:
+                print(f"Exception in scan_chains ({chain}): {e}")
+                continue
+            tokens_by_chain[chain] = tokens
+            ranked_wallets.extend(wallets)
+
+    ranked_wallets.sort(key=lambda w: w["score"], reverse=True)
+    compact_history(brains)
+    return tokens_by_chain, ranked_wallets
+
+
+def compact_history(brains):
+    """
+    Merges the per-refresh day files each Brain's trade store gained back
+    into one file per day, so later reads open few files.
+    """
+    for chain, brain in brains.items():
+        if brain.trade_store is None:
+            continue
+        try:
+            brain.trade_store.compact(chain)
+        except Exception as e:
+            print(f"Exception compacting trade history ({chain}): {e}")
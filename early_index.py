@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import config
+
+# SQLite's default limit on bound parameters is 999
+_MAX_PARAMS = 500
+
+
+class EarlyBuyerIndex:
+    """
+    Persistent inverted index of early buyers, kept across runs.
+
+    One row per (chain, token, wallet) with the wallet's entry rank (1 = first
+    buyer) and first-buy time. Indexes on token, wallet and time give both
+    directions (token -> early wallets, wallet -> tokens) and let "wallets
+    early in at least K tokens in the last D days" run as one grouped query,
+    cheap enough to pre-filter candidates before full scoring.
+    """
+
+    def __init__(self, path="early_buyers.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS early_entries (
+                chain TEXT NOT NULL,
+                token TEXT NOT NULL,
+                wallet TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                first_buy_at TEXT,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (chain, token, wallet)
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_early_wallet "
+            "ON early_entries (wallet, first_buy_at, rank)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_early_time ON early_entries (first_buy_at)"
+        )
+        self._conn.commit()
+
+    def record(self, chain, token, buyers):
+        """
+        Adds a token's early buyers, in entry order, as yielded by
+        Brain.iter_token_buyers. Entries already indexed are kept as they
+        are, so re-recording a token only adds buyers not seen before.
+        Returns the number of new entries.
+        """
+        token = token.lower()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO early_entries "
+                "(chain, token, wallet, rank, first_buy_at, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        chain,
+                        token,
+                        buyer["address"].lower(),
+                        rank,
+                        buyer.get("first_buy_at"),
+                        time.time(),
+                    )
+                    for rank, buyer in enumerate(buyers, start=1)
+                ],
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def wallets_for_token(self, token, chain=None):
+        """
+        Early buyers of a token as (wallet, rank, first_buy_at), earliest first.
+        """
+        sql = "SELECT wallet, rank, first_buy_at FROM early_entries WHERE token = ?"
+        params = [token.lower()]
+        if chain:
+            sql += " AND chain = ?"
+            params.append(chain)
+        with self._lock:
+            return self._conn.execute(sql + " ORDER BY rank", params).fetchall()
+
+    def tokens_for_wallet(self, wallet, chain=None):
+        """
+        Tokens a wallet bought early as (chain, token, rank, first_buy_at),
+        newest first.
+        """
+        sql = (
+            "SELECT chain, token, rank, first_buy_at FROM early_entries "
+            "WHERE wallet = ?"
+        )
+        params = [wallet.lower()]
+        if chain:
+            sql += " AND chain = ?"
+            params.append(chain)
+        with self._lock:
+            return self._conn.execute(
+                sql + " ORDER BY first_buy_at DESC", params
+            ).fetchall()
+
+    def repeat_wallets(
+        self, min_tokens=2, days=30, wallets=None, chain=None, now=None, limit=None
+    ):
+        """
+        Wallets that were early in at least 'min_tokens' tokens with a first
+        buy in the last 'days' days, most tokens first (ties: best rank).
+        'wallets' restricts the answer to those addresses.
+
+        Returns dicts {"wallet", "tokens", "best_rank"}.
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        where = "first_buy_at >= ?"
+        params = [cutoff]
+        if chain:
+            where += " AND chain = ?"
+            params.append(chain)
+
+        if wallets is None:
+            chunks = [None]
+        else:
+            lowered = list({w.lower() for w in wallets})
+            chunks = [
+                lowered[i : i + _MAX_PARAMS]
+                for i in range(0, len(lowered), _MAX_PARAMS)
+            ]
+
+        rows = []
+        with self._lock:
+            for chunk in chunks:
+                sql = (
+                    "SELECT wallet, COUNT(*), MIN(rank) FROM early_entries "
+                    f"WHERE {where}"
+                )
+                args = list(params)
+                if chunk is not None:
+                    sql += f" AND wallet IN ({','.join('?' * len(chunk))})"
+                    args += chunk
+                sql += " GROUP BY wallet HAVING COUNT(*) >= ?"
+                args.append(min_tokens)
+                rows.extend(self._conn.execute(sql, args).fetchall())
+
+        rows.sort(key=lambda r: (-r[1], r[2]))
+        if limit is not None:
+            rows = rows[:limit]
+        return [{"wallet": w, "tokens": n, "best_rank": r} for w, n, r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_early_index():
+    """
+    Returns the process-wide EarlyBuyerIndex, creating it from config on first use.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EarlyBuyerIndex(config.EARLY_INDEX_PATH)
+        return _shared
@@ -0,0 +1,398 @@
+"""
+Execution stage for Copier signals.
+
+The Copier puts every new signal on an in-memory queue. One worker thread
+turns each signal into a Uniswap V2 swapExactETHForTokens transaction,
+built from a template precomputed per chain: only amountOutMin, the
+deadline, the token and a locally managed nonce change per order. Live
+orders are quoted concurrently on a small thread pool, so a slow quote
+never holds up the next order; the sends themselves go out one at a time,
+each taking its nonce only then.
+
+EXECUTION_MODE:
+  "paper" (default)  orders are built and recorded but never sent
+  "live"             orders are sent to EXECUTION_RPC_URL, either signed
+                     with EXECUTION_PRIVATE_KEY (needs eth_account) or,
+                     without a key, via eth_sendTransaction from
+                     EXECUTION_FROM (an unlocked account on a dev chain
+                     such as anvil)
+  "off"              no execution stage
+
+Live orders are quoted first (the router's getAmountsOut for the position)
+and carry amountOutMin = quote less EXECUTION_SLIPPAGE_BPS; an order that
+cannot be quoted is not sent. Paper orders are not quoted.
+
+Each order records its latency from signal detection to submission.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import config
+from metrics import get_metrics
+from transport import get_transport
+
+MODES = ("paper", "live")
+
+# swapExactETHForTokens(uint256 amountOutMin, address[] path, address to,
+#                       uint256 deadline)
+SWAP_EXACT_ETH_FOR_TOKENS = "7ff36ab5"
+# getAmountsOut(uint256 amountIn, address[] path)
+GET_AMOUNTS_OUT = "d06ca61f"
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+
+def _word(value):
+    return f"{value:064x}"
+
+
+def _address(address):
+    return address.lower().removeprefix("0x").rjust(64, "0")
+
+
+class SwapTemplate:
+    """
+    A chain's swap transaction with everything but the per-order fields
+    (amountOutMin, deadline, token, nonce) filled in: router, sender,
+    value, gas and the static calldata words.
+    """
+
+    def __init__(
+        self,
+        chain,
+        sender,
+        value_wei,
+        gas,
+        gas_price,
+        deadline_seconds=120,
+    ):
+        spec = config.CHAINS.get(chain, {})
+        if not spec.get("router"):
+            raise ValueError(f"no swap router configured for chain {chain!r}")
+        self.deadline_seconds = deadline_seconds
+        self.router = spec["router"]
+        self.wrapped_native = spec["wrapped_native"]
+        self.value_wei = value_wei
+        self.base = {
+            "chainId": spec["chain_id"],
+            "from": sender,
+            "to": spec["router"],
+            "value": value_wei,
+            "gas": gas,
+            "gasPrice": gas_price,
+        }
+        # Calldata around the per-order words: amountOutMin after the
+        # selector, the deadline after the middle, the token after the tail
+        self.head = "0x" + SWAP_EXACT_ETH_FOR_TOKENS
+        self.middle = _word(0x80) + _address(sender)  # offset of 'path', 'to'
+        self.tail = _word(2) + _address(spec["wrapped_native"])
+
+    def build(self, token, nonce, now=None, min_out=0):
+        deadline = int(now if now is not None else time.time()) + self.deadline_seconds
+        data = (
+            self.head
+            + _word(min_out)
+            + self.middle
+            + _word(deadline)
+            + self.tail
+            + _address(token)
+        )
+        return {**self.base, "nonce": nonce, "data": data}
+
+    def quote_call(self, token):
+        """
+        eth_call parameters for the router's quote of this position.
+        """
+        data = (
+            "0x"
+            + GET_AMOUNTS_OUT
+            + _word(self.value_wei)
+            + _word(0x40)  # offset of 'path'
+            + self.tail
+            + _address(token)
+        )
+        return {"to": self.router, "data": data}
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces for one account without a round trip per
+    order. The first nonce comes from fetch() (the node's pending count),
+    or 'start' without one; reset() makes the next call fetch again.
+    """
+
+    def __init__(self, fetch=None, start=0):
+        self._fetch = fetch
+        self._start = start
+        self._next = None
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            if self._next is None:
+                self._next = self._fetch() if self._fetch else self._start
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def reset(self):
+        with self._lock:
+            self._next = None
+
+
+class Executor:
+    def __init__(
+        self,
+        chain=None,
+        mode=None,
+        rpc_url=None,
+        sender=None,
+        private_key=None,
+        max_orders=1000,
+    ):
+        self.chain = chain or config.TARGET_CHAIN
+        self.mode = mode or config.EXECUTION_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"unknown execution mode {self.mode!r}")
+        self.rpc_url = rpc_url or config.EXECUTION_RPC_URL
+        self.private_key = private_key or config.EXECUTION_PRIVATE_KEY
+        self.sender = sender or config.EXECUTION_FROM or self._key_address()
+        self.http = get_transport()
+        self.queue = queue.Queue()
+        # Most recent orders, oldest first
+        self.orders = deque(maxlen=max_orders)
+        self.nonces = NonceManager(
+            fetch=self._pending_nonce if self.mode == "live" else None
+        )
+        self.template = None
+        self._ids = itertools.count(1)
+        self._pool = None
+        self._thread = None
+        self._lock = threading.Lock()
+        # One send at a time for the account, so nonces stay gapless
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        """
+        Builds the swap template and starts the worker. Safe to call again.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            gas_price = config.EXECUTION_GAS_PRICE_GWEI
+            if gas_price is None:
+                gas_price = int(self._rpc("eth_gasPrice", []), 16) if self._live else 0
+            else:
+                gas_price = int(gas_price * 10**9)
+            self.template = SwapTemplate(
+                self.chain,
+                self.sender,
+                value_wei=int(config.EXECUTION_POSITION_ETH * 10**18),
+                gas=config.EXECUTION_GAS,
+                gas_price=gas_price,
+                deadline_seconds=config.EXECUTION_DEADLINE_SECONDS,
+            )
+            self._pool = ThreadPoolExecutor(
+                max_workers=config.EXECUTION_SUBMIT_WORKERS,
+                thread_name_prefix="submit",
+            )
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print(f"[Executor] Started in {self.mode} mode on {self.chain}.")
+            return True
+
+    def stop(self, timeout=5):
+        """
+        Stops the worker after the queued signals, then waits for submissions.
+        """
+        with self._lock:
+            thread, pool = self._thread, self._pool
+            self._thread = None
+        if thread is None:
+            return
+        self.queue.put(None)
+        thread.join(timeout=timeout)
+        pool.shutdown(wait=True)
+
+    def submit(self, signal, detected_at=None):
+        """
+        Queues a signal for execution. 'detected_at' (epoch seconds, default
+        now) is when the Copier saw it.
+        """
+        self.queue.put((signal, time.time() if detected_at is None else detected_at))
+
+    def stats(self):
+        """
+        Queue depth, order counts by status and detection-to-submission
+        latency percentiles (seconds) of the recent orders.
+        """
+        orders = list(self.orders)
+        latencies = sorted(o["latency"] for o in orders if o["latency"] is not None)
+        statuses = {}
+        for order in orders:
+            statuses[order["status"]] = statuses.get(order["status"], 0) + 1
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)]
+
+        return {
+            "mode": self.mode,
+            "chain": self.chain,
+            "queued": self.queue.qsize(),
+            "orders": statuses,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+        }
+
+    @property
+    def _live(self):
+        return self.mode == "live"
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self._execute(*item)
+            except Exception as e:
+                print(f"Exception in Executor._execute: {e}")
+
+    def _execute(self, signal, detected_at):
+        token = signal.get("token_address")
+        quote_tokens = {t.lower() for t in config.QUOTE_TOKENS}
+        if not token or token.lower() in quote_tokens:
+            return
+
+        order = {
+            "signal": signal.get("tx_hash"),
+            "wallet": signal.get("wallet"),
+            "token": token,
+            "nonce": None,
+            "min_out": 0,
+            "mode": self.mode,
+            "status": "pending",
+            "hash": None,
+            "error": None,
+            "detected_at": detected_at,
+            "submitted_at": None,
+            "latency": None,
+        }
+        self.orders.append(order)
+
+        if self._live:
+            self._pool.submit(self._send, token, order)
+        else:
+            order["nonce"] = self.nonces.next()
+            self._finish(order, "paper")
+
+    def _send(self, token, order):
+        try:
+            # Before any nonce is taken: an order that cannot be quoted
+            # (no pair, RPC error) spends nothing
+            order["min_out"] = self._min_out(token)
+        except Exception as e:
+            self._fail(order, e)
+            return
+
+        with self._send_lock:
+            order["nonce"] = self.nonces.next()
+            try:
+                tx = self.template.build(
+                    token, order["nonce"], min_out=order["min_out"]
+                )
+                if self.private_key:
+                    params = [self._sign(tx)]
+                    order["hash"] = self._rpc("eth_sendRawTransaction", params)
+                else:
+                    params = [{k: _hex(v) for k, v in tx.items() if k != "chainId"}]
+                    order["hash"] = self._rpc("eth_sendTransaction", params)
+                self._finish(order, "submitted")
+            except Exception as e:
+                # The node may never have seen this nonce (timeout, 5xx). No
+                # other send is in flight, so recounting from the node is safe
+                self.nonces.reset()
+                self._fail(order, e)
+
+    def _fail(self, order, error):
+        order["error"] = str(error)
+        self._finish(order, "failed")
+        print(f"Exception submitting order for {order['signal']}: {error}")
+
+    def _finish(self, order, status):
+        order["status"] = status
+        metrics = get_metrics()
+        metrics.inc("execution_orders_total", mode=self.mode, status=status)
+        if status == "failed":
+            return
+        order["submitted_at"] = time.time()
+        order["latency"] = max(order["submitted_at"] - order["detected_at"], 0.0)
+        metrics.observe("execution_latency_seconds", order["latency"], mode=self.mode)
+
+    def _rpc(self, method, params):
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+        response = self.http.post(self.rpc_url, endpoint="rpc", json=payload)
+        response.raise_for_status()
+        body = response.json()
+        if body.get("error"):
+            raise RuntimeError(body["error"].get("message", body["error"]))
+        return body["result"]
+
+    def _min_out(self, token):
+        """
+        The router's quote for the position, less EXECUTION_SLIPPAGE_BPS.
+        """
+        result = self._rpc("eth_call", [self.template.quote_call(token), "latest"])
+        # uint256[] [amountIn, amountOut]: the last word is the token amount
+        amount_out = int(result[-64:], 16) if result and len(result) >= 66 else 0
+        if amount_out <= 0:
+            raise RuntimeError(f"no quote for {token}")
+        return amount_out * (10_000 - config.EXECUTION_SLIPPAGE_BPS) // 10_000
+
+    def _pending_nonce(self):
+        return int(self._rpc("eth_getTransactionCount", [self.sender, "pending"]), 16)
+
+    def _sign(self, tx):
+        from eth_account import Account
+
+        signed = Account.sign_transaction(
+            {k: v for k, v in tx.items() if k != "from"}, self.private_key
+        )
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        return "0x" + bytes(raw).hex()
+
+    def _key_address(self):
+        if not self.private_key:
+            return ZERO_ADDRESS
+        from eth_account import Account
+
+        return Account.from_key(self.private_key).address
+
+
+def _hex(value):
+    return hex(value) if isinstance(value, int) else value
+
+
+def build_executor(chain=None):
+    """
+    Returns an Executor for config.EXECUTION_MODE, or None when execution is
+    "off" or the chain has no swap router configured.
+    """
+    chain = chain or config.TARGET_CHAIN
+    if config.EXECUTION_MODE == "off":
+        return None
+    if not config.CHAINS.get(chain, {}).get("router"):
+        print(f"[Executor] No swap router for {chain}; execution disabled.")
+        return None
+    return Executor(chain)
@@ -0,0 +1,498 @@
+"""
+Local stand-in for BitQuery and GeckoTerminal.
+
+Serves the same GraphQL and REST shapes the pipeline uses, backed by a
+deterministic synthetic market, so Scout, Brain and Copier can be run and
+benchmarked without API keys:
+
+    POST /graphql                              BitQuery dexTrades queries
+    GET  /api/v2/networks/<net>/trending_pools GeckoTerminal pools (?page=N)
+    GET  /api/v2/networks/<net>/new_pools      newest launches first
+    GET  /api/v2/networks/<net>/tokens/multi/<a,b,...>  token prices
+    GET  /stream                               NDJSON feed of live trades
+    POST /rpc                                  minimal EVM JSON-RPC node
+
+Latency and a requests-per-second limit (answered with 429) are
+configurable, and live trades can be injected to measure detection lag.
+"""
+
+import argparse
+import json
+import queue
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WETH = {"symbol": "WETH", "address": "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"}
+BLOCK_SECONDS = 12
+POOLS_PER_PAGE = 20
+
+
+def _time_str(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _parse_time(value):
+    value = value.replace("T", " ").rstrip("Z")
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+
+
+class FakeMarket:
+    """
+    Synthetic tokens, wallets and dexTrades in BitQuery's response shape.
+
+    Each wallet makes round trips (buy a token with WETH, sell it later) with
+    a per-wallet skill that biases its returns, so scoring has a spread of
+    good and bad wallets to rank.
+    """
+
+    def __init__(
+        self, tokens=20, wallets=500, round_trips=10, days=90, seed=7, now=None
+    ):
+        self.rng = random.Random(seed)
+        self.now = now or datetime.now(timezone.utc).replace(microsecond=0)
+        self.genesis = self.now - timedelta(days=days + 30)
+        self._lock = threading.Lock()
+        self._tx = 0
+
+        self.tokens = []
+        for i in range(tokens):
+            launch = self.now - timedelta(days=self.rng.uniform(1, days))
+            self.tokens.append(
+                {
+                    "address": f"0x{self.rng.getrandbits(160):040x}",
+                    "symbol": f"TKN{i}",
+                    "launch": launch,
+                    "price": self.rng.uniform(0.0001, 2.0),
+                    "liquidity": self.rng.uniform(5_000, 5_000_000),
+                    "volume24h": self.rng.uniform(10_000, 20_000_000),
+                }
+            )
+
+        self.wallets = [f"0x{self.rng.getrandbits(160):040x}" for _ in range(wallets)]
+        self.by_taker = {w: [] for w in self.wallets}
+        self.buys_by_token = {t["address"]: [] for t in self.tokens}
+
+        for wallet in self.wallets:
+            skill = self.rng.gauss(0, 0.4)
+            for _ in range(round_trips):
+                token = self.rng.choice(self.tokens)
+                span = (self.now - token["launch"]).total_seconds()
+                bought_at = token["launch"] + timedelta(
+                    seconds=span * self.rng.random() ** 3
+                )
+                sold_at = bought_at + timedelta(
+                    seconds=(self.now - bought_at).total_seconds() * self.rng.random()
+                )
+                usd = self.rng.uniform(100, 10_000)
+                qty = usd / token["price"]
+                proceeds = usd * self.rng.lognormvariate(skill, 0.5)
+                self._add(self._trade(wallet, token, bought_at, usd, qty, buy=True))
+                self._add(self._trade(wallet, token, sold_at, proceeds, qty, buy=False))
+
+        for trades in self.by_taker.values():
+            trades.sort(key=lambda t: t["_ts"])
+        for trades in self.buys_by_token.values():
+            trades.sort(key=lambda t: t["_ts"])
+
+    def _trade(self, wallet, token, at, usd, qty, buy):
+        self._tx += 1
+        token_side = {"symbol": token["symbol"], "address": token["address"]}
+        weth_qty = usd / 3000
+        return {
+            "_ts": at,
+            "transaction": {"hash": f"0x{self._tx:064x}"},
+            "taker": {"address": wallet},
+            "buyCurrency": token_side if buy else WETH,
+            "sellCurrency": WETH if buy else token_side,
+            "buyAmount": qty if buy else weth_qty,
+            "sellAmount": weth_qty if buy else qty,
+            "buyAmountInUsd": usd,
+            "sellAmountInUsd": usd,
+            "block": {
+                "height": self.block_at(at),
+                "timestamp": {"time": _time_str(at)},
+            },
+        }
+
+    def _add(self, trade):
+        self.by_taker.setdefault(trade["taker"]["address"], []).append(trade)
+        if trade["buyCurrency"]["address"] in self.buys_by_token:
+            self.buys_by_token[trade["buyCurrency"]["address"]].append(trade)
+
+    def block_at(self, at):
+        return int((at - self.genesis).total_seconds() // BLOCK_SECONDS)
+
+    def inject_trade(self, wallet, token=None, at=None):
+        """
+        Records a new buy for 'wallet' (default: now) and returns it.
+        """
+        token = token or self.rng.choice(self.tokens)
+        at = at or datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            trade = self._trade(wallet, token, at, 1_000, 1_000 / token["price"], True)
+            self.by_taker.setdefault(wallet, []).append(trade)
+            self.buys_by_token[token["address"]].append(trade)
+        return trade
+
+    def early_buyers(self, token, limit, offset=0, since=None, till=None):
+        with self._lock:
+            trades = list(self.buys_by_token.get(token.lower(), []))
+        if since:
+            start = _parse_time(since)
+            trades = [t for t in trades if t["_ts"] >= start]
+        if till:
+            cutoff = _parse_time(till)
+            trades = [t for t in trades if t["_ts"] <= cutoff]
+        return trades[offset : offset + limit]
+
+    def wallet_trades(
+        self, wallets, limit, since=None, since_block=None, offset=0, ascending=False
+    ):
+        since = _parse_time(since) if since else None
+        with self._lock:
+            trades = [t for w in wallets for t in self.by_taker.get(w.lower(), [])]
+        if since is not None:
+            trades = [t for t in trades if t["_ts"] >= since]
+        if since_block is not None:
+            trades = [t for t in trades if t["block"]["height"] > since_block]
+        trades.sort(key=lambda t: t["_ts"], reverse=not ascending)
+        return trades[offset : offset + limit]
+
+    def token_info(self, addresses):
+        by_address = {t["address"]: t for t in self.tokens}
+        return [
+            {
+                "id": f"eth_{t['address']}",
+                "type": "token",
+                "attributes": {
+                    "address": t["address"],
+                    "name": f"Token {t['symbol']}",
+                    "symbol": t["symbol"],
+                    "decimals": 18,
+                    "price_usd": str(t["price"]),
+                },
+            }
+            for t in (by_address.get(a.lower()) for a in addresses)
+            if t is not None
+        ]
+
+    def pools(self, order="trending"):
+        if order == "new":
+            tokens = sorted(self.tokens, key=lambda t: t["launch"], reverse=True)
+        else:
+            tokens = sorted(self.tokens, key=lambda t: t["volume24h"], reverse=True)
+        return [
+            {
+                "id": f"eth_0xpool{t['address'][6:]}",
+                "type": "pool",
+                "attributes": {
+                    "name": f"{t['symbol']} / WETH",
+                    "address": f"0xpool{t['address'][6:]}",
+                    "base_token_price_usd": str(t["price"]),
+                    "reserve_in_usd": str(t["liquidity"]),
+                    "volume_usd": {"h24": str(t["volume24h"])},
+                    "pool_created_at": t["launch"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                },
+                "relationships": {
+                    "base_token": {"data": {"id": f"eth_{t['address']}"}},
+                    "quote_token": {"data": {"id": f"eth_{WETH['address']}"}},
+                },
+            }
+            for t in tokens
+        ]
+
+
+def _public(trade):
+    return {k: v for k, v in trade.items() if not k.startswith("_")}
+
+
+class FakeServer:
+    """
+    Runs a FakeMarket behind a threaded HTTP server on 127.0.0.1.
+
+    'latency' (seconds) is added to every response; 'rate_limit' caps
+    requests per second (None = unlimited), answering 429 beyond it.
+    """
+
+    def __init__(self, market=None, latency=0.0, rate_limit=None, port=0):
+        self.market = market or FakeMarket()
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._tokens = float(rate_limit or 0)
+        self._refilled_at = time.monotonic()
+        self._subscribers = []
+        self._stopping = threading.Event()
+        # Transactions accepted by /rpc, the next nonce per sender and
+        # nonces queued ahead of a gap
+        self.transactions = []
+        self._nonces = Counter()
+        self._queued = set()
+        # Lowercase token addresses the router has no pair for (quotes revert)
+        self.unpaired = set()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def bitquery_url(self):
+        return f"{self.url}/graphql"
+
+    @property
+    def gecko_url(self):
+        return f"{self.url}/api/v2"
+
+    @property
+    def stream_url(self):
+        return f"{self.url}/stream"
+
+    @property
+    def rpc_url(self):
+        return f"{self.url}/rpc"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def inject_trade(self, wallet, token=None):
+        """
+        Adds a live trade and pushes it to stream subscribers.
+        """
+        trade = self.market.inject_trade(wallet, token)
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(trade)
+        return trade
+
+    def _allow(self):
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                float(self.rate_limit),
+                self._tokens + (now - self._refilled_at) * self.rate_limit,
+            )
+            self._refilled_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _count(self, route):
+        with self._lock:
+            self.requests[route] += 1
+
+    def _graphql(self, body):
+        variables = body.get("variables") or {}
+        limit = variables.get("limit", 25)
+
+        if "token" in variables:
+            trades = self.market.early_buyers(
+                variables["token"],
+                limit,
+                offset=variables.get("offset") or 0,
+                since=variables.get("since"),
+                till=variables.get("till"),
+            )
+        elif "wallets" in variables:
+            trades = self.market.wallet_trades(
+                variables["wallets"],
+                limit,
+                since=variables.get("since"),
+                since_block=variables.get("since_block"),
+                offset=variables.get("offset") or 0,
+                ascending="asc:" in (body.get("query") or ""),
+            )
+        elif "wallet" in variables:
+            trades = self.market.wallet_trades([variables["wallet"]], limit)
+        else:
+            return {"errors": [{"message": "unsupported query"}]}
+
+        return {"data": {"ethereum": {"dexTrades": [_public(t) for t in trades]}}}
+
+    def _rpc(self, body):
+        # Like a dev chain with unlocked accounts: eth_sendTransaction is
+        # accepted from any sender, and nonces below its count are rejected
+        method, params = body.get("method"), body.get("params") or []
+        reply = {"jsonrpc": "2.0", "id": body.get("id")}
+
+        if method == "eth_chainId":
+            return {**reply, "result": hex(1)}
+        if method == "eth_gasPrice":
+            return {**reply, "result": hex(10**9)}
+        if method == "eth_call":
+            # Router quote: getAmountsOut(amountIn, path) -> [amountIn, 1000x]
+            data = params[0].get("data", "")
+            if not data.startswith("0xd06ca61f") or "0x" + data[-40:] in self.unpaired:
+                return {**reply, "error": {"code": -32000, "message": "reverted"}}
+            amount_in = int(data[10:74], 16)
+            words = [0x20, 2, amount_in, amount_in * 1000]
+            return {**reply, "result": "0x" + "".join(f"{w:064x}" for w in words)}
+        if method == "eth_getTransactionCount":
+            with self._lock:
+                return {**reply, "result": hex(self._nonces[params[0].lower()])}
+        if method == "eth_sendTransaction":
+            tx = params[0]
+            sender, nonce = tx["from"].lower(), int(tx["nonce"], 16)
+            with self._lock:
+                if nonce < self._nonces[sender] or (sender, nonce) in self._queued:
+                    error = {"code": -32000, "message": "nonce too low"}
+                    return {**reply, "error": error}
+                # Out-of-order nonces wait until the gap before them fills
+                self._queued.add((sender, nonce))
+                while (sender, self._nonces[sender]) in self._queued:
+                    self._queued.discard((sender, self._nonces[sender]))
+                    self._nonces[sender] += 1
+                self.transactions.append(tx)
+                tx_hash = f"0x{len(self.transactions):064x}"
+            return {**reply, "result": tx_hash}
+        return {**reply, "error": {"code": -32601, "message": "method not found"}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _throttle(self, route):
+                server._count(route)
+                if not server._allow():
+                    server._count("429")
+                    self._send_json(
+                        429, {"errors": ["rate limited"]}, {"Retry-After": "1"}
+                    )
+                    return False
+                if server.latency:
+                    time.sleep(server.latency)
+                return True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if urlparse(self.path).path == "/rpc":
+                    if self._throttle("rpc"):
+                        self._send_json(200, server._rpc(body))
+                elif self._throttle("graphql"):
+                    self._send_json(200, server._graphql(body))
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/stream":
+                    return self._stream()
+
+                tokens = re.match(
+                    r"^/api/v2/networks/[^/]+/tokens/multi/(.+)$", parsed.path
+                )
+                if tokens:
+                    if self._throttle("tokens_multi"):
+                        addresses = tokens.group(1).split(",")
+                        data = server.market.token_info(addresses)
+                        self._send_json(200, {"data": data})
+                    return
+
+                match = re.match(
+                    r"^/api/v2/networks/[^/]+/(trending_pools|new_pools)$", parsed.path
+                )
+                if not match:
+                    return self._send_json(404, {"errors": ["not found"]})
+                if not self._throttle(match.group(1)):
+                    return
+
+                page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+                order = "new" if match.group(1) == "new_pools" else "trending"
+                pools = server.market.pools(order)
+                start = (page - 1) * POOLS_PER_PAGE
+                self._send_json(200, {"data": pools[start : start + POOLS_PER_PAGE]})
+
+            def _stream(self):
+                server._count("stream")
+                subscriber = queue.Queue()
+                with server._lock:
+                    server._subscribers.append(subscriber)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    while not server._stopping.is_set():
+                        try:
+                            trade = subscriber.get(timeout=1)
+                            line = json.dumps(_public(trade)) + "\n"
+                        except queue.Empty:
+                            line = "\n"  # keep-alive
+                        # One HTTP chunk per line so clients see it immediately
+                        data = line.encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._lock:
+                        server._subscribers.remove(subscriber)
+                    self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--wallets", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    args = parser.parse_args()
+
+    market = FakeMarket(tokens=args.tokens, wallets=args.wallets)
+    server = FakeServer(
+        market, latency=args.latency, rate_limit=args.rate_limit, port=args.port
+    )
+    print(f"Fake BitQuery:      BITQUERY_URL={server.bitquery_url}")
+    print(f"Fake GeckoTerminal: GECKOTERMINAL_URL={server.gecko_url}")
+    print(f"Trade stream:       STREAM_URL={server.stream_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
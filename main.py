@@ -1,69 +1,109 @@
+"""
+Interactive run of the whole pipeline. With arguments, runs the headless
+CLI instead (see cli.py), e.g. 'python main.py scout --chain base'.
+"""
+
+import sys
 import config
-from scout import Scout
-from brain import Brain
-from copier import Copier
 
 
 def main():
+    # Imported here so the headless commands don't pay for them
+    import requests
+    from scout import Scout
+    from brain import Brain
+    from copier_daemon import CopierClient
+    from discovery import scan_chains
+    from metrics import start_export
+    from profile_store import get_profile_store
+    from trade_store import get_trade_store
+
     print("=== AI Wallet Copy Trader v0.1 ===")
+    start_export()
 
     # 1. Initialize Components
-    scout = Scout()
-    brain = Brain()
-    copier = Copier()
+    copier = CopierClient()
 
     # Check keys
     if not config.BITQUERY_API_KEY:
         print("[!] Missing BITQUERY_API_KEY. Analysis will fail.")
 
-    # 2. Run Discovery (Scout)
-    print("\n--- Phase 1: Scout (Discovery) ---")
-    trending_tokens = scout.get_trending_tokens(limit=5)
-
-    if not trending_tokens:
+    # 2 & 3. Discovery (Scout) and Analysis (Brain), all chains at once
+    print(f"\n--- Phase 1-2: Scout & Brain ({', '.join(config.TARGET_CHAINS)}) ---")
+    scout = Scout()
+    # Stored profiles younger than PROFILE_MAX_AGE are reused, not rescored
+    profiles = get_profile_store()
+    # Fetched trades are kept in the columnar trade history (TRADE_STORE_PATH)
+    trade_store = get_trade_store()
+    brains = {
+        chain: Brain(chain, profiles=profiles, trade_store=trade_store)
+        for chain in config.TARGET_CHAINS
+    }
+    tokens_by_chain, ranked_wallets = scan_chains(
+        config.TARGET_CHAINS, token_limit=5, buyer_limit=20, scout=scout, brains=brains
+    )
+
+    if not any(tokens_by_chain.values()):
         print("No trending tokens found or API error. Exiting.")
         return
 
-    print(f"Found {len(trending_tokens)} trending tokens.")
-    for t in trending_tokens:
-        print(f"> {t['symbol']} ({t['address']})")
-
-    # 3. Run Analysis (Brain)
-    print("\n--- Phase 2: Brain (Analysis) ---")
-    all_smart_wallets = []
-
-    for token in trending_tokens:
-        print(f"finding early buyers for {token['symbol']}...")
-        buyers = brain.find_early_buyers(token["address"], limit=20)
+    for chain, tokens in tokens_by_chain.items():
+        for t in tokens:
+            print(f"> [{chain}] {t['symbol']} ({t['address']})")
 
-        # Add to pool (deduplicate later)
-        all_smart_wallets.extend(buyers)
+    print(f"Identified {len(ranked_wallets)} high-scoring candidate wallets.")
+    for kind, counts in scout.cache.stats().items():
+        hits = counts["memory_hits"] + counts["disk_hits"]
+        print(f"Cache [{kind}]: {hits} hits, {counts['misses']} misses")
 
-    unique_wallets = list(set(all_smart_wallets))
-    print(f"Identified {len(unique_wallets)} unique candidate wallets.")
-
-    if unique_wallets:
-        print("Scoring wallets...")
-        ranked_wallets = brain.score_wallets(unique_wallets)
-
-        top_picks = ranked_wallets[:5]
+    # The copier follows TARGET_CHAIN only
+    watchable = [w for w in ranked_wallets if w["chain"] == config.TARGET_CHAIN]
+    if watchable:
+        top_picks = watchable[:5]
         print(f"\nTop {len(top_picks)} High-Performing Wallets:")
         for w in top_picks:
             print(f"Address: {w['address']} | Score: {w['score']}")
 
         # 4. Start Execution (Copier)
         print("\n--- Phase 3: Copier (Execution) ---")
-        copier.update_watchlist([w["address"] for w in top_picks])
-
         response = input("Start listening for trades? (y/n): ")
-        if response.lower() == "y":
-            copier.start_listening()
-        else:
+        if response.lower() != "y":
             print("Done. Copy execution skipped.")
+            return
+
+        # The copier runs in a background worker that outlives this script
+        if not copier.spawn():
+            print(f"Copier worker did not start; see {config.COPIER_DAEMON_LOG}.")
+            return
+        try:
+            copier.update_watchlist(
+                [w["address"] for w in top_picks],
+                scores={w["address"]: w["score"] for w in top_picks},
+            )
+            copier.start()
+        except requests.RequestException:
+            status = None
+        else:
+            status = copier.health()
+        if status is None:
+            print(
+                "Copier worker stopped responding after start; "
+                f"see {config.COPIER_DAEMON_LOG}."
+            )
+            return
+        print(
+            f"Copier worker (pid {status['pid']}) is watching "
+            f"{status['watchlist_size']} wallets. Stop it from the dashboard "
+            f"or with: python copier_daemon.py --shutdown"
+        )
 
     else:
         print("No wallets found to analyze.")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import cli
+
+        sys.exit(cli.main())
     main()
@@ -0,0 +1,311 @@
+"""
+Process-wide counters, gauges and latency histograms.
+
+Scout, Brain, Copier, the HTTP transport and the response cache record
+into one registry (get_metrics()). It can be exported as Prometheus text
+over a local HTTP endpoint (METRICS_PORT), or as a JSON file rewritten
+every METRICS_FILE_INTERVAL seconds (METRICS_FILE); the copier worker
+also serves it at /metrics on its control port. Copier shard processes
+send their registries to the worker, which exports them with a "shard"
+label.
+
+With PROFILE_SCANS, each Copier scan cycle is run under cProfile and the
+stats are dumped to SCAN_PROFILE_DIR (newest SCAN_PROFILE_KEEP kept).
+"""
+
+import atexit
+import bisect
+import contextlib
+import cProfile
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+# Upper bounds in seconds; the last bucket catches everything else
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._gauges = {}
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._absorbed = {}  # source -> (snapshot, extra labels)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 3)
+            hist[bisect.bisect_left(self.buckets, value)] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """
+        Observes the duration of the 'with' block, even if it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def request_hook(self, endpoint, method, url, status, elapsed, attempt, error):
+        """
+        Transport hook: latency, status and retry counts per endpoint.
+        """
+        self.observe("api_request_seconds", elapsed, endpoint=endpoint)
+        self.inc("api_requests_total", endpoint=endpoint, status=status or "error")
+        if error is not None or (status or 0) >= 400:
+            self.inc("api_errors_total", endpoint=endpoint)
+        if attempt:
+            self.inc("api_retries_total", endpoint=endpoint)
+
+    def absorb(self, source, snapshot, **labels):
+        """
+        Exports another process's snapshot() (e.g. a copier shard's) along
+        with this registry, its series tagged with 'labels'. Each call
+        replaces what 'source' reported before.
+        """
+        with self._lock:
+            self._absorbed[source] = (
+                snapshot,
+                {k: str(v) for k, v in labels.items()},
+            )
+
+    def forget(self, source):
+        with self._lock:
+            self._absorbed.pop(source, None)
+
+    def snapshot(self):
+        """
+        Returns the current values as a JSON-serialisable dict.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+            absorbed = list(self._absorbed.values())
+
+        def series(items, value):
+            return [
+                {"name": name, "labels": dict(labels), **value(v)}
+                for (name, labels), v in items
+            ]
+
+        bounds = [str(b) for b in self.buckets] + ["+Inf"]
+        snapshot = {
+            "time": time.time(),
+            "counters": series(counters.items(), lambda v: {"value": v}),
+            "gauges": series(gauges.items(), lambda v: {"value": v}),
+            "histograms": series(
+                histograms.items(),
+                lambda h: {
+                    "buckets": dict(zip(bounds, h[:-2])),
+                    "sum": h[-2],
+                    "count": h[-1],
+                },
+            ),
+        }
+        for other, labels in absorbed:
+            for kind in ("counters", "gauges", "histograms"):
+                snapshot[kind] += [
+                    {**s, "labels": {**s["labels"], **labels}} for s in other[kind]
+                ]
+        return snapshot
+
+    def render_prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        # Each metric family's samples must be contiguous
+        for kind in ("counters", "gauges"):
+            for s in sorted(snapshot[kind], key=lambda s: s["name"]):
+                header(s["name"], kind[:-1])
+                lines.append(f"{s['name']}{_format(s['labels'])} {s['value']}")
+        for s in sorted(snapshot["histograms"], key=lambda s: s["name"]):
+            header(s["name"], "histogram")
+            cumulative = 0
+            for bound, count in s["buckets"].items():
+                cumulative += count
+                labels = _format({**s["labels"], "le": bound})
+                lines.append(f"{s['name']}_bucket{labels} {cumulative}")
+            lines.append(f"{s['name']}_sum{_format(s['labels'])} {s['sum']}")
+            lines.append(f"{s['name']}_count{_format(s['labels'])} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """
+        Rewrites 'path' atomically with the current snapshot.
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._absorbed.clear()
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+_shared = Metrics()
+_exporters = []
+_exporters_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Returns the process-wide Metrics registry.
+    """
+    return _shared
+
+
+def start_export(port=None, path=None, interval=None, process=None):
+    """
+    Starts the exporters enabled in config (or by the arguments): a
+    Prometheus endpoint on localhost:'port' and/or a JSON file at 'path'
+    rewritten every 'interval' seconds. Safe to call more than once.
+    Returns the HTTP server, if one was started.
+
+    Each process has its own registry, so a second process passes a
+    'process' name: its JSON file becomes e.g. metrics.copier.json, and it
+    serves no METRICS_PORT endpoint of its own (the copier worker's metrics
+    are on its control port's /metrics). A port already in use is reported
+    and skipped, not raised.
+    """
+    if process:
+        port = 0 if port is None else port
+        root, ext = os.path.splitext(path or config.METRICS_FILE)
+        path = f"{root}.{process}{ext}" if root else ""
+    port = config.METRICS_PORT if port is None else port
+    path = path or ("" if process else config.METRICS_FILE)
+    interval = interval or config.METRICS_FILE_INTERVAL
+    metrics = get_metrics()
+    server = None
+
+    with _exporters_lock:
+        if _exporters:
+            return None
+
+        if port:
+            try:
+                server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+            except OSError as e:
+                print(f"[Metrics] Not serving on port {port}: {e}")
+            else:
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                _exporters.append(server)
+                print(
+                    "[Metrics] Serving "
+                    f"http://127.0.0.1:{server.server_address[1]}/metrics"
+                )
+
+        if path:
+
+            def write_forever():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        metrics.write_json(path)
+                    except OSError as e:
+                        print(f"Exception writing metrics to {path}: {e}")
+
+            threading.Thread(target=write_forever, daemon=True).start()
+            # Short runs (main.py) still leave a final snapshot behind
+            atexit.register(metrics.write_json, path)
+            _exporters.append(path)
+
+    return server
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = get_metrics().render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body = json.dumps(get_metrics().snapshot()).encode()
+            content_type = "application/json"
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextlib.contextmanager
+def scan_profiler(label="scan"):
+    """
+    Runs the 'with' block under cProfile when config.PROFILE_SCANS is set and
+    dumps the stats to SCAN_PROFILE_DIR/<label>-<timestamp>.prof (load with
+    pstats or snakeviz). Otherwise does nothing.
+    """
+    if not config.PROFILE_SCANS:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(config.SCAN_PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+        profiler.dump_stats(
+            os.path.join(config.SCAN_PROFILE_DIR, f"{label}-{stamp}.prof")
+        )
+
+        # Keep only the newest SCAN_PROFILE_KEEP dumps
+        dumps = sorted(glob.glob(os.path.join(config.SCAN_PROFILE_DIR, "*.prof")))
+        for old in dumps[: -config.SCAN_PROFILE_KEEP]:
+            os.remove(old)
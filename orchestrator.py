@@ -0,0 +1,390 @@
+"""
+Long-running Scout -> Brain -> Copier pipeline.
+
+Each stage runs on its own threads, connected by bounded queues:
+
+    scout     pages trending/new pools of every chain every SCAN_INTERVAL
+      -> tokens queue
+    buyers    early buyers per token, recorded in the early-buyer index
+      -> candidates queue
+    scoring   Brain.score_wallets per token's new candidates
+      -> scored queue
+    watchlist keeps the best-ranked TARGET_CHAIN wallets and pushes the
+              top ORCHESTRATOR_WATCHLIST_SIZE to the copier when they change
+
+A rescored wallet replaces its old ranking, or drops out if it no longer
+scores above MIN_WALLET_SCORE; wallets not rescored within
+ORCHESTRATOR_RANKED_TTL seconds are dropped too.
+
+A stage that falls behind fills its inbox, and the stage before it then
+blocks on put(), all the way back to Scout, which stops requesting pages.
+Time spent blocked is reported per stage as 'blocked_seconds'.
+
+stop() lets every worker finish its current item and exits; items still
+queued are dropped (they are rediscovered on the next scan).
+
+    python orchestrator.py            # until Ctrl-C / SIGTERM
+    python cli.py run                 # same, JSON stats on exit
+"""
+
+import queue
+import signal
+import threading
+import time
+import config
+from metrics import get_metrics
+
+# Seconds between checks of the stop flag while waiting on a queue
+_POLL = 0.25
+
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def done(self, busy, count=1):
+        with self._lock:
+            self.processed += count
+            self.busy_seconds += busy
+        get_metrics().inc("orchestrator_items_total", count, stage=self.name)
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+        get_metrics().inc("orchestrator_errors_total", stage=self.name)
+
+    def blocked(self, seconds):
+        with self._lock:
+            self.blocked_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "per_sec": self.processed / elapsed,
+                "busy_seconds": self.busy_seconds,
+                "blocked_seconds": self.blocked_seconds,
+            }
+
+
+class Orchestrator:
+    def __init__(
+        self,
+        copier,
+        chains=None,
+        scout=None,
+        brains=None,
+        index=None,
+        prices=None,
+        scan_interval=None,
+        queue_sizes=None,
+        workers=None,
+    ):
+        # Defaults are built here, not imported at module level, so the
+        # CLI only loads pandas when the pipeline actually runs
+        from brain import Brain
+        from early_index import get_early_index
+        from prices import get_price_service
+        from profile_store import get_profile_store
+        from scout import Scout
+        from trade_store import get_trade_store
+
+        self.copier = copier
+        self.chains = chains or config.TARGET_CHAINS
+        self.scout = scout or Scout()
+        self.brains = dict(brains or {})
+        for chain in self.chains:
+            if chain not in self.brains:
+                self.brains[chain] = Brain(
+                    chain, profiles=get_profile_store(), trade_store=get_trade_store()
+                )
+        self.index = index or get_early_index()
+        self.prices = prices or get_price_service()
+        self.scan_interval = (
+            config.ORCHESTRATOR_SCAN_INTERVAL
+            if scan_interval is None
+            else scan_interval
+        )
+        sizes = {**config.ORCHESTRATOR_QUEUE_SIZES, **(queue_sizes or {})}
+        self.workers = {**config.ORCHESTRATOR_WORKERS, **(workers or {})}
+
+        self.queues = {
+            name: queue.Queue(maxsize=sizes[name])
+            for name in ("tokens", "candidates", "scored")
+        }
+        self.stats = {
+            "scout": StageStats("scout", 1),
+            "buyers": StageStats("buyers", self.workers["buyers"]),
+            "scoring": StageStats("scoring", self.workers["scoring"]),
+            "watchlist": StageStats("watchlist", 1),
+        }
+        # Brain's running aggregates are not thread-safe; one scorer per chain
+        self._score_locks = {chain: threading.Lock() for chain in self.chains}
+        self._seen_tokens = {}  # (chain, token) -> monotonic time queued
+        self._seen_wallets = set()
+        self._seen_lock = threading.Lock()
+        self.ranked = {}  # lowercase address -> scored wallet
+        self._ranked_at = {}  # lowercase address -> monotonic time scored
+        self.watchlist = []
+        self.scans = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """
+        Starts every stage's workers. Returns immediately.
+        """
+        self._stop.clear()
+        self._spawn("scout", self._scout_loop)
+        for _ in range(self.workers["buyers"]):
+            self._spawn(
+                "buyers",
+                self._worker,
+                "buyers",
+                self.queues["tokens"],
+                self._find_buyers,
+                self.queues["candidates"],
+            )
+        for _ in range(self.workers["scoring"]):
+            self._spawn(
+                "scoring",
+                self._worker,
+                "scoring",
+                self.queues["candidates"],
+                self._score,
+                self.queues["scored"],
+            )
+        self._spawn("watchlist", self._watchlist_loop)
+        print(f"[Orchestrator] Running on {', '.join(self.chains)}.")
+
+    def stop(self, timeout=30):
+        """
+        Lets each worker finish its current item, then waits for them.
+        """
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0.0))
+        self._threads = []
+        print("[Orchestrator] Stopped.")
+
+    def run_forever(self):
+        """
+        Runs until SIGINT/SIGTERM, then stops gracefully. Returns the final
+        stats_snapshot().
+        """
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: self._stop.set())
+        self.start()
+        while not self._stop.wait(1.0):
+            pass
+        self.stop()
+        return self.stats_snapshot()
+
+    def stats_snapshot(self):
+        """
+        Per-stage counts, throughput and busy/blocked time, plus queue depths.
+        """
+        return {
+            "scans": self.scans,
+            "stages": {name: s.snapshot() for name, s in self.stats.items()},
+            "queues": {
+                name: {"depth": q.qsize(), "max": q.maxsize}
+                for name, q in self.queues.items()
+            },
+            "watchlist": list(self.watchlist),
+        }
+
+    def _spawn(self, name, target, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _put(self, q, item, stats):
+        # Blocks while the next stage is behind; that is the backpressure
+        # (blocked time is added as it accrues, so stats show a stall live)
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                q.put(item, timeout=_POLL)
+                return
+            except queue.Full:
+                stats.blocked(time.monotonic() - started)
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return None
+
+    def _worker(self, name, inbox, handle, outbox):
+        stats = self.stats[name]
+        while True:
+            item = self._get(inbox)
+            if item is None:
+                return
+            started = time.monotonic()
+            try:
+                outputs = handle(item)
+            except Exception as e:
+                stats.error()
+                print(f"Exception in orchestrator stage {name}: {e}")
+                continue
+            stats.done(time.monotonic() - started)
+            for output in outputs:
+                self._put(outbox, output, stats)
+            self._gauge()
+
+    def _scout_loop(self):
+        from discovery import compact_history
+
+        stats = self.stats["scout"]
+        refresh = config.ORCHESTRATOR_TOKEN_REFRESH
+        while not self._stop.is_set():
+            started = time.monotonic()
+            with self._seen_lock:
+                self._seen_wallets.clear()
+            self._seen_tokens = {
+                k: t for k, t in self._seen_tokens.items() if started - t < refresh
+            }
+            for chain in self.chains:
+                try:
+                    tokens = self.scout.iter_tokens(
+                        limit=config.ORCHESTRATOR_TOKENS_PER_SCAN, chain=chain
+                    )
+                    mark = time.monotonic()
+                    for token in tokens:
+                        if self._stop.is_set():
+                            break
+                        key = (chain, token["address"].lower())
+                        if key in self._seen_tokens:
+                            continue
+                        self._seen_tokens[key] = time.monotonic()
+                        self.prices.record(chain, {token["address"]: token["price"]})
+                        # Busy time is paging and filtering, not waiting on put()
+                        stats.done(time.monotonic() - mark)
+                        self._put(self.queues["tokens"], token, stats)
+                        mark = time.monotonic()
+                except Exception as e:
+                    stats.error()
+                    print(f"Exception in orchestrator scout ({chain}): {e}")
+            self.scans += 1
+            # The scoring stage appends a file per day on every refresh
+            compact_history(self.brains)
+            self._gauge()
+            elapsed = time.monotonic() - started
+            self._stop.wait(max(self.scan_interval - elapsed, 0.0))
+
+    def _find_buyers(self, token):
+        from discovery import select_candidates
+
+        chain = token["chain"]
+        entries = self.brains[chain].find_early_buyer_entries(
+            token["address"], limit=config.ORCHESTRATOR_BUYERS_PER_TOKEN
+        )
+        with self._seen_lock:
+            wallets = select_candidates(
+                chain, token["address"], entries, self._seen_wallets, self.index
+            )
+        return [(token, wallets)] if wallets else []
+
+    def _score(self, item):
+        token, wallets = item
+        chain = token["chain"]
+        with self._score_locks[chain]:
+            ranked = self.brains[chain].score_wallets(
+                wallets, source_token=token["address"]
+            )
+        for wallet in ranked:
+            wallet["chain"] = chain
+        # Every scored wallet is passed on, so ones that fell below
+        # MIN_WALLET_SCORE leave the ranking
+        return [(wallets, ranked)]
+
+    def _watchlist_loop(self):
+        stats = self.stats["watchlist"]
+        interval = config.ORCHESTRATOR_WATCHLIST_INTERVAL
+        published_at = None
+        dirty = False
+        while not self._stop.is_set():
+            try:
+                scored, ranked = self.queues["scored"].get(timeout=_POLL)
+            except queue.Empty:
+                scored = None
+            if scored:
+                now = time.monotonic()
+                for wallet in scored:
+                    self.ranked.pop(wallet.lower(), None)
+                    self._ranked_at.pop(wallet.lower(), None)
+                for wallet in ranked:
+                    self.ranked[wallet["address"].lower()] = wallet
+                    self._ranked_at[wallet["address"].lower()] = now
+                dirty = True
+
+            due = published_at is None or time.monotonic() - published_at >= interval
+            if due and self._expire():
+                dirty = True
+            if dirty and due:
+                started = time.monotonic()
+                try:
+                    self._publish()
+                    stats.done(time.monotonic() - started)
+                except Exception as e:
+                    stats.error()
+                    print(f"Exception updating the copier watchlist: {e}")
+                published_at = time.monotonic()
+                dirty = False
+
+    def _expire(self):
+        # Drops wallets not rescored within ORCHESTRATOR_RANKED_TTL
+        cutoff = time.monotonic() - config.ORCHESTRATOR_RANKED_TTL
+        expired = [a for a, at in self._ranked_at.items() if at < cutoff]
+        for address in expired:
+            del self.ranked[address]
+            del self._ranked_at[address]
+        return bool(expired)
+
+    def _publish(self):
+        # The copier follows TARGET_CHAIN only
+        candidates = [
+            w for w in self.ranked.values() if w.get("chain") == config.TARGET_CHAIN
+        ]
+        candidates.sort(key=lambda w: w["score"], reverse=True)
+        top = candidates[: config.ORCHESTRATOR_WATCHLIST_SIZE]
+        wallets = [w["address"] for w in top]
+        if wallets == self.watchlist:
+            return
+        self.copier.update_watchlist(
+            wallets, scores={w["address"]: w["score"] for w in top}
+        )
+        self.watchlist = wallets
+        print(f"[Orchestrator] Watchlist updated: {len(wallets)} wallets.")
+
+    def _gauge(self):
+        metrics = get_metrics()
+        for name, q in self.queues.items():
+            metrics.set("orchestrator_queue_depth", q.qsize(), queue=name)
+
+
+if __name__ == "__main__":
+    from copier_daemon import CopierClient
+
+    client = CopierClient()
+    if not client.spawn():
+        print(f"Copier worker did not start; see {config.COPIER_DAEMON_LOG}.")
+    else:
+        client.start()
+        print(Orchestrator(client).run_forever())
@@ -0,0 +1,276 @@
+"""
+Token metadata and USD prices for many tokens at once.
+
+Prices come from GeckoTerminal's multi-token lookup, up to
+PRICE_BATCH_SIZE addresses per request, and are kept in memory for
+PRICE_TTL seconds. Every price seen, fetched or recorded from Scout's pool
+listings, is appended to a SQLite history (prices.db) that answers "price
+at time T" without another request. Metadata (symbol, name, decimals) is
+stored once per token.
+"""
+
+import sqlite3
+import threading
+import time
+import config
+from metrics import get_metrics
+from request_scheduler import get_request_scheduler
+from transport import get_rate_limiter, get_transport
+
+# SQLite's default limit on bound parameters is 999
+_MAX_PARAMS = 500
+
+TOKEN_FIELDS = ("symbol", "name", "decimals")
+
+
+class PriceService:
+    def __init__(self, path="prices.db", ttl=None, batch_size=None, scheduler=None):
+        self.path = path
+        self.ttl = config.PRICE_TTL if ttl is None else ttl
+        self.batch_size = batch_size or config.PRICE_BATCH_SIZE
+        self.base_url = config.GECKOTERMINAL_URL
+        self.headers = {"Accept": "application/json;version=20230302"}
+        self.http = get_transport()
+        # The shared scheduler is only opened on first request
+        self._scheduler = scheduler
+        # (chain, token) -> (expires_at, token info)
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tokens (
+                chain TEXT NOT NULL,
+                token TEXT NOT NULL,
+                symbol TEXT,
+                name TEXT,
+                decimals INTEGER,
+                PRIMARY KEY (chain, token)
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_history (
+                chain TEXT NOT NULL,
+                token TEXT NOT NULL,
+                time REAL NOT NULL,
+                price_usd REAL NOT NULL,
+                PRIMARY KEY (chain, token, time)
+            )
+            """)
+        self._conn.commit()
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            self._scheduler = get_request_scheduler()
+        return self._scheduler
+
+    @scheduler.setter
+    def scheduler(self, scheduler):
+        self._scheduler = scheduler
+
+    def get(self, chain, tokens):
+        """
+        Current metadata and price of 'tokens', keyed by lowercase address:
+        {"address", "symbol", "name", "decimals", "price_usd", "fetched_at"}.
+        Tokens cached within the TTL cost nothing; the rest are fetched in
+        batches. Tokens GeckoTerminal does not know are left out.
+        """
+        now = time.time()
+        # Every chain is EVM, so addresses are keyed lowercase whatever
+        # checksum casing the caller used
+        wanted = {t.lower(): t for t in tokens if t}
+        found = {}
+        with self._lock:
+            for token in wanted:
+                entry = self._memory.get((chain, token))
+                if entry is not None and entry[0] > now:
+                    found[token] = entry[1]
+        metrics = get_metrics()
+        metrics.inc("price_lookups_total", len(found), result="hit")
+
+        missing = [t for key, t in wanted.items() if key not in found]
+        metrics.inc("price_lookups_total", len(missing), result="miss")
+        for i in range(0, len(missing), self.batch_size):
+            try:
+                fetched = self._fetch(chain, missing[i : i + self.batch_size])
+            except Exception as e:
+                print(f"Exception fetching token prices: {e}")
+                continue
+            self._remember(chain, fetched)
+            found.update(fetched)
+        return found
+
+    def prices(self, chain, tokens):
+        """
+        {lowercase address: current USD price} for the tokens that have one.
+        """
+        return {
+            token: info["price_usd"]
+            for token, info in self.get(chain, tokens).items()
+            if info["price_usd"] is not None
+        }
+
+    def value(self, chain, positions):
+        """
+        USD value of each (token, quantity) pair, or None where the token has
+        no price. All tokens are priced together.
+        """
+        positions = list(positions)
+        prices = self.prices(chain, [token for token, _ in positions if token])
+        values = []
+        for token, qty in positions:
+            price = prices.get((token or "").lower())
+            try:
+                values.append(None if price is None else float(qty) * price)
+            except (TypeError, ValueError):
+                values.append(None)
+        return values
+
+    def record(self, chain, prices, at=None):
+        """
+        Adds already-known prices ({token: USD price}, e.g. from pool
+        listings) to the history without a request.
+        """
+        at = time.time() if at is None else at
+        rows = []
+        for token, price in prices.items():
+            try:
+                rows.append((chain, token.lower(), at, float(price)))
+            except (AttributeError, TypeError, ValueError):
+                continue
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO price_history (chain, token, time, price_usd) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def price_at(self, chain, token, at):
+        """
+        The last recorded price of 'token' at or before 'at' (epoch seconds).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT price_usd FROM price_history "
+                "WHERE chain = ? AND token = ? AND time <= ? "
+                "ORDER BY time DESC LIMIT 1",
+                (chain, token.lower(), at),
+            ).fetchone()
+        return row[0] if row else None
+
+    def history(self, chain, token, start=None, end=None):
+        """
+        [(time, price_usd)] recorded for 'token', oldest first.
+        """
+        sql = "SELECT time, price_usd FROM price_history WHERE chain = ? AND token = ?"
+        params = [chain, token.lower()]
+        if start is not None:
+            sql += " AND time >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND time <= ?"
+            params.append(end)
+        with self._lock:
+            return self._conn.execute(sql + " ORDER BY time", params).fetchall()
+
+    def metadata(self, chain, tokens):
+        """
+        Stored symbol/name/decimals of 'tokens', keyed by lowercase address.
+        """
+        lowered = list({t.lower() for t in tokens})
+        found = {}
+        with self._lock:
+            for i in range(0, len(lowered), _MAX_PARAMS):
+                chunk = lowered[i : i + _MAX_PARAMS]
+                rows = self._conn.execute(
+                    "SELECT token, " + ", ".join(TOKEN_FIELDS) + " FROM tokens "
+                    f"WHERE chain = ? AND token IN ({','.join('?' * len(chunk))})",
+                    [chain] + chunk,
+                )
+                for row in rows:
+                    found[row[0]] = dict(zip(TOKEN_FIELDS, row[1:]))
+        return found
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _fetch(self, chain, tokens):
+        spec = config.CHAINS[chain]
+        get_rate_limiter(
+            f"geckoterminal:{chain}", spec["requests_per_minute"]
+        ).acquire()
+        self.scheduler.acquire(
+            "geckoterminal",
+            self.scheduler.estimate_cost("geckoterminal"),
+            lane=config.QUERY_LANES.get("token_prices", "discovery"),
+        )
+        url = (
+            f"{self.base_url}/networks/{spec['geckoterminal']}/tokens/multi/"
+            + ",".join(tokens)
+        )
+        response = self.http.get(url, endpoint="geckoterminal", headers=self.headers)
+        response.raise_for_status()
+
+        fetched_at = time.time()
+        found = {}
+        for item in response.json().get("data", []):
+            attributes = item.get("attributes", {})
+            address = attributes.get("address")
+            if not address:
+                continue
+            price = attributes.get("price_usd")
+            found[address.lower()] = {
+                "address": address,
+                "symbol": attributes.get("symbol"),
+                "name": attributes.get("name"),
+                "decimals": attributes.get("decimals"),
+                "price_usd": float(price) if price is not None else None,
+                "fetched_at": fetched_at,
+            }
+        return found
+
+    def _remember(self, chain, fetched):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            # Drop expired entries so the memory cache stays bounded
+            self._memory = {k: v for k, v in self._memory.items() if v[0] > now}
+            for token, info in fetched.items():
+                self._memory[(chain, token)] = (expires_at, info)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokens (chain, token, "
+                + ", ".join(TOKEN_FIELDS)
+                + ") VALUES (?, ?, ?, ?, ?)",
+                [
+                    (chain, token) + tuple(info[f] for f in TOKEN_FIELDS)
+                    for token, info in fetched.items()
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO price_history (chain, token, time, price_usd) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (chain, token, info["fetched_at"], info["price_usd"])
+                    for token, info in fetched.items()
+                    if info["price_usd"] is not None
+                ],
+            )
+            self._conn.commit()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_price_service():
+    """
+    Returns the process-wide PriceService, creating it from config on first use.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PriceService(config.PRICE_PATH)
+        return _shared
@@ -0,0 +1,215 @@
+import json
+import sqlite3
+import threading
+import time
+import config
+
+# SQLite's default limit on bound parameters is 999
+_MAX_PARAMS = 500
+
+PROFILE_FIELDS = ("address", "score", "reason", "win_rate", "roi", "trades", "age_days")
+
+
+class ProfileStore:
+    """
+    Persistent wallet profiles and the Copier's last watchlist.
+
+    A profile is what Brain.score_wallets reports for a wallet (score and
+    the win rate / ROI / trades / age behind it), plus when it was last
+    refreshed and which tokens the wallet was found through. Profiles are
+    keyed by (chain, lowercase address); the caller's spelling is kept.
+    """
+
+    def __init__(self, path="profiles.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                chain TEXT NOT NULL,
+                wallet TEXT NOT NULL,
+                address TEXT NOT NULL,
+                score REAL,
+                reason TEXT,
+                win_rate REAL,
+                roi REAL,
+                trades INTEGER,
+                age_days REAL,
+                source_tokens TEXT NOT NULL DEFAULT '[]',
+                refreshed_at REAL NOT NULL,
+                PRIMARY KEY (chain, wallet)
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_profiles_refreshed "
+            "ON profiles (chain, refreshed_at)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS watchlist (
+                position INTEGER PRIMARY KEY,
+                wallet TEXT NOT NULL,
+                score REAL
+            )
+            """)
+        self._conn.commit()
+
+    def save(self, chain, profiles, source_token=None, now=None):
+        """
+        Inserts or refreshes profiles (dicts shaped like score_wallets'
+        output), stamping them with 'now'. 'source_token' is added to each
+        wallet's source tokens.
+        """
+        profiles = list(profiles)
+        now = time.time() if now is None else now
+        with self._lock:
+            sources = self._sources(chain, [p["address"] for p in profiles])
+            rows = []
+            for profile in profiles:
+                wallet = profile["address"].lower()
+                tokens = sources.get(wallet, [])
+                if source_token and source_token not in tokens:
+                    tokens.append(source_token)
+                rows.append(
+                    (chain, wallet)
+                    + tuple(profile.get(field) for field in PROFILE_FIELDS)
+                    + (json.dumps(tokens), now)
+                )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO profiles (chain, wallet, "
+                + ", ".join(PROFILE_FIELDS)
+                + ", source_tokens, refreshed_at) VALUES ("
+                + ", ".join("?" * (len(PROFILE_FIELDS) + 4))
+                + ")",
+                rows,
+            )
+            self._conn.commit()
+
+    def add_source(self, chain, wallets, token):
+        """
+        Records that already-profiled 'wallets' were also found through 'token'.
+        """
+        with self._lock:
+            sources = self._sources(chain, wallets)
+            updates = [
+                (json.dumps(tokens + [token]), chain, wallet)
+                for wallet, tokens in sources.items()
+                if token not in tokens
+            ]
+            self._conn.executemany(
+                "UPDATE profiles SET source_tokens = ? WHERE chain = ? AND wallet = ?",
+                updates,
+            )
+            self._conn.commit()
+
+    def fresh(self, chain, wallets, max_age, now=None):
+        """
+        Profiles of 'wallets' refreshed within the last 'max_age' seconds,
+        keyed by lowercase address.
+        """
+        now = time.time() if now is None else now
+        return {
+            p["address"].lower(): p
+            for p in self._select(chain, wallets, "refreshed_at >= ?", [now - max_age])
+        }
+
+    def get(self, chain, wallet):
+        profiles = self._select(chain, [wallet])
+        return profiles[0] if profiles else None
+
+    def stale(self, chain, max_age, now=None, limit=None):
+        """
+        Addresses whose profiles are older than 'max_age' seconds, oldest first.
+        """
+        now = time.time() if now is None else now
+        sql = (
+            "SELECT address FROM profiles WHERE chain = ? AND refreshed_at < ? "
+            "ORDER BY refreshed_at"
+        )
+        params = [chain, now - max_age]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def save_watchlist(self, wallets, scores=None):
+        """
+        Replaces the stored watchlist (order is kept).
+        """
+        scores = scores or {}
+        with self._lock:
+            self._conn.execute("DELETE FROM watchlist")
+            self._conn.executemany(
+                "INSERT INTO watchlist (position, wallet, score) VALUES (?, ?, ?)",
+                [(i, w, scores.get(w)) for i, w in enumerate(wallets)],
+            )
+            self._conn.commit()
+
+    def load_watchlist(self):
+        """
+        Returns the last saved watchlist as (wallets, scores).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT wallet, score FROM watchlist ORDER BY position"
+            ).fetchall()
+        wallets = [wallet for wallet, _ in rows]
+        scores = {wallet: score for wallet, score in rows if score is not None}
+        return wallets, scores
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _select(self, chain, wallets, where=None, params=None):
+        lowered = list({w.lower() for w in wallets})
+        profiles = []
+        with self._lock:
+            for i in range(0, len(lowered), _MAX_PARAMS):
+                chunk = lowered[i : i + _MAX_PARAMS]
+                sql = (
+                    "SELECT "
+                    + ", ".join(PROFILE_FIELDS)
+                    + ", source_tokens, refreshed_at FROM profiles "
+                    f"WHERE chain = ? AND wallet IN ({','.join('?' * len(chunk))})"
+                )
+                args = [chain] + chunk
+                if where:
+                    sql += f" AND {where}"
+                    args += params
+                for row in self._conn.execute(sql, args):
+                    profile = dict(zip(PROFILE_FIELDS, row))
+                    profile["source_tokens"] = json.loads(row[-2])
+                    profile["refreshed_at"] = row[-1]
+                    profiles.append(profile)
+        return profiles
+
+    def _sources(self, chain, wallets):
+        # Callers hold the lock
+        lowered = list({w.lower() for w in wallets})
+        sources = {}
+        for i in range(0, len(lowered), _MAX_PARAMS):
+            chunk = lowered[i : i + _MAX_PARAMS]
+            rows = self._conn.execute(
+                "SELECT wallet, source_tokens FROM profiles "
+                f"WHERE chain = ? AND wallet IN ({','.join('?' * len(chunk))})",
+                [chain] + chunk,
+            )
+            sources.update((wallet, json.loads(tokens)) for wallet, tokens in rows)
+        return sources
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_profile_store():
+    """
+    Returns the process-wide ProfileStore, creating it from config on first use.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ProfileStore(config.PROFILE_PATH)
+        return _shared
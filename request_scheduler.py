@@ -0,0 +1,243 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import config
+from metrics import get_metrics
+
+LANES = ("live", "rescoring", "discovery")
+
+# Shared buckets: how often a waiting request re-reads the bucket (other
+# processes cannot notify it), and how long a waiter's heartbeat counts
+_SHARED_POLL = 0.25
+_WAITER_TTL = 5.0
+
+
+class RequestScheduler:
+    """
+    Admission control for API requests.
+
+    Each provider has a token bucket of 'budgets[provider]' points per
+    minute (bursting up to one minute's worth). A request asks for its
+    estimated cost in points on one of the priority 'lanes', highest first:
+
+      * it waits while any higher lane has a request waiting, and
+      * lower lanes may not spend the last 'reserves[lane]' share of the
+        bucket, which stays available to the lanes above them.
+
+    Requests are deferred, never rejected: acquire() blocks until the
+    points are available. Providers without a budget are not limited.
+
+    With a 'path', the buckets and the waiting requests live in a SQLite
+    file, so every process using it (discovery, the copier worker, its
+    shards) spends from the same budget and the lanes compete across
+    processes. Without one, the buckets are local to this process.
+    """
+
+    def __init__(self, budgets=None, reserves=None, lanes=LANES, path=None):
+        self.budgets = dict(budgets or {})
+        self.reserves = dict(reserves or {})
+        self.lanes = tuple(lanes)
+        self.path = path
+        self._cond = threading.Condition()
+        self._tokens = {p: float(b) for p, b in self.budgets.items()}
+        self._refilled_at = {p: time.monotonic() for p in self.budgets}
+        self._waiting = {p: dict.fromkeys(self.lanes, 0) for p in self.budgets}
+        self._conn = None
+        if path:
+            # Autocommit mode; acquire() opens its own IMMEDIATE transactions
+            self._conn = sqlite3.connect(
+                path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    provider TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    refilled_at REAL NOT NULL
+                )
+                """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS waiting (
+                    ticket TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    lane INTEGER NOT NULL,
+                    seen_at REAL NOT NULL
+                )
+                """)
+            self._tickets = itertools.count()
+
+    def estimate_cost(self, provider, variables=None):
+        """
+        Points a request is expected to use: REQUEST_COSTS[provider]'s base
+        cost plus a per-row cost for the result limit it asks for.
+        """
+        spec = config.REQUEST_COSTS.get(provider, {})
+        limit = (variables or {}).get("limit") or 0
+        return spec.get("base", 1) + spec.get("per_row", 0) * limit
+
+    def acquire(self, provider, cost=1, lane="discovery"):
+        """
+        Blocks until 'cost' points of 'provider' can be spent on 'lane'.
+        Returns the seconds spent waiting.
+        """
+        budget = self.budgets.get(provider)
+        if budget is None:
+            return 0.0
+        if lane not in self.lanes:
+            raise ValueError(f"unknown lane {lane!r}")
+
+        rank = self.lanes.index(lane)
+        # A request larger than the bucket could never run; cap it
+        cost = min(cost, budget)
+        floor = budget * self.reserves.get(lane, 0.0)
+        started = time.monotonic()
+
+        if self._conn is not None:
+            self._acquire_shared(provider, budget, cost, floor, rank)
+        else:
+            self._acquire_local(provider, budget, cost, floor, rank)
+
+        waited = time.monotonic() - started
+        metrics = get_metrics()
+        metrics.inc("scheduler_points_total", cost, provider=provider, lane=lane)
+        metrics.observe("scheduler_wait_seconds", waited, provider=provider, lane=lane)
+        return waited
+
+    def _acquire_local(self, provider, budget, cost, floor, rank):
+        lane = self.lanes[rank]
+        with self._cond:
+            waiting = self._waiting[provider]
+            waiting[lane] += 1
+            try:
+                while True:
+                    self._refill(provider)
+                    tokens = self._tokens[provider]
+                    ahead = any(waiting[l] for l in self.lanes[:rank])
+                    if not ahead and tokens - cost >= min(floor, budget - cost):
+                        self._tokens[provider] = tokens - cost
+                        break
+                    # Sleep until enough points have refilled, or until a
+                    # higher lane finishes and notifies
+                    needed = cost + min(floor, budget - cost) - tokens
+                    self._cond.wait(max(needed, 0.0) * 60 / budget or 0.05)
+            finally:
+                waiting[lane] -= 1
+                self._cond.notify_all()
+
+    def _acquire_shared(self, provider, budget, cost, floor, rank):
+        # Each waiting request keeps a heartbeat row, so requests in other
+        # processes see it; rows of crashed processes expire
+        ticket = f"{os.getpid()}:{next(self._tickets)}"
+        try:
+            while True:
+                with self._cond:
+                    now = time.time()
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        tokens = self._shared_tokens(provider, budget, now)
+                        ahead = self._conn.execute(
+                            "SELECT 1 FROM waiting WHERE provider = ? AND lane < ? "
+                            "AND seen_at > ? LIMIT 1",
+                            (provider, rank, now - _WAITER_TTL),
+                        ).fetchone()
+                        granted = not ahead and tokens - cost >= min(
+                            floor, budget - cost
+                        )
+                        if granted:
+                            tokens -= cost
+                            self._conn.execute(
+                                "DELETE FROM waiting WHERE ticket = ?", (ticket,)
+                            )
+                        else:
+                            self._conn.execute(
+                                "INSERT OR REPLACE INTO waiting "
+                                "(ticket, provider, lane, seen_at) VALUES (?, ?, ?, ?)",
+                                (ticket, provider, rank, now),
+                            )
+                        self._conn.execute(
+                            "UPDATE buckets SET tokens = ?, refilled_at = ? "
+                            "WHERE provider = ?",
+                            (tokens, now, provider),
+                        )
+                        self._conn.execute("COMMIT")
+                    except BaseException:
+                        self._conn.execute("ROLLBACK")
+                        raise
+                if granted:
+                    return
+                needed = cost + min(floor, budget - cost) - tokens
+                time.sleep(min(max(needed, 0.0) * 60 / budget, _SHARED_POLL) or 0.05)
+        except BaseException:
+            with self._cond:
+                self._conn.execute("DELETE FROM waiting WHERE ticket = ?", (ticket,))
+            raise
+
+    def _shared_tokens(self, provider, budget, now):
+        # Caller holds an IMMEDIATE transaction. Refills by wall-clock time,
+        # the only clock processes share; also drops expired waiters.
+        self._conn.execute(
+            "DELETE FROM waiting WHERE seen_at <= ?", (now - _WAITER_TTL,)
+        )
+        row = self._conn.execute(
+            "SELECT tokens, refilled_at FROM buckets WHERE provider = ?", (provider,)
+        ).fetchone()
+        if row is None:
+            self._conn.execute(
+                "INSERT INTO buckets (provider, tokens, refilled_at) VALUES (?, ?, ?)",
+                (provider, float(budget), now),
+            )
+            return float(budget)
+        tokens, refilled_at = row
+        elapsed = max(now - refilled_at, 0.0)
+        return min(float(budget), tokens + elapsed * budget / 60)
+
+    def available(self, provider):
+        """
+        Points currently in 'provider''s bucket (None if unlimited).
+        """
+        with self._cond:
+            if provider not in self.budgets:
+                return None
+            if self._conn is not None:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    return self._shared_tokens(
+                        provider, self.budgets[provider], time.time()
+                    )
+                finally:
+                    self._conn.execute("COMMIT")
+            self._refill(provider)
+            return self._tokens[provider]
+
+    def _refill(self, provider):
+        # Caller holds self._cond
+        now = time.monotonic()
+        budget = self.budgets[provider]
+        elapsed = max(now - self._refilled_at[provider], 0.0)
+        self._refilled_at[provider] = now
+        self._tokens[provider] = min(
+            float(budget), self._tokens[provider] + elapsed * budget / 60
+        )
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_request_scheduler():
+    """
+    Returns the process's RequestScheduler, creating it from config on first
+    use. With REQUEST_BUDGET_PATH, its buckets are shared with every other
+    process using that file.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RequestScheduler(
+                budgets=config.REQUEST_BUDGETS,
+                reserves=config.LANE_RESERVES,
+                path=config.REQUEST_BUDGET_PATH or None,
+            )
+        return _shared
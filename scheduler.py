@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class WatchScheduler:
+    """
+    Decides which watched wallets to poll next.
+
+    Every wallet has its own polling interval. High-score wallets start
+    closer to 'min_interval', low-score ones closer to 'max_interval'. Each
+    poll that finds nothing stretches the interval by 'idle_backoff'; a poll
+    that finds a trade drops it straight back to 'min_interval'.
+
+    Polls are issued in batches of 'batch_size' wallets, one request each,
+    and a token bucket caps the batches at 'requests_per_minute'. Wallets
+    that are due when the budget is spent wait for the next refill, most
+    overdue first.
+    """
+
+    def __init__(
+        self,
+        min_interval=60,
+        max_interval=3600,
+        idle_backoff=1.5,
+        requests_per_minute=30,
+        batch_size=50,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_backoff = idle_backoff
+        self.requests_per_minute = requests_per_minute
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._state = {}  # wallet -> {"score", "idle", "active", "next_due"}
+        self._heap = []  # (next_due, seq, wallet); stale entries are skipped
+        self._seq = itertools.count()
+        self._tokens = float(requests_per_minute)
+        self._refilled_at = time.monotonic()
+
+    def set_wallets(self, wallets, scores=None, now=None):
+        """
+        Syncs the schedule with a new watchlist. Wallets already scheduled
+        keep their state; new ones are due immediately; missing ones are
+        dropped. Returns (added, removed).
+        """
+        wanted = set(wallets)
+        with self._lock:
+            removed = [w for w in self._state if w not in wanted]
+        self.remove_wallets(removed)
+        return self.add_wallets(wallets, scores=scores, now=now), removed
+
+    def add_wallets(self, wallets, scores=None, now=None):
+        """
+        Schedules new wallets (due immediately) and updates the score of
+        those already scheduled, if given. Returns the wallets added.
+        """
+        now = time.monotonic() if now is None else now
+        scores = scores or {}
+        added = []
+        with self._lock:
+            for wallet in wallets:
+                state = self._state.get(wallet)
+                if state is None:
+                    self._state[wallet] = {
+                        "score": scores.get(wallet, 50),
+                        "idle": 0,
+                        "active": False,
+                        "next_due": now,
+                    }
+                    self._push(wallet, now)
+                    added.append(wallet)
+                elif wallet in scores:
+                    state["score"] = scores[wallet]
+        return added
+
+    def remove_wallets(self, wallets):
+        """
+        Drops wallets from the schedule; their heap entries go stale.
+        """
+        with self._lock:
+            for wallet in wallets:
+                self._state.pop(wallet, None)
+
+    def set_budget(self, requests_per_minute):
+        """
+        Changes the request budget, e.g. when wallets are split across more
+        copier shards.
+        """
+        with self._lock:
+            self.requests_per_minute = requests_per_minute
+            self._tokens = min(self._tokens, float(requests_per_minute))
+
+    def interval(self, wallet):
+        """
+        Current polling interval for 'wallet' in seconds.
+        """
+        state = self._state[wallet]
+        if state["active"]:
+            return self.min_interval
+        priority = min(max(state["score"], 0), 100) / 100
+        base = self.max_interval - (self.max_interval - self.min_interval) * priority
+        stretched = base * self.idle_backoff ** state["idle"]
+        return min(max(stretched, self.min_interval), self.max_interval)
+
+    def due(self, now=None):
+        """
+        Pops the wallets due for a poll, limited by the request budget.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._refill(now)
+            capacity = int(self._tokens) * self.batch_size
+            wallets = []
+
+            while self._heap and len(wallets) < capacity:
+                next_due, _, wallet = self._heap[0]
+                if next_due > now:
+                    break
+                heapq.heappop(self._heap)
+                state = self._state.get(wallet)
+                if state is None or state["next_due"] != next_due:
+                    continue  # removed or rescheduled since this entry
+                wallets.append(wallet)
+                # Parked until record() reschedules it
+                state["next_due"] = None
+
+            batches = -(-len(wallets) // self.batch_size)
+            self._tokens -= batches
+            return wallets
+
+    def record(self, wallet, active, now=None):
+        """
+        Reschedules 'wallet' after a poll; 'active' means a new trade was seen.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._state.get(wallet)
+            if state is None:
+                return
+            state["idle"] = 0 if active else state["idle"] + 1
+            state["active"] = active
+            state["next_due"] = now + self.interval(wallet)
+            self._push(wallet, state["next_due"])
+
+    def next_wakeup(self, now=None):
+        """
+        Seconds until the next wallet is due (0 if one is due now).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Drop stale heap entries so the top is the real next due time
+            while self._heap:
+                next_due, _, wallet = self._heap[0]
+                state = self._state.get(wallet)
+                if state is not None and state["next_due"] == next_due:
+                    break
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return self.max_interval
+            wait = max(self._heap[0][0] - now, 0.0)
+            if self._tokens < 1:
+                # Budget exhausted; wait for the next token as well
+                refill = (1 - self._tokens) * 60 / self.requests_per_minute
+                wait = max(wait, refill)
+            return wait
+
+    def __len__(self):
+        return len(self._state)
+
+    def _push(self, wallet, next_due):
+        heapq.heappush(self._heap, (next_due, next(self._seq), wallet))
+
+    def _refill(self, now):
+        elapsed = max(now - self._refilled_at, 0.0)
+        self._refilled_at = now
+        self._tokens = min(
+            float(self.requests_per_minute),
+            self._tokens + elapsed * self.requests_per_minute / 60,
+        )
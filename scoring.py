@@ -0,0 +1,259 @@
+import numpy as np
+import pandas as pd
+import config
+
+LEG_DTYPES = {
+    "wallet": "object",
+    "token": "object",
+    "symbol": "object",
+    "side": "object",
+    "qty": "float64",
+    "usd": "float64",
+    "time": "datetime64[ns, UTC]",
+    "block": "int64",
+    "tx_hash": "object",
+}
+LEG_COLUMNS = list(LEG_DTYPES)
+
+
+def trades_to_legs(trades):
+    """
+    Flattens BitQuery dexTrades into one row per token leg.
+
+    Every swap is two legs from the taker's point of view: a "buy" of
+    buyCurrency and a "sell" of sellCurrency, both valued at the trade's USD
+    size. Legs in quote tokens (WETH, stables, native ETH) are dropped, since
+    they are the currency positions are measured in, not positions.
+    """
+    if not trades:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in LEG_DTYPES.items()})
+
+    df = pd.json_normalize(trades)
+
+    def col(name, default=np.nan):
+        return df[name] if name in df else pd.Series(default, index=df.index)
+
+    # BitQuery often prices only one side of a swap
+    usd = pd.to_numeric(col("buyAmountInUsd"), errors="coerce").fillna(0.0)
+    sell_usd = pd.to_numeric(col("sellAmountInUsd"), errors="coerce").fillna(0.0)
+    usd = usd.where(usd > 0, sell_usd)
+
+    common = {
+        "wallet": col("taker.address", "").fillna("").str.lower(),
+        "usd": usd,
+        "time": pd.to_datetime(col("block.timestamp.time"), utc=True, errors="coerce"),
+        "block": pd.to_numeric(col("block.height", 0), errors="coerce")
+        .fillna(0)
+        .astype("int64"),
+        "tx_hash": col("transaction.hash", None),
+    }
+    buys = pd.DataFrame(
+        {
+            **common,
+            "token": col("buyCurrency.address", "").fillna("").str.lower(),
+            "symbol": col("buyCurrency.symbol", None),
+            "side": "buy",
+            "qty": pd.to_numeric(col("buyAmount"), errors="coerce").fillna(0.0),
+        }
+    )
+    sells = pd.DataFrame(
+        {
+            **common,
+            "token": col("sellCurrency.address", "").fillna("").str.lower(),
+            "symbol": col("sellCurrency.symbol", None),
+            "side": "sell",
+            "qty": pd.to_numeric(col("sellAmount"), errors="coerce").fillna(0.0),
+        }
+    )
+
+    legs = pd.concat([buys, sells], ignore_index=True)[LEG_COLUMNS]
+    quote_tokens = {t.lower() for t in config.QUOTE_TOKENS}
+    legs = legs[(legs["token"] != "") & ~legs["token"].isin(quote_tokens)]
+    return legs.sort_values(["time", "block"], kind="stable").reset_index(drop=True)
+
+
+def compute_wallet_metrics(legs, now=None):
+    """
+    Computes per-wallet performance from token legs in one columnar pass.
+    Returns a DataFrame indexed by wallet (see WalletAggregates.metrics).
+    """
+    aggregates = WalletAggregates()
+    aggregates.apply(legs)
+    return aggregates.metrics(now=now)
+
+
+class WalletAggregates:
+    """
+    Running per-wallet totals that are updated from new trades only.
+
+    'positions' holds, per (wallet, token), the quantity and USD cost bought
+    and the quantity sold so far. 'wallets' holds trade count, closed trades,
+    wins, realized PnL/cost, first/last seen time and the last block applied.
+    Sells are matched against the average price of all earlier buys of the
+    same token (quantity sold beyond what was bought is ignored), so a batch
+    of new legs can be applied with groupby/cumsum on top of the stored
+    totals, and rescoring a known wallet only needs its trades since
+    last_block.
+    """
+
+    POSITION_COLUMNS = ["bought_qty", "bought_cost", "sold_qty"]
+    SUM_COLUMNS = ["trades", "closed", "wins", "realized_pnl", "realized_cost"]
+
+    def __init__(self):
+        self.positions = pd.DataFrame(
+            columns=self.POSITION_COLUMNS,
+            index=pd.MultiIndex.from_arrays([[], []], names=["wallet", "token"]),
+            dtype="float64",
+        )
+        self.wallets = pd.DataFrame(
+            {
+                **{c: pd.Series(dtype="float64") for c in self.SUM_COLUMNS},
+                "first_seen": pd.Series(dtype="datetime64[ns, UTC]"),
+                "last_seen": pd.Series(dtype="datetime64[ns, UTC]"),
+                "last_block": pd.Series(dtype="int64"),
+            }
+        )
+        self.wallets.index.name = "wallet"
+
+    def cursors(self):
+        """
+        Returns {wallet: last block applied} for every known wallet.
+        """
+        return self.wallets["last_block"].astype(int).to_dict()
+
+    def apply(self, legs):
+        """
+        Folds new legs into the running totals. Legs at or below a wallet's
+        last applied block are skipped, so overlapping fetches are harmless.
+        Returns the number of legs applied.
+        """
+        last_block = legs["wallet"].map(self.wallets["last_block"]).fillna(-1)
+        legs = legs[legs["block"] > last_block]
+        if legs.empty:
+            return 0
+
+        legs = legs.sort_values(["time", "block"], kind="stable")
+        is_buy = legs["side"] == "buy"
+        keys = [legs["wallet"], legs["token"]]
+
+        # Totals before this batch for each leg's position
+        prior = self.positions.reindex(
+            pd.MultiIndex.from_arrays(keys), fill_value=0.0
+        ).to_numpy()
+
+        buy_qty = legs["qty"].where(is_buy, 0.0)
+        buy_cost = legs["usd"].where(is_buy, 0.0)
+        sell_qty = legs["qty"].where(~is_buy, 0.0)
+        bought_qty = buy_qty.groupby(keys).cumsum() + prior[:, 0]
+        bought_cost = buy_cost.groupby(keys).cumsum() + prior[:, 1]
+        sold_qty = sell_qty.groupby(keys).cumsum() + prior[:, 2]
+
+        # Quantity still held before this sell, from buys we have seen
+        held = bought_qty - (sold_qty - legs["qty"])
+        matched = np.minimum(legs["qty"], held).clip(lower=0.0).where(~is_buy, 0.0)
+        avg_price = (bought_cost / bought_qty.where(bought_qty > 0)).fillna(0.0)
+        fraction = (matched / legs["qty"].where(legs["qty"] > 0)).fillna(0.0)
+
+        cost = matched * avg_price
+        pnl = legs["usd"] * fraction - cost
+        closed = matched > 0
+
+        position_delta = (
+            pd.DataFrame(
+                {
+                    "wallet": legs["wallet"],
+                    "token": legs["token"],
+                    "bought_qty": buy_qty,
+                    "bought_cost": buy_cost,
+                    "sold_qty": sell_qty,
+                }
+            )
+            .groupby(["wallet", "token"])
+            .sum()
+        )
+        self.positions = self.positions.add(position_delta, fill_value=0.0)
+
+        per_leg = pd.DataFrame(
+            {
+                "wallet": legs["wallet"],
+                "closed": closed,
+                "wins": closed & (pnl > 0),
+                "realized_pnl": pnl.where(closed, 0.0),
+                "realized_cost": cost.where(closed, 0.0),
+            }
+        )
+        grouped = legs.groupby("wallet")
+        delta = per_leg.groupby("wallet").sum().astype("float64")
+        delta["trades"] = grouped["tx_hash"].nunique()
+
+        old = self.wallets.reindex(delta.index)
+        updated = old[self.SUM_COLUMNS].fillna(0.0) + delta[self.SUM_COLUMNS]
+        updated["first_seen"] = pd.concat(
+            [old["first_seen"], grouped["time"].min()], axis=1
+        ).min(axis=1)
+        updated["last_seen"] = pd.concat(
+            [old["last_seen"], grouped["time"].max()], axis=1
+        ).max(axis=1)
+        updated["last_block"] = (
+            pd.concat([old["last_block"], grouped["block"].max()], axis=1)
+            .max(axis=1)
+            .astype("int64")
+        )
+
+        self.wallets = pd.concat(
+            [self.wallets.drop(updated.index, errors="ignore"), updated]
+        )
+        return len(legs)
+
+    def metrics(self, wallets=None, now=None):
+        """
+        Returns finalized metrics (see finalize_metrics) for 'wallets'
+        (lowercase addresses) or for every known wallet.
+        """
+        now = now or pd.Timestamp.now(tz="UTC")
+        totals = self.wallets
+        if wallets is not None:
+            totals = totals[totals.index.isin(wallets)]
+        return finalize_metrics(totals, now)
+
+
+def finalize_metrics(metrics, now):
+    """
+    Derives the ratio columns (win_rate, roi, age_days) from raw totals.
+    """
+    metrics = metrics.copy()
+    for column in ("trades", "closed", "wins"):
+        metrics[column] = metrics[column].astype(int)
+    metrics["win_rate"] = (
+        metrics["wins"] / metrics["closed"].where(metrics["closed"] > 0)
+    ).fillna(0.0)
+    metrics["roi"] = (
+        metrics["realized_pnl"]
+        / metrics["realized_cost"].where(metrics["realized_cost"] > 0)
+    ).fillna(0.0)
+    metrics["age_days"] = (
+        (now - metrics["first_seen"]).dt.total_seconds() / 86400
+    ).clip(lower=0.0)
+    return metrics
+
+
+def score_metrics(metrics):
+    """
+    Weighted 0-100 score from WEIGHT_WIN_RATE / WEIGHT_ROI / WEIGHT_AGE.
+    ROI saturates at SCORE_ROI_CAP and age at SCORE_AGE_CAP_DAYS; wallets with
+    fewer than MIN_CLOSED_TRADES closed trades score 0.
+    """
+    roi = (
+        metrics["roi"].clip(lower=0.0, upper=config.SCORE_ROI_CAP)
+        / config.SCORE_ROI_CAP
+    )
+    age = (
+        metrics["age_days"].clip(upper=config.SCORE_AGE_CAP_DAYS)
+        / config.SCORE_AGE_CAP_DAYS
+    )
+    score = 100 * (
+        config.WEIGHT_WIN_RATE * metrics["win_rate"]
+        + config.WEIGHT_ROI * roi
+        + config.WEIGHT_AGE * age
+    )
+    return score.where(metrics["closed"] >= config.MIN_CLOSED_TRADES, 0.0).round(1)
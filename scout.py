@@ -1,114 +1,180 @@
-import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import config
+from cache import get_cache
+from metrics import get_metrics
+from request_scheduler import get_request_scheduler
+from transport import get_rate_limiter, get_transport
 
 
 class Scout:
-    def __init__(self):
+    def __init__(self, scheduler=None, cache=None):
         # GeckoTerminal API (Free, rate limited)
-        self.base_url = "https://api.geckoterminal.com/api/v2"
+        self.base_url = config.GECKOTERMINAL_URL
         self.headers = {"Accept": "application/json;version=20230302"}
-        # Mapping config.TARGET_CHAIN to GeckoTerminal network slugs
-        self.chain_map = {"ethereum": "eth", "solana": "solana", "base": "base"}
-
-    def get_trending_tokens(self, limit=10):
+        # Mapping chain names to GeckoTerminal network slugs
+        self.chain_map = {
+            chain: spec["geckoterminal"] for chain, spec in config.CHAINS.items()
+        }
+        self.http = get_transport()
+        # The shared scheduler and cache are only opened on first request
+        self._scheduler = scheduler
+        self._cache = cache
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            self._scheduler = get_request_scheduler()
+        return self._scheduler
+
+    @scheduler.setter
+    def scheduler(self, scheduler):
+        self._scheduler = scheduler
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_cache()
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+
+    def get_trending_tokens(self, limit=10, chain=None, sources=None):
         """
-        Fetches trending pools from GeckoTerminal.
-        Returns a list of token dictionaries.
+        Returns up to 'limit' qualified tokens for 'chain' (default
+        config.TARGET_CHAIN) from iter_tokens, in the order they were found.
         """
-        chain_slug = self.chain_map.get(config.TARGET_CHAIN, "eth")
-        endpoint = f"/networks/{chain_slug}/trending_pools"
-
+        chain = chain or config.TARGET_CHAIN
         try:
-            url = f"{self.base_url}{endpoint}"
-            # GeckoTerminal provides paginated included data, but trending pools
-            # usually returns the pools directly in 'data'.
-
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            data = response.json()
-
-            pools = data.get("data", [])
-            return self._process_pools(pools, limit)
-
+            with get_metrics().timer(
+                "pipeline_phase_seconds", phase="scout", chain=chain
+            ):
+                return list(self.iter_tokens(limit=limit, chain=chain, sources=sources))
         except Exception as e:
             print(f"Exception in get_trending_tokens: {e}")
             return []
 
-    def _process_pools(self, pools, limit):
+    def iter_tokens(self, limit=None, chain=None, sources=None, max_pages=None):
         """
-        Extracts token info from pool data.
-        GeckoTerminal returns pools, so we extract the base token.
+        Streams qualified tokens from GeckoTerminal pool listings.
+
+        Every source in 'sources' (default config.SCOUT_SOURCES, e.g.
+        trending_pools and new_pools) is paged concurrently, up to
+        'max_pages' pages each. Pools are filtered by liquidity and volume
+        as each page arrives and deduplicated by base token, so a token
+        traded in several pools is yielded once, tagged with its chain and
+        the source it was first seen in. No further pages are requested
+        once 'limit' tokens have been yielded.
         """
-        qualified_tokens = []
-
-        for pool in pools:
-            if len(qualified_tokens) >= limit:
-                break
-
-            attributes = pool.get("attributes", {})
-
-            # Filter by volume/liquidity if provided in attributes
-            # GeckoTerminal response structure:
-            # attributes: { volume_usd: { h24: "..." }, reserve_in_usd: "..." }
-
-            try:
-                vol_24h = float(attributes.get("volume_usd", {}).get("h24", 0))
-                liquidity = float(attributes.get("reserve_in_usd", 0))
-            except (ValueError, TypeError):
-                continue
-
-            if (
-                liquidity >= config.MIN_LIQUIDITY_USD
-                and vol_24h >= config.MIN_VOLUME_24H
-            ):
-                # Get Base Token ID (Address)
-                # attributes.address is the POOL address
-                # relationships.base_token.data.id might be "eth_0x..."
-
-                # A simpler way is to grab the name/symbol from the pool name usually
-                # But let's look at the structure carefully.
-                # Usually: name = "TOKEN / ETH"
-
-                token_name = attributes.get("name", "").split("/")[0].strip()
-
-                # For address, we rely on the attributes or relationships
-                # The 'base_token_price_usd' is there, but address needs parsing or additional call.
-                # However, for MVP, let's use the POOL address or try to find token address.
-                # Actually, attributes['address'] is the POOL address.
-                # We need the TOKEN address for BitQuery.
-                # GeckoTerminal v2 response usually includes 'relationships' -> 'base_token'.
-                # But we might need to fetch the token details.
-
-                # Workaround: For now, we return the POOL address as a proxy,
-                # OR we try to extract if available.
-                # Better: Use the 'base_token_id' if available in recent API versions.
-                # Checking sample response structure: unfortunately typically requires second call or parsing ID.
-                # relationships: { base_token: { data: { id: "eth_0x123..." } } }
-
-                base_token_id_str = (
-                    pool.get("relationships", {})
-                    .get("base_token", {})
-                    .get("data", {})
-                    .get("id", "")
-                )
-                if "_" in base_token_id_str:
-                    token_address = base_token_id_str.split("_")[1]
-                else:
-                    token_address = base_token_id_str
-
-                if token_address:
-                    qualified_tokens.append(
-                        {
-                            "symbol": token_name,
-                            "address": token_address,
-                            "price": attributes.get("base_token_price_usd"),
-                            "liquidity": liquidity,
-                            "volume24h": vol_24h,
-                            "pool_address": attributes.get("address"),
-                        }
-                    )
-
-        return qualified_tokens
+        chain = chain or config.TARGET_CHAIN
+        chain_slug = self.chain_map.get(chain, "eth")
+        sources = sources or config.SCOUT_SOURCES
+        max_pages = max_pages or config.SCOUT_MAX_PAGES
+        quote_tokens = {t.lower() for t in config.QUOTE_TOKENS}
+        seen = set()
+        found = 0
+
+        pool = ThreadPoolExecutor(max_workers=len(sources))
+        pending = {
+            pool.submit(self._get_pools, chain_slug, chain, source, 1): (source, 1)
+            for source in sources
+        }
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source, page = pending.pop(future)
+                    try:
+                        pools = future.result()
+                    except Exception as e:
+                        print(f"Exception fetching {source} page {page}: {e}")
+                        continue
+
+                    for p in pools:
+                        token = self._pool_token(p)
+                        if token is None:
+                            continue
+                        key = token["address"].lower()
+                        if key in seen or key in quote_tokens:
+                            continue
+                        seen.add(key)
+                        token["chain"] = chain
+                        token["source"] = source
+                        found += 1
+                        yield token
+                        if limit is not None and found >= limit:
+                            return
+
+                    # An empty page is the end of the listing
+                    if pools and page < max_pages:
+                        next_page = pool.submit(
+                            self._get_pools, chain_slug, chain, source, page + 1
+                        )
+                        pending[next_page] = (source, page + 1)
+        finally:
+            # Pages still in flight are not waited for
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_pools(self, chain_slug, chain, source, page):
+        url = f"{self.base_url}/networks/{chain_slug}/{source}?page={page}"
+        data = self.cache.get_or_fetch(
+            source, url, lambda: self._get(url, chain, source)
+        )
+        get_metrics().inc("scout_pages_total", source=source, chain=chain)
+        return data.get("data", [])
+
+    def _get(self, url, chain=None, source="trending_pools"):
+        chain = chain or config.TARGET_CHAIN
+        get_rate_limiter(
+            f"geckoterminal:{chain}", config.CHAINS[chain]["requests_per_minute"]
+        ).acquire()
+        self.scheduler.acquire(
+            "geckoterminal",
+            self.scheduler.estimate_cost("geckoterminal"),
+            lane=config.QUERY_LANES.get(source, "discovery"),
+        )
+        response = self.http.get(url, endpoint="geckoterminal", headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def _pool_token(self, pool):
+        """
+        The base token of a GeckoTerminal pool, or None if the pool is below
+        MIN_LIQUIDITY_USD / MIN_VOLUME_24H.
+        """
+        attributes = pool.get("attributes", {})
+        # attributes: { volume_usd: { h24: "..." }, reserve_in_usd: "..." }
+        try:
+            vol_24h = float(attributes.get("volume_usd", {}).get("h24", 0))
+            liquidity = float(attributes.get("reserve_in_usd", 0))
+        except (ValueError, TypeError):
+            return None
+        if liquidity < config.MIN_LIQUIDITY_USD or vol_24h < config.MIN_VOLUME_24H:
+            return None
+
+        # attributes.address is the POOL address; the base token's address
+        # is in relationships.base_token.data.id, e.g. "eth_0x123..."
+        base_token_id = (
+            pool.get("relationships", {})
+            .get("base_token", {})
+            .get("data", {})
+            .get("id", "")
+        )
+        token_address = base_token_id.split("_", 1)[-1]
+        if not token_address:
+            return None
+
+        # Pool names look like "TOKEN / WETH"
+        return {
+            "symbol": attributes.get("name", "").split("/")[0].strip(),
+            "address": token_address,
+            "price": attributes.get("base_token_price_usd"),
+            "liquidity": liquidity,
+            "volume24h": vol_24h,
+            "pool_address": attributes.get("address"),
+            "pool_created_at": attributes.get("pool_created_at"),
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,429 @@
+"""
+Splits the Copier's watchlist across worker processes.
+
+Each wallet belongs to one shard, picked by a consistent-hash ring, so
+adding or removing a shard only moves the wallets whose ring segment
+changed (about 1/N of them) instead of reshuffling everything. Every
+shard is a process running its own Copier over its wallets: adaptive
+schedule, batched BitQuery polls and its share of
+WATCH_REQUESTS_PER_MINUTE. BitQuery points come from the request
+scheduler's bucket, which all processes share (REQUEST_BUDGET_PATH).
+
+Shards do not write signals themselves. New signals go back over one
+queue to the ShardedCopier, the single sink that stores them (duplicates
+are dropped by tx_hash, e.g. after a wallet moved shards) and hands them
+to the executor, so one process owns the nonces. Each shard also sends
+its metrics, which the worker exports with a "shard" label.
+
+ShardedCopier has the Copier's interface (update_watchlist,
+start_listening, stop_listening, active_watchlist, ...), so the copier
+worker uses it when COPIER_SHARDS is above 1.
+"""
+
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import config
+from metrics import get_metrics
+from signal_store import SignalStore
+
+# Seconds between a shard's status reports and the sink's stop-flag checks
+_TICK = 1.0
+# Seconds between a shard's metrics snapshots
+_METRICS_INTERVAL = 5.0
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hashing of wallets onto shards. Each shard owns 'vnodes'
+    points on the ring; a wallet belongs to the first point at or after its
+    own hash. Wallets are hashed lowercase.
+    """
+
+    def __init__(self, nodes=(), vnodes=None):
+        self.vnodes = vnodes or config.SHARD_VNODES
+        self._points = []  # sorted hashes
+        self._owners = {}  # hash -> node
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node):
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: n for p, n in self._owners.items() if n != node}
+
+    def node_for(self, wallet):
+        if not self._points:
+            raise ValueError("hash ring has no nodes")
+        i = bisect.bisect(self._points, _hash(wallet.lower())) % len(self._points)
+        return self._owners[self._points[i]]
+
+    def __len__(self):
+        return len(set(self._owners.values()))
+
+
+class _ShardSignals:
+    """
+    Stands in for the SignalStore inside a shard: duplicate checks read the
+    shared store, new signals are sent to the sink instead of written.
+    """
+
+    def __init__(self, shard_id, sink, path):
+        self.shard_id = shard_id
+        self.sink = sink
+        self.store = SignalStore(path, legacy_path=None)
+        # Sent but possibly not stored yet
+        self._sent = set()
+
+    def contains(self, tx_hash):
+        return tx_hash in self._sent or self.store.contains(tx_hash)
+
+    def add(self, signals):
+        signals = list(signals)
+        if len(self._sent) > 10000:
+            self._sent.clear()
+        self._sent.update(s.get("tx_hash") for s in signals)
+        # The Copier stores new signals right as it detects them; the sink
+        # hands this time to the executor, not the time the message arrives
+        self.sink.put(("signals", self.shard_id, (signals, time.time())))
+        return signals
+
+
+def _run_shard(shard_id, chain, commands, sink, settings):
+    """
+    A shard process: runs a Copier over the wallets it is sent until told
+    to close. Commands are tuples:
+
+        ("add", wallets, scores)   watch (or rescore) wallets
+        ("remove", wallets)        stop watching wallets
+        ("budget", watch_rpm)      this shard's share of the watch budget
+        ("start",) / ("stop",)     run or pause the polling loop
+        ("close",)                 stop and exit
+
+    Besides new signals it reports its status when it changes and its
+    metrics every _METRICS_INTERVAL seconds.
+    """
+    from brain import Brain
+    from copier import Copier
+    from request_scheduler import RequestScheduler
+
+    scheduler = None
+    if settings.get("budget_path"):
+        scheduler = RequestScheduler(
+            budgets=config.REQUEST_BUDGETS,
+            reserves=config.LANE_RESERVES,
+            path=settings["budget_path"],
+        )
+    brain = Brain(chain, scheduler=scheduler)
+    if settings.get("bitquery_url"):
+        brain.url = settings["bitquery_url"]
+    copier = Copier(
+        brain=brain, signals=_ShardSignals(shard_id, sink, settings["signals_path"])
+    )
+    thread = None
+    reported = None
+    metrics_sent = 0.0
+
+    while True:
+        try:
+            command, *args = commands.get(timeout=_TICK)
+        except queue.Empty:
+            command, args = None, ()
+
+        if command == "add":
+            copier.change_watchlist(added=args[0], scores=args[1])
+        elif command == "remove":
+            copier.change_watchlist(removed=args[0])
+        elif command == "budget":
+            copier.scheduler.set_budget(args[0])
+        elif command == "start":
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=copier.start_listening, daemon=True)
+                thread.start()
+        elif command in ("stop", "close"):
+            copier.stop_listening()
+            if thread is not None:
+                thread.join(timeout=10)
+            if command == "close":
+                return
+
+        status = (len(copier.active_watchlist), copier.last_scan_at, copier.is_running)
+        if status != reported:
+            reported = status
+            sink.put(
+                (
+                    "status",
+                    shard_id,
+                    {
+                        "wallets": status[0],
+                        "last_scan_at": status[1],
+                        "running": status[2],
+                    },
+                )
+            )
+        if time.monotonic() - metrics_sent >= _METRICS_INTERVAL:
+            metrics_sent = time.monotonic()
+            sink.put(("metrics", shard_id, get_metrics().snapshot()))
+
+
+class ShardedCopier:
+    def __init__(
+        self,
+        shards=None,
+        chain=None,
+        signals=None,
+        profiles=None,
+        executor=None,
+        vnodes=None,
+        bitquery_url=None,
+        budget_path=None,
+    ):
+        self.chain = chain or config.TARGET_CHAIN
+        self.signals = signals or SignalStore()
+        self.executor = executor
+        self.profiles = profiles
+        self.bitquery_url = bitquery_url
+        # Request budget file the shards share instead of REQUEST_BUDGET_PATH
+        self.budget_path = budget_path
+        self.ring = HashRing(vnodes=vnodes)
+        self.members = {}  # wallet -> shard id
+        self.scores = {}
+        self.active_watchlist = []
+        self.is_running = False
+        self.last_scan_at = None
+        self.shard_status = {}  # shard id -> last status report
+        # Spawned, not forked: this process already runs threads
+        self._context = multiprocessing.get_context("spawn")
+        self._sink = self._context.Queue()
+        self._shards = {}  # shard id -> (process, command queue)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+        for _ in range(shards or config.COPIER_SHARDS):
+            self.add_shard()
+        if profiles is not None:
+            wallets, scores = profiles.load_watchlist()
+            if wallets:
+                print(f"[Copier] Reloaded last watchlist ({len(wallets)} wallets).")
+                self.update_watchlist(wallets, scores=scores)
+
+    def update_watchlist(self, wallets, scores=None):
+        """
+        Sets the watchlist. Only the difference to the current one is sent
+        to the shards: new wallets to their ring shard, dropped wallets to
+        the shard that had them, and score changes for kept wallets.
+        """
+        scores = scores or {}
+        wanted = list(dict.fromkeys(wallets))
+        with self._lock:
+            wanted_set = set(wanted)
+            removed = [w for w in self.members if w not in wanted_set]
+            changed = [
+                w
+                for w in wanted
+                if w not in self.members
+                or (w in scores and scores[w] != self.scores.get(w))
+            ]
+            for wallet in removed:
+                self.scores.pop(wallet, None)
+            self.scores.update({w: scores[w] for w in changed if w in scores})
+
+            by_shard = {}
+            for wallet in removed:
+                by_shard.setdefault(self.members.pop(wallet), ([], []))[1].append(
+                    wallet
+                )
+            for wallet in changed:
+                shard = self.members.setdefault(wallet, self.ring.node_for(wallet))
+                by_shard.setdefault(shard, ([], []))[0].append(wallet)
+            for shard, (added, dropped) in by_shard.items():
+                self._send_diff(shard, added, dropped)
+            self.active_watchlist = wanted
+
+        print(
+            f"[Copier] Watchlist: {len(wanted)} wallets on {len(self._shards)} "
+            f"shards ({len(changed)} added or rescored, {len(removed)} removed)."
+        )
+        if self.profiles is not None:
+            self.profiles.save_watchlist(wanted, self.scores)
+
+    def add_shard(self):
+        """
+        Starts one more shard process and moves to it the wallets that now
+        hash onto it. Returns the new shard's id.
+        """
+        with self._lock:
+            shard = next(self._ids)
+            commands = self._context.Queue()
+            process = self._context.Process(
+                target=_run_shard,
+                args=(
+                    shard,
+                    self.chain,
+                    commands,
+                    self._sink,
+                    {
+                        "bitquery_url": self.bitquery_url,
+                        "budget_path": self.budget_path,
+                        "signals_path": self.signals.path,
+                    },
+                ),
+                name=f"copier-shard-{shard}",
+                daemon=True,
+            )
+            process.start()
+            self._shards[shard] = (process, commands)
+            self.ring.add(shard)
+            self._rebalance()
+            if self.is_running:
+                commands.put(("start",))
+        return shard
+
+    def remove_shard(self, shard):
+        """
+        Closes a shard and hands its wallets to the shards that now own them.
+        """
+        with self._lock:
+            if shard not in self._shards or len(self._shards) == 1:
+                return False
+            process, commands = self._shards.pop(shard)
+            self.ring.remove(shard)
+            commands.put(("close",))
+            self.shard_status.pop(shard, None)
+            get_metrics().forget(f"shard-{shard}")
+            self._rebalance()
+        process.join(timeout=15)
+        return True
+
+    def resize(self, count):
+        """
+        Adds or removes shards until there are 'count' of them.
+        """
+        count = max(int(count), 1)
+        while len(self._shards) < count:
+            self.add_shard()
+        while len(self._shards) > count:
+            self.remove_shard(max(self._shards))
+        return len(self._shards)
+
+    def shard_stats(self):
+        with self._lock:
+            sizes = {}
+            for shard in self.members.values():
+                sizes[shard] = sizes.get(shard, 0) + 1
+            return {
+                str(shard): {
+                    "pid": process.pid,
+                    "alive": process.is_alive(),
+                    "wallets": sizes.get(shard, 0),
+                    **self.shard_status.get(shard, {}),
+                }
+                for shard, (process, _) in self._shards.items()
+            }
+
+    def start_listening(self):
+        """
+        Starts every shard's polling loop and runs the signal sink until
+        stop_listening() is called.
+        """
+        self.is_running = True
+        if self.executor is not None:
+            self.executor.start()
+        self._broadcast(("start",))
+        print(f"[Copier] Started {len(self._shards)} shards...")
+
+        try:
+            while self.is_running:
+                try:
+                    message = self._sink.get(timeout=_TICK)
+                except queue.Empty:
+                    continue
+                self._handle(message)
+        except KeyboardInterrupt:
+            self.stop_listening()
+
+    def stop_listening(self):
+        self.is_running = False
+        self._broadcast(("stop",))
+        print("[Copier] Stopped.")
+
+    def close(self):
+        """
+        Stops and exits every shard process.
+        """
+        self.is_running = False
+        self._broadcast(("close",))
+        with self._lock:
+            shards, self._shards = self._shards, {}
+        for shard in shards:
+            get_metrics().forget(f"shard-{shard}")
+        for process, _ in shards.values():
+            process.join(timeout=15)
+            if process.is_alive():
+                process.terminate()
+
+    def _handle(self, message):
+        kind, shard, payload = message
+        if kind == "signals":
+            signals, detected_at = payload
+            stored = self.signals.add(signals)
+            get_metrics().inc("copier_shard_signals_total", len(stored))
+            for signal in stored:
+                if self.executor is not None:
+                    self.executor.submit(signal, detected_at=detected_at)
+        elif kind == "metrics":
+            get_metrics().absorb(f"shard-{shard}", payload, shard=shard)
+        elif kind == "status":
+            self.shard_status[shard] = payload
+            if payload["last_scan_at"]:
+                self.last_scan_at = max(self.last_scan_at or 0, payload["last_scan_at"])
+
+    def _send_diff(self, shard, added, removed):
+        commands = self._shards[shard][1]
+        if removed:
+            commands.put(("remove", removed))
+        if added:
+            commands.put(
+                ("add", added, {w: self.scores[w] for w in added if w in self.scores})
+            )
+
+    def _rebalance(self):
+        # Caller holds self._lock. Split the watch budget (BitQuery points
+        # come from the shared REQUEST_BUDGET_PATH bucket), then move the
+        # wallets whose ring owner changed.
+        count = len(self._shards)
+        for _, commands in self._shards.values():
+            commands.put(("budget", config.WATCH_REQUESTS_PER_MINUTE / count))
+
+        moves = {}
+        for wallet, shard in self.members.items():
+            owner = self.ring.node_for(wallet)
+            if owner != shard:
+                moves.setdefault(shard, ([], []))[1].append(wallet)
+                moves.setdefault(owner, ([], []))[0].append(wallet)
+                self.members[wallet] = owner
+        for shard, (added, removed) in moves.items():
+            if shard in self._shards:
+                self._send_diff(shard, added, removed)
+        if moves:
+            moved = sum(len(added) for added, _ in moves.values())
+            print(f"[Copier] Rebalanced {moved} wallets across {count} shards.")
+
+    def _broadcast(self, command):
+        with self._lock:
+            for _, commands in self._shards.values():
+                commands.put(command)
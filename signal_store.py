@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class SignalStore:
+    """
+    Append-only signal log backed by SQLite.
+
+    Signals are only ever inserted, never rewritten. A unique index on
+    tx_hash makes duplicate checks O(1), and the autoincrement id gives a
+    cheap newest-first ordering without loading the whole history.
+    """
+
+    def __init__(self, path="signals.db", legacy_path="signals.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        is_new = not os.path.exists(path)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tx_hash TEXT UNIQUE,
+                timestamp TEXT,
+                wallet TEXT,
+                token TEXT,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        # Indexes for the dashboard's server-side filters
+        for name, column in (
+            ("wallet", "wallet COLLATE NOCASE"),
+            ("token", "token COLLATE NOCASE"),
+            ("timestamp", "timestamp"),
+        ):
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_signals_{name} ON signals ({column})"
+            )
+        self._conn.commit()
+
+        if is_new and legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path):
+        """
+        One-time import of an old signals.json log (stored newest first).
+        """
+        try:
+            with open(legacy_path, "r") as f:
+                history = json.load(f)
+        except Exception as e:
+            print(f"Error importing {legacy_path}: {e}")
+            return
+
+        # Insert oldest first so ids keep the original ordering
+        added = self.add(reversed(history))
+        if added:
+            print(f"[SignalStore] Imported {len(added)} signals from {legacy_path}.")
+
+    def add(self, signals):
+        """
+        Appends signals, skipping any tx_hash already stored.
+        Returns the signals that were actually inserted.
+        """
+        inserted = []
+        with self._lock:
+            for signal in signals:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO signals (tx_hash, timestamp, wallet, token, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        signal.get("tx_hash"),
+                        signal.get("timestamp"),
+                        signal.get("wallet"),
+                        signal.get("token"),
+                        json.dumps(signal),
+                    ),
+                )
+                if cursor.rowcount:
+                    inserted.append(signal)
+            self._conn.commit()
+        return inserted
+
+    def contains(self, tx_hash):
+        if tx_hash is None:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM signals WHERE tx_hash = ?", (tx_hash,)
+            ).fetchone()
+        return row is not None
+
+    def recent(self, limit=100, offset=0):
+        """
+        Returns up to 'limit' signals, newest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM signals ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def query(
+        self,
+        wallet=None,
+        token=None,
+        start=None,
+        end=None,
+        after_id=None,
+        limit=50,
+        offset=0,
+    ):
+        """
+        Filtered, paginated read, newest first. 'token' matches the symbol
+        (case-insensitive) or the token address; 'start'/'end' bound the
+        trade timestamp (inclusive, "YYYY-MM-DD HH:MM:SS"); 'after_id' only
+        returns signals stored after that id, for tailing. Each returned
+        signal carries its store "id".
+        """
+        where, params = self._filters(wallet, token, start, end, after_id)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, data FROM signals {where} "
+                "ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [{**json.loads(data), "id": row_id} for row_id, data in rows]
+
+    def count(self, wallet=None, token=None, start=None, end=None, after_id=None):
+        where, params = self._filters(wallet, token, start, end, after_id)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM signals {where}", params
+            ).fetchone()[0]
+
+    def last_id(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM signals").fetchone()
+        return row[0] or 0
+
+    def _filters(self, wallet, token, start, end, after_id):
+        clauses, params = [], []
+        if wallet:
+            clauses.append("wallet = ? COLLATE NOCASE")
+            params.append(wallet)
+        if token:
+            clauses.append(
+                "(token = ? COLLATE NOCASE "
+                "OR json_extract(data, '$.token_address') = ? COLLATE NOCASE)"
+            )
+            params.extend([token, token])
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp <= ?")
+            params.append(end)
+        if after_id:
+            clauses.append("id > ?")
+            params.append(after_id)
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from backtest import _bitquery_legs, simulate_copies, summarize, sweep
+from brain import Brain
+from scoring import trades_to_legs
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+
+def swap(wallet, minute, token, qty, usd, buy, tx_hash):
+    token_side = {"symbol": token.upper(), "address": token}
+    weth_side = {"symbol": "WETH", "address": WETH}
+    return {
+        "transaction": {"hash": tx_hash},
+        "taker": {"address": wallet},
+        "buyCurrency": token_side if buy else weth_side,
+        "sellCurrency": weth_side if buy else token_side,
+        "buyAmount": qty if buy else usd / 3000,
+        "sellAmount": usd / 3000 if buy else qty,
+        "buyAmountInUsd": usd,
+        "block": {
+            "height": minute,
+            "timestamp": {"time": f"2024-01-01 00:{minute:02d}:00"},
+        },
+    }
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        # 0xtkn trades at $1, $2 one minute later, $3, then $4
+        self.legs = trades_to_legs(
+            [
+                swap("0xaaa", 0, "0xtkn", 100, 100, True, "t1"),
+                swap("0xbbb", 1, "0xtkn", 100, 200, True, "t2"),
+                swap("0xaaa", 10, "0xtkn", 100, 300, False, "t3"),
+                swap("0xbbb", 11, "0xtkn", 100, 400, False, "t4"),
+                swap("0xccc", 20, "0xtkn", 10, 20, True, "t5"),
+            ]
+        )
+
+    def test_delay_and_slippage(self):
+        copies = simulate_copies(
+            self.legs, delay=0, slippage=0.0, position_usd=100, wallets=["0xAAA"]
+        )
+        self.assertEqual(len(copies), 1)
+        self.assertAlmostEqual(copies.loc[0, "return"], 2.0)  # $1 -> $3
+
+        # A minute late on both sides: in at $2, out at $4, less 1% each way
+        late = simulate_copies(
+            self.legs, delay=60, slippage=0.01, position_usd=100, wallets=["0xaaa"]
+        )
+        self.assertAlmostEqual(late.loc[0, "return"], 4 * 0.99 / (2 * 1.01) - 1)
+
+        # 0xccc never sells: its copy stays open, marked at the last price
+        open_copy = simulate_copies(self.legs, slippage=0.0, wallets=["0xccc"])
+        self.assertFalse(open_copy.loc[0, "closed"])
+        self.assertAlmostEqual(open_copy.loc[0, "return"], 0.0)
+
+    def test_summary_drawdown_and_sweep(self):
+        copies = pd.DataFrame(
+            {
+                "wallet": ["0xa"] * 3,
+                "exit_time": pd.to_datetime([1, 2, 3], unit="D", utc=True),
+                "closed": [True, True, False],
+                "return": [0.5, -0.8, 0.1],
+                "pnl": [50.0, -80.0, 10.0],
+            }
+        )
+        summary = summarize(copies).loc["0xa"]
+        self.assertEqual(summary["closed"], 2)
+        self.assertAlmostEqual(summary["hit_rate"], 0.5)
+        self.assertAlmostEqual(summary["pnl"], -20.0)
+        self.assertAlmostEqual(summary["realized_pnl"], -30.0)
+        self.assertAlmostEqual(summary["max_drawdown"], 80.0)
+
+        results = sweep(self.legs, delays=[0, 60], thresholds=[0, 101], split=0.01)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(
+            results.set_index(["delay", "threshold"]).loc[(0, 101), "copies"], 0
+        )
+
+    def test_wallet_file_history_is_fetched_on_the_chosen_chain(self):
+        chains = []
+
+        def history(brain, wallets, **kwargs):
+            chains.append(brain.chain)
+            return [swap(wallets[0], 0, "0xtkn", 100, 100, True, "t1")]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wallets.txt")
+            with open(path, "w") as f:
+                f.write("0xaaa\n")
+            with mock.patch.object(
+                Brain, "get_trade_history", autospec=True, side_effect=history
+            ):
+                legs = _bitquery_legs(path, "base")
+
+        self.assertEqual(chains, ["base"])
+        self.assertEqual(list(legs["wallet"]), ["0xaaa"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+import bench
+
+
+class TestBench(unittest.TestCase):
+    def test_pipeline_runs_against_fake_server(self):
+        results = bench.run_benchmark(tokens=5, wallets=60, detections=3)
+
+        self.assertEqual(results["scout_tokens"], 5)
+        self.assertGreater(results["candidate_wallets"], 0)
+        self.assertGreater(results["wallets_scored_per_sec"], 0)
+        self.assertGreater(results["wallets_polled_per_sec"], 0)
+        # Every injected trade was detected by both polling and streaming
+        self.assertGreaterEqual(results["poll_detection_max_seconds"], 0)
+        self.assertGreaterEqual(results["stream_detection_max_seconds"], 0)
+        self.assertEqual(results["poll_detection_misses"], 0)
+        self.assertEqual(results["stream_detection_misses"], 0)
+        self.assertEqual(results["server_requests"]["trending_pools"], 1)
+        self.assertEqual(results["client_retries"], 0)
+
+    def test_undetected_trades_are_misses_not_hangs(self):
+        server = mock.Mock(_subscribers=[])
+        server.inject_trade.side_effect = lambda w: {"transaction": {"hash": w}}
+        copier = mock.Mock()
+        copier.signals.contains.side_effect = lambda tx_hash: tx_hash == "0xA"
+
+        lags = bench._poll_detection(server, copier, ["0xA", "0xB"], timeout=0.2)
+        self.assertEqual(len(lags), 1)
+        results = bench._detection_results("poll", lags, 2)
+        self.assertEqual(results["poll_detection_misses"], 1)
+
+        # No stream subscription ever registers
+        lags = bench._stream_detection(server, copier, ["0xA", "0xB"], timeout=0.2)
+        self.assertEqual(
+            bench._detection_results("stream", lags, 2),
+            {
+                "stream_detection_p50_seconds": None,
+                "stream_detection_max_seconds": None,
+                "stream_detection_misses": 2,
+            },
+        )
+
+    def test_compare_flags_regressions(self):
+        baseline = {"wallets_scored_per_sec": 100.0, "scoring_seconds": 1.0}
+        ok = {"wallets_scored_per_sec": 90.0, "scoring_seconds": 1.1}
+        slow = {"wallets_scored_per_sec": 50.0, "scoring_seconds": 2.0}
+
+        self.assertEqual(bench.compare(ok, baseline, tolerance=0.2), [])
+        self.assertEqual(len(bench.compare(slow, baseline, tolerance=0.2)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
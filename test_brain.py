@@ -1,34 +1,390 @@
+import os
+import tempfile
+import time
 import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import pandas as pd
+import config
 from brain import Brain
+from cache import ResponseCache
+from fake_server import FakeMarket, _public
+from profile_store import ProfileStore
+from request_scheduler import RequestScheduler
+from scoring import WalletAggregates, compute_wallet_metrics, trades_to_legs
 
 
 class TestBrain(unittest.TestCase):
     def setUp(self):
-        self.brain = Brain()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.brain = Brain(
+            scheduler=RequestScheduler(),
+            cache=ResponseCache(
+                os.path.join(self.tmp.name, "cache.db"), ttls=config.CACHE_TTLS
+            ),
+        )
 
-    def test_mock_scoring(self):
-        # Test that scoring is deterministic and within range
-        wallet = "0x1234567890abcdef"
-        score = self.brain._calculate_mock_score(wallet)
-        self.assertTrue(0 <= score <= 100)
+    def _swap(self, wallet, day, buy, sell, usd, tx_hash):
+        # buy/sell are (token_address, amount) from the wallet's point of view
+        return {
+            "transaction": {"hash": tx_hash},
+            "taker": {"address": wallet},
+            "buyCurrency": {"symbol": buy[0].upper(), "address": buy[0]},
+            "sellCurrency": {"symbol": sell[0].upper(), "address": sell[0]},
+            "buyAmount": buy[1],
+            "sellAmount": sell[1],
+            "buyAmountInUsd": usd,
+            "sellAmountInUsd": None,
+            "block": {
+                "height": day,
+                "timestamp": {"time": f"2024-01-{day:02d} 00:00:00"},
+            },
+        }
 
-        # Ensure same wallet gets same score
-        score2 = self.brain._calculate_mock_score(wallet)
-        self.assertEqual(score, score2)
+    def _history(self):
+        weth = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+        trades = []
+        # 0xaaa: three round trips, each doubling its money
+        # 0xbbb: three round trips, each losing half
+        for n, token in enumerate(["0xt1", "0xt2", "0xt3"]):
+            day = 1 + n * 2
+            trades.append(
+                self._swap("0xaaa", day, (token, 100), (weth, 1), 100, f"a{n}b")
+            )
+            trades.append(
+                self._swap("0xaaa", day + 1, (weth, 2), (token, 100), 200, f"a{n}s")
+            )
+            trades.append(
+                self._swap("0xbbb", day, (token, 100), (weth, 1), 100, f"b{n}b")
+            )
+            trades.append(
+                self._swap("0xbbb", day + 1, (weth, 0.5), (token, 100), 50, f"b{n}s")
+            )
+        # 0xccc: only buys, nothing realized
+        trades.append(self._swap("0xccc", 1, ("0xt1", 10), (weth, 1), 10, "c0"))
+        return trades
 
-    def test_sorting(self):
-        # Create dummy wallets with known mock scores
-        # We know the mock score function: sum(ord(c)) % 100
-        # Let's just trust the sort logic
+    def test_wallet_metrics(self):
+        legs = trades_to_legs(self._history())
+        # Quote-token (WETH) legs are dropped
+        self.assertNotIn(
+            "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2", set(legs["token"])
+        )
 
-        wallets = ["0xAAA", "0xBBB", "0xCCC"]
-        ranked = self.brain.score_wallets(wallets)
+        metrics = compute_wallet_metrics(legs, now=pd.Timestamp("2024-01-31", tz="UTC"))
+        self.assertEqual(metrics.loc["0xaaa", "closed"], 3)
+        self.assertEqual(metrics.loc["0xaaa", "win_rate"], 1.0)
+        self.assertAlmostEqual(metrics.loc["0xaaa", "roi"], 1.0)
+        self.assertEqual(metrics.loc["0xbbb", "win_rate"], 0.0)
+        self.assertAlmostEqual(metrics.loc["0xbbb", "roi"], -0.5)
+        self.assertEqual(metrics.loc["0xccc", "closed"], 0)
+        self.assertAlmostEqual(metrics.loc["0xaaa", "age_days"], 30.0)
 
-        self.assertEqual(len(ranked), 3)
-        # Check if sorted descending by score
+    def test_score_wallets_filters_and_sorts(self):
+        wallets = ["0xAAA", "0xBBB", "0xCCC", "0xDDD"]
+        with mock.patch.object(
+            self.brain, "get_trade_history", return_value=self._history()
+        ):
+            ranked = self.brain.score_wallets(wallets)
+
+        # Only the profitable wallet clears MIN_WALLET_SCORE; caller's spelling kept
+        self.assertEqual([w["address"] for w in ranked], ["0xAAA"])
+        self.assertEqual(ranked[0]["trades"], 6)
         scores = [w["score"] for w in ranked]
         self.assertEqual(scores, sorted(scores, reverse=True))
 
+    def test_score_wallets_without_history(self):
+        with mock.patch.object(self.brain, "get_trade_history", return_value=[]):
+            self.assertEqual(self.brain.score_wallets(["0xAAA"]), [])
+
+    def test_fresh_profiles_are_not_rescored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.brain.profiles = ProfileStore(os.path.join(tmp, "profiles.db"))
+            with mock.patch.object(
+                self.brain, "get_trade_history", return_value=self._history()
+            ) as history:
+                first = self.brain.score_wallets(["0xAAA", "0xBBB"], "0xt1")
+                again = self.brain.score_wallets(["0xaaa", "0xBBB"], "0xt2")
+
+            # Low scorers are stored too, so neither wallet is fetched again
+            self.assertEqual(history.call_count, 1)
+            self.assertEqual([w["score"] for w in again], [w["score"] for w in first])
+            self.assertEqual(again[0]["address"], "0xaaa")
+            profile = self.brain.profiles.get(self.brain.chain, "0xbbb")
+            self.assertEqual(profile["source_tokens"], ["0xt1", "0xt2"])
+            self.brain.profiles.close()
+
+    def test_incremental_aggregates_match_full_recompute(self):
+        legs = trades_to_legs(self._history())
+        now = pd.Timestamp("2024-01-31", tz="UTC")
+        full = compute_wallet_metrics(legs, now=now)
+
+        aggregates = WalletAggregates()
+        aggregates.apply(legs[legs["block"] <= 3])
+        aggregates.apply(legs[legs["block"] > 3])
+        # Re-applying already seen blocks is a no-op
+        self.assertEqual(aggregates.apply(legs), 0)
+
+        incremental = aggregates.metrics(now=now).loc[full.index]
+        pd.testing.assert_frame_equal(incremental[full.columns], full, check_like=True)
+
+    def test_rescoring_fetches_only_new_blocks(self):
+        history = self._history()
+        with mock.patch.object(
+            self.brain, "get_trade_history", return_value=history
+        ) as fetch:
+            self.brain.score_wallets(["0xAAA"])
+            self.assertEqual(fetch.call_args.kwargs["since_blocks"], {"0xAAA": 0})
+
+            fetch.return_value = []
+            ranked = self.brain.score_wallets(["0xAAA"])
+            self.assertEqual(fetch.call_args.kwargs["since_blocks"], {"0xAAA": 6})
+
+        # Score comes from the stored aggregates without refetching history
+        self.assertEqual([w["address"] for w in ranked], ["0xAAA"])
+
+    def test_batched_trades_respect_wallet_cursors(self):
+        def trade(taker, tx_hash, time):
+            return {
+                "transaction": {"hash": tx_hash},
+                "taker": {"address": taker},
+                "buyCurrency": {"symbol": "PEPE", "address": "0xpepe"},
+                "buyAmount": 1.0,
+                "block": {"height": 1, "timestamp": {"time": time}},
+            }
+
+        # Newest first, as BitQuery returns them
+        trades = [
+            trade("0xaaa", "0x3", "2024-01-01 12:10:00"),
+            trade("0xbbb", "0x2", "2024-01-01 12:05:00"),
+            trade("0xaaa", "0x1", "2024-01-01 12:00:00"),
+        ]
+        response = mock.Mock()
+        response.json.return_value = {"data": {"ethereum": {"dexTrades": trades}}}
+
+        cursors = {
+            "0xAAA": "2024-01-01T11:00:00Z",
+            "0xBBB": "2024-01-01T12:06:00Z",
+        }
+        with mock.patch.object(self.brain.http, "post", return_value=response) as post:
+            result = self.brain.get_trades_for_wallets(cursors, batch_size=50)
+
+        # One request for both wallets, starting at the earliest cursor
+        self.assertEqual(post.call_count, 1)
+        variables = post.call_args.kwargs["json"]["variables"]
+        self.assertEqual(variables["since"], "2024-01-01T11:00:00Z")
+
+        hashes = {w: [t["transaction"]["hash"] for t in ts] for w, ts in result.items()}
+        self.assertEqual(hashes, {"0xAAA": ["0x1", "0x3"], "0xBBB": []})
+
+    def test_busy_chunk_is_paged_until_a_short_page(self):
+        market = FakeMarket(tokens=1, wallets=0)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        # 0xaaa trades five times since its cursor; pages hold two per wallet
+        for minutes in range(5):
+            market.inject_trade("0xaaa", at=start + timedelta(minutes=minutes))
+        market.inject_trade("0xbbb", at=start + timedelta(minutes=2))
+
+        def post(query, variables, **kwargs):
+            trades = market.wallet_trades(
+                variables["wallets"],
+                variables["limit"],
+                since=variables["since"],
+                offset=variables["offset"],
+            )
+            return {"data": {"ethereum": {"dexTrades": [_public(t) for t in trades]}}}
+
+        cursors = {"0xAAA": "2024-01-01T00:00:00Z", "0xBBB": "2024-01-01T00:00:00Z"}
+        with mock.patch.object(self.brain, "_post_query", side_effect=post) as calls:
+            result = self.brain.get_trades_for_wallets(
+                cursors, batch_size=50, limit_per_wallet=2
+            )
+
+        self.assertEqual(calls.call_count, 2)  # a page of 4, then the last 2
+        self.assertEqual(len(result["0xAAA"]), 5)
+        self.assertEqual(len(result["0xBBB"]), 1)
+        times = [t["block"]["timestamp"]["time"] for t in result["0xAAA"]]
+        self.assertEqual(times, sorted(times))
+
+    def test_history_deltas_are_paged_forward_from_the_cursor(self):
+        market = FakeMarket(tokens=1, wallets=0)
+        start = datetime.now(timezone.utc) - timedelta(hours=1)
+        for minutes in range(0, 50, 10):
+            market.inject_trade("0xaaa", at=start + timedelta(minutes=minutes))
+        cursor = market.block_at(start)
+
+        def post(query, variables, **kwargs):
+            trades = market.wallet_trades(
+                variables["wallets"],
+                variables["limit"],
+                since_block=variables["since_block"],
+                offset=variables["offset"],
+                ascending="asc:" in query,
+            )
+            return {"data": {"ethereum": {"dexTrades": [_public(t) for t in trades]}}}
+
+        with mock.patch.object(self.brain, "_post_query", side_effect=post) as calls:
+            delta = self.brain.get_trade_history(
+                ["0xAAA"], limit_per_wallet=2, since_blocks={"0xAAA": cursor}
+            )
+            self.assertEqual(calls.call_count, 3)  # 2 + 2 + 0
+            # A first fetch pages the whole history the same way
+            full = self.brain.get_trade_history(["0xAAA"], limit_per_wallet=2)
+
+        # Every trade after the cursor's block, oldest first
+        times = [t["block"]["timestamp"]["time"] for t in delta]
+        self.assertEqual(len(times), 4)
+        self.assertEqual(times, sorted(times))
+        full_times = [t["block"]["timestamp"]["time"] for t in full]
+        self.assertEqual(len(full_times), 5)
+        self.assertEqual(full_times, sorted(full_times))
+
+    def test_busy_wallet_does_not_starve_a_quiet_one(self):
+        market = FakeMarket(tokens=1, wallets=0)
+        start = datetime.now(timezone.utc) - timedelta(hours=1)
+        market.inject_trade("0xbbb", at=start)
+        for minutes in range(1, 11):
+            market.inject_trade("0xaaa", at=start + timedelta(minutes=minutes))
+
+        def post(query, variables, **kwargs):
+            trades = market.wallet_trades(
+                variables["wallets"],
+                variables["limit"],
+                since_block=variables["since_block"],
+                offset=variables["offset"],
+                ascending="asc:" in query,
+            )
+            return {"data": {"ethereum": {"dexTrades": [_public(t) for t in trades]}}}
+
+        # Both wallets are new and share one chunk with pages of 2 per wallet
+        with mock.patch.object(self.brain, "_post_query", side_effect=post):
+            trades = self.brain.get_trade_history(
+                ["0xAAA", "0xBBB"], batch_size=25, limit_per_wallet=2
+            )
+
+        takers = [t["taker"]["address"] for t in trades]
+        self.assertEqual(takers.count("0xaaa"), 10)
+        self.assertEqual(takers.count("0xbbb"), 1)
+        # Each wallet's cursor lands on its own newest block
+        self.brain.aggregates.apply(trades_to_legs(trades))
+        cursors = self.brain.aggregates.cursors()
+        self.assertEqual(cursors["0xbbb"], market.block_at(start))
+        self.assertEqual(
+            cursors["0xaaa"], market.block_at(start + timedelta(minutes=10))
+        )
+
+    def test_early_buyers_stream_in_completion_order(self):
+        delays = {"0xslow": 0.2, "0xfast": 0.0}
+
+        def fake_find(token_address, limit):
+            time.sleep(delays[token_address])
+            return [f"buyer_of_{token_address}"]
+
+        tokens = [{"address": "0xslow"}, {"address": "0xfast"}]
+        with mock.patch.object(self.brain, "find_early_buyers", side_effect=fake_find):
+            results = list(self.brain.iter_early_buyers(tokens, max_workers=2))
+
+        self.assertEqual([t["address"] for t, _ in results], ["0xfast", "0xslow"])
+        self.assertEqual(results[0][1], ["buyer_of_0xfast"])
+
+    def test_token_buyers_page_through_ties_and_duplicates(self):
+        market = FakeMarket(tokens=1, wallets=0)
+        token = market.tokens[0]
+        launch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        # Three buys share the launch second; 0xa buys twice
+        for wallet, minutes in [
+            ("0xa", 0),
+            ("0xb", 0),
+            ("0xa", 0),
+            ("0xc", 5),
+            ("0xd", 90),
+        ]:
+            market.inject_trade(wallet, token, at=launch + timedelta(minutes=minutes))
+
+        def post(query, variables, **kwargs):
+            trades = market.early_buyers(
+                variables["token"],
+                variables["limit"],
+                offset=variables["offset"],
+                since=variables["since"],
+                till=variables["till"],
+            )
+            return {"data": {"ethereum": {"dexTrades": [_public(t) for t in trades]}}}
+
+        with mock.patch.object(self.brain, "_post_query", side_effect=post) as calls:
+            buyers = list(self.brain.iter_token_buyers(token["address"], page_size=2))
+            self.assertEqual(calls.call_count, 3)
+
+            self.assertEqual(
+                [b["address"] for b in buyers], ["0xa", "0xb", "0xc", "0xd"]
+            )
+            self.assertEqual(buyers[0]["first_buy_at"], "2024-01-01T00:00:00Z")
+            self.assertEqual(buyers[2]["first_buy_at"], "2024-01-01T00:05:00Z")
+            self.assertIsNotNone(buyers[0]["first_buy_amount"])
+
+            # Stops at the buyer cap, or at the end of the launch window
+            self.assertEqual(
+                self.brain.find_early_buyers(token["address"], limit=2), ["0xa", "0xb"]
+            )
+            self.assertEqual(
+                self.brain.find_early_buyers(
+                    token["address"], limit=10, window_seconds=3600
+                ),
+                ["0xa", "0xb", "0xc"],
+            )
+
+    def test_only_final_early_buyer_pages_are_cached(self):
+        market = FakeMarket(tokens=1, wallets=0)
+        info = market.tokens[0]
+        token = info["address"]
+        launch = datetime.now(timezone.utc) - timedelta(minutes=30)
+        for n, wallet in enumerate(["0xa", "0xb", "0xc"]):
+            market.inject_trade(wallet, info, at=launch + timedelta(minutes=n))
+
+        def post(url, json=None, **kwargs):
+            variables = json["variables"]
+            trades = market.early_buyers(
+                token,
+                variables["limit"],
+                offset=variables["offset"],
+                since=variables["since"],
+                till=variables["till"],
+            )
+            response = mock.Mock()
+            response.json.return_value = {
+                "data": {"ethereum": {"dexTrades": [_public(t) for t in trades]}}
+            }
+            return response
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.brain.cache = ResponseCache(
+                os.path.join(tmp, "cache.db"), ttls={"early_buyers": None}
+            )
+            with mock.patch.object(self.brain.http, "post", side_effect=post):
+                buyers = list(self.brain.iter_token_buyers(token, page_size=2))
+                self.assertEqual(len(buyers), 3)
+                # A later buyer shows up: the short last page was not cached
+                market.inject_trade("0xd", info, at=launch + timedelta(minutes=3))
+                buyers = list(self.brain.iter_token_buyers(token, page_size=2))
+                self.assertEqual([b["address"] for b in buyers][-1], "0xd")
+
+                # Once the launch window has closed, short pages are final too
+                list(
+                    self.brain.iter_token_buyers(token, page_size=3, window_seconds=120)
+                )
+                market.inject_trade("0xe", info, at=launch + timedelta(minutes=1))
+                buyers = [
+                    b["address"]
+                    for b in self.brain.iter_token_buyers(
+                        token, page_size=3, window_seconds=120
+                    )
+                ]
+
+            stats = self.brain.cache.stats()["early_buyers"]
+            self.assertEqual(stats["memory_hits"], 3)
+            self.assertNotIn("0xe", buyers)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+        self.ttls = {"early_buyers": None, "trending_pools": 60}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_then_disk_hits(self):
+        cache = ResponseCache(self.path, ttls=self.ttls)
+        fetch = mock.Mock(return_value={"buyers": ["0x1"]})
+        request = {"query": "q", "variables": {"token": "0xabc"}}
+
+        self.assertEqual(
+            cache.get_or_fetch("early_buyers", request, fetch), {"buyers": ["0x1"]}
+        )
+        self.assertEqual(
+            cache.get_or_fetch("early_buyers", request, fetch), {"buyers": ["0x1"]}
+        )
+        self.assertEqual(fetch.call_count, 1)
+
+        # A fresh instance (new process) is served from the disk tier
+        cache = ResponseCache(self.path, ttls=self.ttls)
+        cache.get_or_fetch("early_buyers", request, fetch)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(
+            cache.stats()["early_buyers"],
+            {"memory_hits": 0, "disk_hits": 1, "misses": 0},
+        )
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(self.path, ttls=self.ttls)
+        fetch = mock.Mock(side_effect=[[1], [2]])
+
+        with mock.patch("cache.time.time", return_value=1000):
+            self.assertEqual(cache.get_or_fetch("trending_pools", "url", fetch), [1])
+        with mock.patch("cache.time.time", return_value=1030):
+            self.assertEqual(cache.get_or_fetch("trending_pools", "url", fetch), [1])
+        with mock.patch("cache.time.time", return_value=1061):
+            self.assertEqual(cache.get_or_fetch("trending_pools", "url", fetch), [2])
+
+    def test_none_results_and_unknown_kinds_are_not_cached(self):
+        cache = ResponseCache(self.path, ttls=self.ttls)
+        fetch = mock.Mock(return_value=None)
+        cache.get_or_fetch("early_buyers", "req", fetch)
+        cache.get_or_fetch("early_buyers", "req", fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+        fetch = mock.Mock(return_value=[1])
+        cache.get_or_fetch("wallet_trades", "req", fetch)
+        cache.get_or_fetch("wallet_trades", "req", fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_lru_evicts_oldest(self):
+        cache = ResponseCache(self.path, ttls=self.ttls, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.get_or_fetch("early_buyers", key, lambda: key)
+        self.assertEqual(len(cache._memory), 2)
+
+        # Evicted from memory but still on disk
+        cache.get_or_fetch("early_buyers", "a", mock.Mock())
+        self.assertEqual(cache.stats()["early_buyers"]["disk_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import cli
+from fake_server import FakeMarket, FakeServer
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("pandas", "streamlit", "web3", "eth_account")
+
+
+def _run(code, cwd, **env):
+    # A fresh interpreter, so module imports and timings are a cold start
+    env = {**os.environ, "PYTHONPATH": REPO, **env}
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cold_start_stays_within_budget(self):
+        # A real command end to end: imports, parsing, one page per listing
+        with FakeServer(FakeMarket(tokens=6, wallets=20)) as server:
+            proc = _run(
+                "import json, runpy, sys, time\n"
+                "start = time.perf_counter()\n"
+                "sys.argv = ['cli.py', 'scout', '--chain', 'ethereum', '--limit', '3']\n"
+                "try:\n"
+                f"    runpy.run_path({os.path.join(REPO, 'cli.py')!r}, run_name='__main__')\n"
+                "except SystemExit as e:\n"
+                "    code = e.code\n"
+                "elapsed = time.perf_counter() - start\n"
+                f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+                "print(json.dumps({'elapsed': elapsed, 'heavy': heavy, 'code': code}),"
+                " file=sys.stderr)\n",
+                self.tmp.name,
+                GECKOTERMINAL_URL=server.gecko_url,
+            )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        result = json.loads(proc.stderr.strip().splitlines()[-1])
+        self.assertEqual(result["code"], cli.EXIT_OK)
+        self.assertEqual(len(json.loads(proc.stdout)["tokens"]["ethereum"]), 3)
+        self.assertEqual(result["heavy"], [])
+        self.assertLess(result["elapsed"], cli.COLD_START_BUDGET)
+
+    def test_scout_prints_json_without_loading_pandas(self):
+        with FakeServer(FakeMarket(tokens=6, wallets=20)) as server:
+            proc = _run(
+                "import sys, config\n"
+                f"config.GECKOTERMINAL_URL = {server.gecko_url!r}\n"
+                "import cli\n"
+                "code = cli.main(['scout', '--chain', 'ethereum', '--limit', '3'])\n"
+                "print('pandas' in sys.modules, file=sys.stderr)\n"
+                "sys.exit(code)\n",
+                self.tmp.name,
+            )
+        self.assertEqual(proc.returncode, cli.EXIT_OK, proc.stderr)
+        tokens = json.loads(proc.stdout)["tokens"]["ethereum"]
+        self.assertEqual(len(tokens), 3)
+        self.assertEqual(proc.stderr.strip().splitlines()[-1], "False")
+
+    def test_usage_errors_exit_2(self):
+        with self.assertRaises(SystemExit) as raised:
+            cli.build_parser().parse_args(["analyze"])
+        self.assertEqual(raised.exception.code, cli.EXIT_USAGE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from copier import Copier
+from profile_store import ProfileStore
+from signal_store import SignalStore
+
+
+class TestCopier(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.tmp.name, "signals.db")
+        self.copier = Copier(signals=SignalStore(db_path, legacy_path=None))
+
+    def tearDown(self):
+        self.copier.signals.close()
+        self.tmp.cleanup()
+
+    def _trade(self, taker, tx_hash):
+        return json.dumps(
+            {
+                "transaction": {"hash": tx_hash},
+                "taker": {"address": taker},
+                "buyCurrency": {"symbol": "PEPE", "address": "0xpepe"},
+                "buyAmount": 5.0,
+                "block": {"height": 1, "timestamp": {"time": "2024-01-01 00:00:00"}},
+            }
+        )
+
+    def test_stream_logs_watched_wallets_once(self):
+        self.copier.update_watchlist(["0xAAA"])
+        self.copier.is_running = True
+        lines = [
+            self._trade("0xaaa", "0x1"),
+            "",  # keep-alive
+            self._trade("0xbbb", "0x2"),  # not watched
+            self._trade("0xaaa", "0x1"),  # duplicate
+        ]
+        self.copier._consume_stream(lines)
+
+        signals = self.copier.signals.recent()
+        self.assertEqual(
+            [(s["wallet"], s["tx_hash"]) for s in signals], [("0xAAA", "0x1")]
+        )
+
+    def test_new_signals_are_queued_for_execution(self):
+        self.copier.executor = mock.Mock()
+        self.copier.update_watchlist(["0xAAA"])
+        self.copier.is_running = True
+        lines = [self._trade("0xaaa", "0x1"), self._trade("0xaaa", "0x1")]
+        self.copier._consume_stream(lines)
+
+        self.copier.executor.submit.assert_called_once()
+        signal = self.copier.executor.submit.call_args.args[0]
+        self.assertEqual(signal["token_address"], "0xpepe")
+
+    def test_scan_reports_active_wallets(self):
+        self.copier.update_watchlist(["0xAAA", "0xBBB"])
+        trades = {"0xAAA": [json.loads(self._trade("0xaaa", "0x1"))], "0xBBB": []}
+        with mock.patch.object(
+            self.copier.brain, "get_trades_for_wallets", return_value=trades
+        ):
+            active = self.copier._scan_and_log(["0xAAA", "0xBBB"])
+
+        self.assertEqual(active, {"0xAAA"})
+        self.assertIn("0xBBB", self.copier.cursors)
+
+    def test_failed_scan_reschedules_its_wallets(self):
+        self.copier.update_watchlist(["0xAAA"])
+
+        def failing_scan(wallets):
+            self.copier.stop_listening()
+            raise ConnectionError("BitQuery unreachable")
+
+        with mock.patch.object(self.copier, "_scan_and_log", side_effect=failing_scan):
+            self.copier.start_listening()
+
+        self.assertIsNotNone(self.copier.scheduler._state["0xAAA"]["next_due"])
+        self.assertGreater(self.copier.scheduler.next_wakeup(), 0)
+
+    def test_split_route_rows_are_executed_once(self):
+        self.copier.executor = mock.Mock()
+        self.copier.update_watchlist(["0xAAA"])
+        # One swap routed through two pools: two rows, one tx_hash
+        row = json.loads(self._trade("0xaaa", "0x1"))
+        with mock.patch.object(
+            self.copier.brain,
+            "get_trades_for_wallets",
+            return_value={"0xAAA": [row, dict(row)]},
+        ):
+            self.copier._scan_and_log(["0xAAA"])
+
+        self.copier.executor.submit.assert_called_once()
+        self.assertEqual(self.copier.signals.count(), 1)
+
+    def test_watchlist_changes_are_applied_as_a_diff(self):
+        self.copier.update_watchlist(["0xAAA", "0xBBB"])
+        self.copier.cursors["0xAAA"] = "2024-01-01T00:00:00Z"
+        self.copier.change_watchlist(added=["0xCCC", "0xAAA"], removed=["0xBBB"])
+
+        self.assertEqual(self.copier.active_watchlist, ["0xAAA", "0xCCC"])
+        self.assertEqual(self.copier.cursors, {"0xAAA": "2024-01-01T00:00:00Z"})
+        self.assertEqual(len(self.copier.scheduler), 2)
+        self.assertTrue(self.copier._wake.is_set())
+
+    def test_watchlist_is_reloaded_on_restart(self):
+        profiles = ProfileStore(os.path.join(self.tmp.name, "profiles.db"))
+        copier = Copier(signals=self.copier.signals, profiles=profiles)
+        copier.update_watchlist(["0xAAA", "0xBBB"], scores={"0xAAA": 95})
+
+        restarted = Copier(signals=self.copier.signals, profiles=profiles)
+        self.assertEqual(restarted.active_watchlist, ["0xAAA", "0xBBB"])
+        self.assertEqual(len(restarted.scheduler), 2)
+        profiles.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from copier_daemon import CopierClient, CopierDaemon
+
+
+class FakeCopier:
+    def __init__(self):
+        self.active_watchlist = []
+        self.is_running = False
+        self.last_scan_at = None
+        self.signals = mock.Mock()
+        self.signals.count.return_value = 3
+        self._stop = threading.Event()
+
+    def update_watchlist(self, wallets, scores=None):
+        self.active_watchlist = wallets
+        self.scores = scores
+
+    def start_listening(self):
+        self.is_running = True
+        self._stop.wait()
+
+    def stop_listening(self):
+        self.is_running = False
+        self._stop.set()
+
+
+class TestCopierDaemon(unittest.TestCase):
+    def setUp(self):
+        self.copier = FakeCopier()
+        self.daemon = CopierDaemon(copier=self.copier, host="127.0.0.1", port=0)
+        threading.Thread(target=self.daemon.httpd.serve_forever, daemon=True).start()
+        host, port = self.daemon.address
+        self.client = CopierClient(host=host, port=port)
+
+    def tearDown(self):
+        self.daemon.stop()
+        self.daemon.httpd.shutdown()
+        self.daemon.httpd.server_close()
+
+    def test_control_channel(self):
+        health = self.client.health()
+        self.assertFalse(health["running"])
+        self.assertEqual(health["signals"], 3)
+
+        self.client.update_watchlist(["0xa", "0xb"], scores={"0xa": 90})
+        self.assertEqual(self.client.watchlist(), ["0xa", "0xb"])
+        self.assertEqual(self.copier.scores, {"0xa": 90})
+
+        self.assertTrue(self.client.start()["started"])
+        # A second start while running is a no-op
+        self.assertFalse(self.client.start()["started"])
+        deadline = time.monotonic() + 2
+        while not self.client.health()["running"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(self.client.health()["running"])
+
+        self.client.stop()
+        self.assertFalse(self.client.health()["running"])
+
+    def test_unreachable_worker(self):
+        client = CopierClient(host="127.0.0.1", port=1, timeout=0.5)
+        self.assertIsNone(client.health())
+        self.assertFalse(client.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import config
+from brain import Brain
+from cache import ResponseCache
+from discovery import scan_chains
+from early_index import EarlyBuyerIndex
+from fake_server import FakeMarket, FakeServer
+from prices import PriceService
+from request_scheduler import RequestScheduler
+from scout import Scout
+
+
+class TestDiscovery(unittest.TestCase):
+    def test_chains_are_scanned_and_merged(self):
+        chains = ["ethereum", "base"]
+        with tempfile.TemporaryDirectory() as tmp, FakeServer(
+            FakeMarket(tokens=4, wallets=80)
+        ) as server:
+            cache = ResponseCache(os.path.join(tmp, "cache.db"), ttls=config.CACHE_TTLS)
+            # Unlimited, so the test spends none of the shared request budget
+            scheduler = RequestScheduler()
+            scout = Scout(scheduler=scheduler, cache=cache)
+            scout.base_url = server.gecko_url
+            brains = {}
+            for chain in chains:
+                brains[chain] = Brain(chain, scheduler=scheduler, cache=cache)
+                brains[chain].url = server.bitquery_url
+
+            index = EarlyBuyerIndex(os.path.join(tmp, "early_buyers.db"))
+            prices = PriceService(os.path.join(tmp, "prices.db"), scheduler=scheduler)
+            tokens_by_chain, ranked = scan_chains(
+                chains,
+                token_limit=2,
+                buyer_limit=30,
+                scout=scout,
+                brains=brains,
+                index=index,
+                prices=prices,
+            )
+            # Every token's early buyers were indexed
+            token = tokens_by_chain["base"][0]["address"]
+            self.assertEqual(len(index.wallets_for_token(token, chain="base")), 30)
+            index.close()
+            # ... and their pool prices recorded
+            self.assertEqual(len(prices.history("base", token)), 1)
+            prices.close()
+
+        self.assertEqual(brains["base"].root, "ethereum(network: base)")
+        self.assertEqual(sorted(tokens_by_chain), sorted(chains))
+        self.assertTrue(all(t["chain"] == "base" for t in tokens_by_chain["base"]))
+        # One pool across chains, best first, each wallet tagged with its chain
+        self.assertEqual({w["chain"] for w in ranked}, set(chains))
+        scores = [w["score"] for w in ranked]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        # Each chain's queries are cached separately
+        self.assertEqual(server.requests["trending_pools"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
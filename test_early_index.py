@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from early_index import EarlyBuyerIndex
+
+
+class TestEarlyBuyerIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "early_buyers.db")
+        self.index = EarlyBuyerIndex(self.path)
+        self.now = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def _buyers(self, *wallets, at="2024-02-20T00:00:00Z"):
+        return [{"address": w, "first_buy_at": at} for w in wallets]
+
+    def test_both_directions_and_incremental_updates(self):
+        self.assertEqual(
+            self.index.record("ethereum", "0xT1", self._buyers("0xA", "0xb")), 2
+        )
+        # A deeper page of the same token only adds the newcomer
+        self.assertEqual(
+            self.index.record("ethereum", "0xt1", self._buyers("0xa", "0xb", "0xc")),
+            1,
+        )
+
+        self.assertEqual(
+            [row[:2] for row in self.index.wallets_for_token("0xt1")],
+            [("0xa", 1), ("0xb", 2), ("0xc", 3)],
+        )
+        self.assertEqual(
+            self.index.tokens_for_wallet("0xA"),
+            [("ethereum", "0xt1", 1, "2024-02-20T00:00:00Z")],
+        )
+
+    def test_repeat_wallets(self):
+        self.index.record("ethereum", "0xt1", self._buyers("0xa", "0xb"))
+        self.index.record("ethereum", "0xt2", self._buyers("0xc", "0xa"))
+        self.index.record("ethereum", "0xt3", self._buyers("0xb", "0xc"))
+        # Too old for a 30-day window
+        self.index.record(
+            "ethereum", "0xold", self._buyers("0xd", at="2023-01-01T00:00:00Z")
+        )
+        self.index.record(
+            "ethereum", "0xold2", self._buyers("0xd", at="2023-01-02T00:00:00Z")
+        )
+
+        repeat = self.index.repeat_wallets(min_tokens=2, days=30, now=self.now)
+        self.assertEqual([r["wallet"] for r in repeat], ["0xa", "0xb", "0xc"])
+        self.assertEqual(repeat[0], {"wallet": "0xa", "tokens": 2, "best_rank": 1})
+
+        self.assertEqual(
+            self.index.repeat_wallets(2, 30, wallets=["0xB", "0xd"], now=self.now),
+            [{"wallet": "0xb", "tokens": 2, "best_rank": 1}],
+        )
+        self.assertEqual(
+            self.index.repeat_wallets(2, 30, chain="base", now=self.now), []
+        )
+        self.assertEqual(len(self.index.repeat_wallets(2, 3650, now=self.now)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import time
+import unittest
+from unittest import mock
+import config
+from executor import Executor, NonceManager, SwapTemplate
+from fake_server import FakeServer
+
+SENDER = "0x" + "ab" * 20
+TOKEN = "0x" + "cd" * 20
+
+
+def _signal(n, token=TOKEN):
+    return {"tx_hash": f"0xsig{n}", "wallet": "0xwhale", "token_address": token}
+
+
+class TestExecutor(unittest.TestCase):
+    def _drain(self, executor, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            done = [o for o in executor.orders if o["status"] != "pending"]
+            if len(done) >= count:
+                return
+            time.sleep(0.01)
+        self.fail("orders were not processed in time")
+
+    def test_template_fills_only_per_order_fields(self):
+        template = SwapTemplate(
+            "ethereum", SENDER, value_wei=10**16, gas=250000, gas_price=10**9
+        )
+        tx = template.build(TOKEN, nonce=7, now=1000, min_out=5)
+        words = [tx["data"][10 + i : 74 + i] for i in range(0, 7 * 64, 64)]
+
+        self.assertEqual(tx["data"][:10], "0x7ff36ab5")
+        self.assertEqual(int(words[0], 16), 5)  # amountOutMin
+        self.assertEqual(int(words[1], 16), 0x80)  # offset of the path array
+        self.assertEqual(words[2], SENDER[2:].rjust(64, "0"))
+        self.assertEqual(int(words[3], 16), 1000 + 120)  # deadline
+        self.assertEqual(int(words[4], 16), 2)  # path length
+        self.assertEqual(
+            words[5][-40:], config.CHAINS["ethereum"]["wrapped_native"][2:].lower()
+        )
+        self.assertEqual(words[6][-40:], TOKEN[2:])
+        self.assertEqual(tx["nonce"], 7)
+        self.assertEqual(tx["to"], config.CHAINS["ethereum"]["router"])
+
+        with self.assertRaises(ValueError):
+            SwapTemplate("solana", SENDER, 1, 1, 1)
+
+    def test_paper_mode_records_latency_without_sending(self):
+        executor = Executor(mode="paper", rpc_url="http://127.0.0.1:1", sender=SENDER)
+        executor.start()
+        try:
+            quote = config.QUOTE_TOKENS[1]
+            executor.submit(_signal(1), detected_at=time.time() - 2)
+            executor.submit(_signal(2, token=quote))  # buying WETH: skipped
+            executor.submit(_signal(3))
+            self._drain(executor, 2)
+        finally:
+            executor.stop()
+
+        orders = list(executor.orders)
+        self.assertEqual([o["signal"] for o in orders], ["0xsig1", "0xsig3"])
+        self.assertEqual([o["nonce"] for o in orders], [0, 1])
+        self.assertEqual({o["status"] for o in orders}, {"paper"})
+        self.assertGreaterEqual(orders[0]["latency"], 2)
+        self.assertEqual(executor.stats()["orders"], {"paper": 2})
+
+    def test_live_mode_submits_with_local_nonces(self):
+        with FakeServer() as server:
+            # Another client already used nonces 0-2 of the account
+            server._nonces[SENDER] = 3
+            executor = Executor(mode="live", rpc_url=server.rpc_url, sender=SENDER)
+            with mock.patch.object(config, "EXECUTION_GAS_PRICE_GWEI", None):
+                executor.start()
+            try:
+                for n in range(5):
+                    executor.submit(_signal(n))
+                self._drain(executor, 5)
+            finally:
+                executor.stop()
+
+            sent = sorted(int(tx["nonce"], 16) for tx in server.transactions)
+            self.assertEqual(sent, [3, 4, 5, 6, 7])
+            # One nonce and one gas price lookup, then a quote per order
+            self.assertEqual(server.requests["rpc"], 12)
+            self.assertEqual(server.transactions[0]["gasPrice"], hex(10**9))
+            # The fake router quotes 1000 tokens per wei; 1% slippage
+            min_out = int(server.transactions[0]["data"][10:74], 16)
+            self.assertEqual(min_out, 10**16 * 1000 * 99 // 100)
+
+        stats = executor.stats()
+        self.assertEqual(stats["orders"], {"submitted": 5})
+        self.assertIsNotNone(stats["latency_p95"])
+
+    def test_any_failed_submission_resyncs_nonces(self):
+        executor = Executor(mode="live", rpc_url="http://127.0.0.1:1", sender=SENDER)
+        executor.template = SwapTemplate(
+            "ethereum", SENDER, value_wei=10**16, gas=250000, gas_price=10**9
+        )
+        executor.nonces = NonceManager(start=1)
+        order = {"signal": "0xsig1", "status": "pending"}
+        with mock.patch.object(executor, "_min_out", return_value=1), mock.patch.object(
+            executor, "_rpc", side_effect=ConnectionError("connection reset")
+        ):
+            executor._send(TOKEN, order)
+
+        self.assertEqual(order["status"], "failed")
+        self.assertEqual(order["nonce"], 1)
+        self.assertIsNone(executor.nonces._next)
+
+    def test_failed_quote_spends_no_nonce(self):
+        tokens = [f"0x{n:040x}" for n in range(1, 9)]
+        with FakeServer(latency=0.01) as server:
+            server._nonces[SENDER] = 3
+            server.unpaired.add(tokens[2])  # no V2 pair: its quote reverts
+            executor = Executor(mode="live", rpc_url=server.rpc_url, sender=SENDER)
+            with mock.patch.object(config, "EXECUTION_GAS_PRICE_GWEI", 1):
+                executor.start()
+            try:
+                for n, token in enumerate(tokens):
+                    executor.submit(_signal(n, token=token))
+                self._drain(executor, len(tokens))
+            finally:
+                executor.stop()
+
+            sent = sorted(int(tx["nonce"], 16) for tx in server.transactions)
+
+        # Seven orders went out on nonces 3-9, unique and without a gap
+        self.assertEqual(sent, list(range(3, 10)))
+        failed = [o for o in executor.orders if o["status"] == "failed"]
+        self.assertEqual([o["token"] for o in failed], [tokens[2]])
+        self.assertIsNone(failed[0]["nonce"])
+        self.assertEqual(executor.stats()["orders"], {"submitted": 7, "failed": 1})
+
+    def test_rejected_nonce_resyncs_from_the_node(self):
+        counts = iter([0, 4])
+        nonces = NonceManager(fetch=lambda: next(counts))
+        self.assertEqual([nonces.next(), nonces.next()], [0, 1])
+        nonces.reset()
+        self.assertEqual(nonces.next(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
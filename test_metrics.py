@@ -0,0 +1,115 @@
+import glob
+import json
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+import config
+import metrics as metrics_module
+from metrics import Metrics, scan_profiler, start_export
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counters_and_histograms_render(self):
+        metrics = Metrics(buckets=(0.1, 1))
+        metrics.inc("api_requests_total", endpoint="bitquery", status=200)
+        metrics.inc("api_requests_total", endpoint="bitquery", status=200)
+        metrics.observe("api_request_seconds", 0.05, endpoint="bitquery")
+        metrics.observe("api_request_seconds", 0.5, endpoint="bitquery")
+        metrics.observe("api_request_seconds", 5, endpoint="bitquery")
+
+        text = metrics.render_prometheus()
+        self.assertIn('api_requests_total{endpoint="bitquery",status="200"} 2', text)
+        # Buckets are cumulative in the exposition format
+        self.assertIn(
+            'api_request_seconds_bucket{endpoint="bitquery",le="0.1"} 1', text
+        )
+        self.assertIn('api_request_seconds_bucket{endpoint="bitquery",le="1"} 2', text)
+        self.assertIn(
+            'api_request_seconds_bucket{endpoint="bitquery",le="+Inf"} 3', text
+        )
+        self.assertIn('api_request_seconds_count{endpoint="bitquery"} 3', text)
+
+    def test_request_hook_and_json_file(self):
+        metrics = Metrics()
+        metrics.request_hook("bitquery", "POST", "u", 429, 0.2, 0, None)
+        metrics.request_hook("bitquery", "POST", "u", 200, 0.1, 1, None)
+        with metrics.timer("copier_scan_seconds"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            metrics.write_json(path)
+            with open(path) as f:
+                snapshot = json.load(f)
+
+        counters = {
+            (c["name"], c["labels"].get("status")): c["value"]
+            for c in snapshot["counters"]
+        }
+        self.assertEqual(counters[("api_errors_total", None)], 1)
+        self.assertEqual(counters[("api_retries_total", None)], 1)
+        self.assertEqual(
+            [
+                h["count"]
+                for h in snapshot["histograms"]
+                if h["name"] == "copier_scan_seconds"
+            ],
+            [1],
+        )
+
+    def test_second_process_gets_its_own_exports(self):
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            port = taken.getsockname()[1]
+            with mock.patch.object(
+                metrics_module, "_exporters", []
+            ), mock.patch.multiple(
+                config, METRICS_PORT=port, METRICS_FILE="metrics.json"
+            ), mock.patch(
+                "atexit.register"
+            ), mock.patch.object(
+                metrics_module.threading, "Thread"
+            ):
+                # The copier worker neither binds METRICS_PORT nor shares the file
+                self.assertIsNone(start_export(process="copier"))
+                self.assertEqual(metrics_module._exporters, ["metrics.copier.json"])
+
+            with mock.patch.object(metrics_module, "_exporters", []):
+                # A port already in use is skipped, not raised
+                self.assertIsNone(start_export(port=port, path=""))
+                self.assertEqual(metrics_module._exporters, [])
+
+    def test_absorbed_snapshots_are_exported_with_labels(self):
+        shard = Metrics()
+        shard.inc("copier_wallets_polled_total", 5)
+        shard.observe("copier_scan_seconds", 0.2)
+
+        metrics = Metrics()
+        metrics.inc("copier_wallets_polled_total", 1)
+        metrics.absorb("shard-0", shard.snapshot(), shard=0)
+        shard.inc("copier_wallets_polled_total", 5)
+        metrics.absorb("shard-0", shard.snapshot(), shard=0)  # replaces
+
+        text = metrics.render_prometheus()
+        self.assertIn("copier_wallets_polled_total 1", text)
+        self.assertIn('copier_wallets_polled_total{shard="0"} 10', text)
+        self.assertIn('copier_scan_seconds_count{shard="0"} 1', text)
+        self.assertEqual(text.count("# TYPE copier_wallets_polled_total"), 1)
+
+        metrics.forget("shard-0")
+        self.assertNotIn('shard="0"', metrics.render_prometheus())
+
+    def test_scan_profiler_keeps_newest_dumps(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+            config, PROFILE_SCANS=True, SCAN_PROFILE_DIR=tmp, SCAN_PROFILE_KEEP=2
+        ):
+            for _ in range(3):
+                with scan_profiler("scan"):
+                    sum(range(1000))
+            self.assertEqual(len(glob.glob(os.path.join(tmp, "scan-*.prof"))), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import config
+from brain import Brain
+from cache import ResponseCache
+from early_index import EarlyBuyerIndex
+from fake_server import FakeMarket, FakeServer
+from orchestrator import Orchestrator
+from prices import PriceService
+from request_scheduler import RequestScheduler
+from scout import Scout
+
+
+class FakeCopier:
+    def __init__(self):
+        self.updates = []
+
+    def update_watchlist(self, wallets, scores=None):
+        self.updates.append((wallets, scores))
+
+
+def _wait_for(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestOrchestrator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeServer(FakeMarket(tokens=6, wallets=80)).start()
+        cache = ResponseCache(
+            os.path.join(self.tmp.name, "cache.db"), ttls=config.CACHE_TTLS
+        )
+        # Unlimited, so the test spends none of the shared request budget
+        scheduler = RequestScheduler()
+        self.scout = Scout(scheduler=scheduler, cache=cache)
+        self.scout.base_url = self.server.gecko_url
+        self.brain = Brain("ethereum", scheduler=scheduler, cache=cache)
+        self.brain.url = self.server.bitquery_url
+        self.index = EarlyBuyerIndex(os.path.join(self.tmp.name, "early_buyers.db"))
+        self.prices = PriceService(
+            os.path.join(self.tmp.name, "prices.db"), scheduler=scheduler
+        )
+        self.copier = FakeCopier()
+        patcher = mock.patch.multiple(
+            config,
+            ORCHESTRATOR_TOKENS_PER_SCAN=4,
+            ORCHESTRATOR_WATCHLIST_INTERVAL=0,
+            ORCHESTRATOR_WATCHLIST_SIZE=3,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.index.close()
+        self.prices.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def _orchestrator(self, **kwargs):
+        return Orchestrator(
+            self.copier,
+            chains=["ethereum"],
+            scout=self.scout,
+            brains={"ethereum": self.brain},
+            index=self.index,
+            prices=self.prices,
+            scan_interval=60,
+            **kwargs,
+        )
+
+    def test_tokens_flow_through_to_the_watchlist(self):
+        orchestrator = self._orchestrator()
+        orchestrator.start()
+        threads = list(orchestrator._threads)
+        try:
+            self.assertTrue(
+                _wait_for(lambda: orchestrator.stats["buyers"].processed == 4)
+            )
+            # The first pushes may come before enough wallets are scored
+            self.assertTrue(
+                _wait_for(
+                    lambda: self.copier.updates and len(self.copier.updates[-1][0]) == 3
+                )
+            )
+        finally:
+            orchestrator.stop(timeout=10)
+
+        stats = orchestrator.stats_snapshot()
+        self.assertEqual(stats["scans"], 1)
+        self.assertEqual(stats["stages"]["scout"]["processed"], 4)
+        self.assertEqual(stats["stages"]["buyers"]["processed"], 4)
+        self.assertEqual(stats["stages"]["buyers"]["errors"], 0)
+        # The copier got the best-scored wallets, best first
+        wallets, scores = self.copier.updates[-1]
+        self.assertEqual(len(wallets), 3)
+        self.assertEqual(wallets, orchestrator.watchlist)
+        ranked = sorted(
+            orchestrator.ranked.values(), key=lambda w: w["score"], reverse=True
+        )
+        self.assertEqual(wallets, [w["address"] for w in ranked[:3]])
+        self.assertEqual(set(scores), set(wallets))
+        self.assertFalse(any(t.is_alive() for t in threads))
+
+    def test_slow_stage_applies_backpressure(self):
+        release = threading.Event()
+        find = self.brain.find_early_buyer_entries
+
+        def slow_find(token_address, limit=50):
+            release.wait(10)
+            return find(token_address, limit=limit)
+
+        orchestrator = self._orchestrator(
+            queue_sizes={"tokens": 1}, workers={"buyers": 1, "scoring": 1}
+        )
+        with mock.patch.object(
+            self.brain, "find_early_buyer_entries", side_effect=slow_find
+        ):
+            orchestrator.start()
+            threads = list(orchestrator._threads)
+            try:
+                # The buyers worker holds the first token and the queue holds
+                # the second, so Scout waits on put() with the third
+                self.assertTrue(
+                    _wait_for(lambda: orchestrator.stats["scout"].processed == 3)
+                )
+                time.sleep(0.5)
+                stats = orchestrator.stats_snapshot()
+                self.assertEqual(stats["queues"]["tokens"]["depth"], 1)
+                self.assertEqual(stats["stages"]["scout"]["processed"], 3)
+                self.assertEqual(stats["stages"]["buyers"]["processed"], 0)
+                self.assertGreater(stats["stages"]["scout"]["blocked_seconds"], 0.25)
+                self.assertEqual(stats["scans"], 0)
+            finally:
+                release.set()
+                orchestrator.stop(timeout=10)
+
+        # Workers finished their current item and exited
+        self.assertFalse(any(t.is_alive() for t in threads))
+        self.assertLessEqual(orchestrator.stats["buyers"].processed, 2)
+
+    def test_rescored_and_stale_wallets_leave_the_ranking(self):
+        orchestrator = self._orchestrator()
+        scored = orchestrator.queues["scored"]
+
+        def wallet(address, score):
+            return {"address": address, "score": score, "chain": "ethereum"}
+
+        thread = threading.Thread(target=orchestrator._watchlist_loop)
+        thread.start()
+        try:
+            scored.put((["0xA", "0xB"], [wallet("0xA", 90), wallet("0xB", 80)]))
+            self.assertTrue(_wait_for(lambda: orchestrator.watchlist == ["0xA", "0xB"]))
+            # 0xA is rescored below MIN_WALLET_SCORE: it drops out
+            scored.put((["0xA"], []))
+            self.assertTrue(_wait_for(lambda: orchestrator.watchlist == ["0xB"]))
+
+            # 0xB is not rescored within the TTL
+            with mock.patch.object(config, "ORCHESTRATOR_RANKED_TTL", 0.1):
+                self.assertTrue(_wait_for(lambda: orchestrator.watchlist == []))
+            self.assertEqual(orchestrator.ranked, {})
+        finally:
+            orchestrator._stop.set()
+            thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
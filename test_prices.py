@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from fake_server import FakeMarket, FakeServer
+from prices import PriceService
+from request_scheduler import RequestScheduler
+
+
+class TestPriceService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = FakeServer(FakeMarket(tokens=25, wallets=5)).start()
+        self.prices = PriceService(
+            os.path.join(self.tmp.name, "prices.db"),
+            ttl=60,
+            batch_size=10,
+            scheduler=RequestScheduler(),
+        )
+        self.prices.base_url = self.server.gecko_url
+        self.tokens = self.server.market.tokens
+
+    def tearDown(self):
+        self.prices.close()
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_batched_lookups_are_cached(self):
+        addresses = [t["address"] for t in self.tokens] + ["0xunknown"]
+        found = self.prices.get("ethereum", [a.upper() for a in addresses[:5]])
+        self.assertEqual(self.server.requests["tokens_multi"], 1)
+
+        found = self.prices.get("ethereum", addresses)
+        # 5 cached; the other 21 fit in three batches of 10
+        self.assertEqual(self.server.requests["tokens_multi"], 4)
+        self.assertEqual(len(found), 25)
+        token = self.tokens[7]
+        self.assertAlmostEqual(found[token["address"]]["price_usd"], token["price"])
+        self.assertEqual(found[token["address"]]["symbol"], token["symbol"])
+
+        self.prices.get("ethereum", addresses)
+        self.assertEqual(self.server.requests["tokens_multi"], 5)  # only 0xunknown
+        self.assertEqual(
+            self.prices.metadata("ethereum", [token["address"]])[token["address"]],
+            {
+                "symbol": token["symbol"],
+                "name": f"Token {token['symbol']}",
+                "decimals": 18,
+            },
+        )
+
+    def test_value_and_history(self):
+        a, b = self.tokens[0], self.tokens[1]
+        values = self.prices.value(
+            "ethereum", [(a["address"], 10), (b["address"], "2"), ("0xnone", 1)]
+        )
+        self.assertAlmostEqual(values[0], 10 * a["price"])
+        self.assertAlmostEqual(values[1], 2 * b["price"])
+        self.assertIsNone(values[2])
+
+        self.prices.record("ethereum", {"0xAbC": "1.5", "0xbad": None}, at=100)
+        self.prices.record("ethereum", {"0xabc": 2.0}, at=200)
+        self.assertIsNone(self.prices.price_at("ethereum", "0xabc", 50))
+        self.assertEqual(self.prices.price_at("ethereum", "0xABC", 150), 1.5)
+        self.assertEqual(self.prices.price_at("ethereum", "0xabc", 250), 2.0)
+        self.assertEqual(
+            self.prices.history("ethereum", "0xabc", start=150), [(200.0, 2.0)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from profile_store import ProfileStore
+
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "profiles.db")
+        self.store = ProfileStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _profile(self, address, score):
+        return {
+            "address": address,
+            "score": score,
+            "reason": "",
+            "win_rate": 0.5,
+            "roi": 0.1,
+            "trades": 4,
+            "age_days": 30.0,
+        }
+
+    def test_staleness_and_source_tokens(self):
+        self.store.save("ethereum", [self._profile("0xAAA", 80)], "0xt1", now=1000)
+        self.store.save("ethereum", [self._profile("0xbbb", 60)], "0xt1", now=5000)
+        self.store.add_source("ethereum", ["0xaaa"], "0xt2")
+
+        fresh = self.store.fresh("ethereum", ["0xaaa", "0xBBB"], max_age=3600, now=6000)
+        self.assertEqual(list(fresh), ["0xbbb"])
+        self.assertEqual(
+            self.store.stale("ethereum", max_age=3600, now=6000), ["0xAAA"]
+        )
+        self.assertEqual(self.store.fresh("base", ["0xbbb"], 3600, now=6000), {})
+
+        # Refreshing keeps the sources gathered so far
+        self.store.save("ethereum", [self._profile("0xAAA", 90)], "0xt3", now=7000)
+        profile = self.store.get("ethereum", "0xaaa")
+        self.assertEqual(profile["score"], 90)
+        self.assertEqual(profile["source_tokens"], ["0xt1", "0xt2", "0xt3"])
+
+    def test_watchlist_survives_reopen(self):
+        self.store.save_watchlist(["0xAAA", "0xbbb"], {"0xAAA": 88})
+        self.store.close()
+
+        self.store = ProfileStore(self.path)
+        self.assertEqual(
+            self.store.load_watchlist(), (["0xAAA", "0xbbb"], {"0xAAA": 88})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
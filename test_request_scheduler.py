@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from request_scheduler import RequestScheduler
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_costs_and_unbudgeted_providers(self):
+        scheduler = RequestScheduler(budgets={"bitquery": 600})
+        self.assertGreater(
+            scheduler.estimate_cost("bitquery", {"limit": 500}),
+            scheduler.estimate_cost("bitquery", {"limit": 10}),
+        )
+        self.assertEqual(scheduler.acquire("geckoterminal", 1000), 0.0)
+        self.assertIsNone(scheduler.available("geckoterminal"))
+        with self.assertRaises(ValueError):
+            scheduler.acquire("bitquery", 1, lane="urgent")
+
+    def test_lower_lanes_leave_the_reserve(self):
+        scheduler = RequestScheduler(
+            budgets={"bitquery": 600}, reserves={"discovery": 0.5}
+        )
+        # Discovery may spend down to the reserve without waiting...
+        self.assertLess(scheduler.acquire("bitquery", 300, lane="discovery"), 0.1)
+        # ...and live polling can still spend what is left
+        self.assertLess(scheduler.acquire("bitquery", 300, lane="live"), 0.1)
+        self.assertLess(scheduler.available("bitquery"), 1)
+
+    def test_live_lane_goes_first(self):
+        # 100 points/sec; the bucket starts empty
+        scheduler = RequestScheduler(budgets={"bitquery": 6000})
+        scheduler.acquire("bitquery", 6000, lane="live")
+        done = []
+
+        def request(lane):
+            scheduler.acquire("bitquery", 40, lane=lane)
+            done.append(lane)
+
+        discovery = threading.Thread(target=request, args=("discovery",))
+        discovery.start()
+        time.sleep(0.05)
+        live = threading.Thread(target=request, args=("live",))
+        live.start()
+        discovery.join(5)
+        live.join(5)
+
+        self.assertEqual(done, ["live", "discovery"])
+
+    def test_processes_share_one_bucket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "budgets.db")
+            # Two schedulers on one file stand in for two processes
+            discovery = RequestScheduler(budgets={"bitquery": 6000}, path=path)
+            copier = RequestScheduler(budgets={"bitquery": 6000}, path=path)
+
+            discovery.acquire("bitquery", 6000, lane="discovery")
+            self.assertLess(copier.available("bitquery"), 100)
+
+            done = []
+
+            def request(scheduler, lane):
+                scheduler.acquire("bitquery", 40, lane=lane)
+                done.append(lane)
+
+            waiting = threading.Thread(target=request, args=(discovery, "discovery"))
+            waiting.start()
+            time.sleep(0.05)
+            live = threading.Thread(target=request, args=(copier, "live"))
+            live.start()
+            waiting.join(5)
+            live.join(5)
+
+        # The copier's live request went ahead of discovery's earlier one
+        self.assertEqual(done, ["live", "discovery"])
+
+
+if __name__ == "__main__":
+    unittest.main()
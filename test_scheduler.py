@@ -0,0 +1,59 @@
+import unittest
+from scheduler import WatchScheduler
+
+
+class TestWatchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = WatchScheduler(
+            min_interval=60,
+            max_interval=3600,
+            idle_backoff=2,
+            requests_per_minute=2,
+            batch_size=2,
+        )
+
+    def test_new_wallets_are_due_immediately(self):
+        self.scheduler.set_wallets(["0xa", "0xb"], now=0)
+        self.assertEqual(sorted(self.scheduler.due(now=0)), ["0xa", "0xb"])
+        # Parked until recorded
+        self.assertEqual(self.scheduler.due(now=0), [])
+
+    def test_interval_follows_score_and_activity(self):
+        self.scheduler.set_wallets(["0xhi", "0xlo"], scores={"0xhi": 100, "0xlo": 0})
+        self.assertEqual(self.scheduler.interval("0xhi"), 60)
+        self.assertEqual(self.scheduler.interval("0xlo"), 3600)
+
+        self.scheduler.set_wallets(["0xmid"], scores={"0xmid": 90})
+        base = self.scheduler.interval("0xmid")
+        self.scheduler.record("0xmid", active=False, now=0)
+        self.assertEqual(self.scheduler.interval("0xmid"), base * 2)
+        self.scheduler.record("0xmid", active=True, now=0)
+        self.assertEqual(self.scheduler.interval("0xmid"), 60)
+
+    def test_request_budget_defers_excess_wallets(self):
+        wallets = [f"0x{i}" for i in range(6)]
+        self.scheduler.set_wallets(wallets, now=0)
+
+        # Two requests of two wallets each fit in the budget
+        first = self.scheduler.due(now=0)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(self.scheduler.due(now=0), [])
+        self.assertGreater(self.scheduler.next_wakeup(now=0), 0)
+
+        # Half a minute refills one request
+        self.assertEqual(len(self.scheduler.due(now=30)), 2)
+
+    def test_set_wallets_diffs_membership(self):
+        self.scheduler.set_wallets(["0xa", "0xb"], now=0)
+        self.scheduler.due(now=0)
+        self.scheduler.record("0xa", active=False, now=0)
+
+        added, removed = self.scheduler.set_wallets(["0xa", "0xc"], now=0)
+        self.assertEqual((added, removed), (["0xc"], ["0xb"]))
+        # 0xa keeps its idle backoff; 0xc is due now
+        self.assertEqual(self.scheduler.due(now=1), ["0xc"])
+        self.assertEqual(len(self.scheduler), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
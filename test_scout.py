@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import config
+from cache import ResponseCache
+from fake_server import FakeMarket, FakeServer
+from request_scheduler import RequestScheduler
+from scout import Scout
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+
+def _pool(token, liquidity=50000, volume=100000):
+    return {
+        "attributes": {
+            "name": f"{token[-3:].upper()} / WETH",
+            "address": f"0xpool{token}",
+            "reserve_in_usd": str(liquidity),
+            "volume_usd": {"h24": str(volume)},
+        },
+        "relationships": {"base_token": {"data": {"id": f"eth_{token}"}}},
+    }
+
+
+class TestScout(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scout = Scout(
+            scheduler=RequestScheduler(),
+            cache=ResponseCache(
+                os.path.join(self.tmp.name, "cache.db"), ttls=config.CACHE_TTLS
+            ),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_are_deduplicated_and_filtered(self):
+        listings = {
+            "trending_pools": [
+                [_pool("0xaaa"), _pool("0xaaa"), _pool("0xbbb", liquidity=10)],
+                [_pool(WETH), _pool("0xccc")],
+                [],
+            ],
+            "new_pools": [[_pool("0xddd"), _pool("0xAAA")], []],
+        }
+        calls = []
+
+        def get_pools(chain_slug, chain, source, page):
+            calls.append((source, page))
+            return listings[source][page - 1]
+
+        with mock.patch.object(self.scout, "_get_pools", side_effect=get_pools):
+            tokens = list(self.scout.iter_tokens(chain="ethereum", max_pages=5))
+
+        # Sources are fetched concurrently, so either spelling may come first
+        self.assertEqual(
+            sorted(t["address"].lower() for t in tokens), ["0xaaa", "0xccc", "0xddd"]
+        )
+        self.assertEqual({t["chain"] for t in tokens}, {"ethereum"})
+        # Each listing is paged until it runs out
+        self.assertEqual(
+            sorted(calls),
+            [
+                ("new_pools", 1),
+                ("new_pools", 2),
+                ("trending_pools", 1),
+                ("trending_pools", 2),
+                ("trending_pools", 3),
+            ],
+        )
+
+    def test_stops_paging_once_limit_is_reached(self):
+        with FakeServer(FakeMarket(tokens=100, wallets=10)) as server:
+            self.scout.base_url = server.gecko_url
+            tokens = self.scout.get_trending_tokens(limit=5)
+            requests = dict(server.requests)
+
+        self.assertEqual(len(tokens), 5)
+        self.assertEqual(len({t["address"] for t in tokens}), 5)
+        # One page per listing is plenty for five tokens
+        self.assertLessEqual(requests.get("trending_pools", 0), 1)
+        self.assertLessEqual(requests.get("new_pools", 0), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
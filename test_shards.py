@@ -0,0 +1,137 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+from fake_server import FakeMarket, FakeServer
+from metrics import get_metrics
+from shards import HashRing, ShardedCopier
+from signal_store import SignalStore
+
+WALLETS = [f"0x{i:040x}" for i in range(3000)]
+
+
+def _wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+class TestHashRing(unittest.TestCase):
+    def test_adding_a_node_moves_only_its_share(self):
+        ring = HashRing(range(3), vnodes=64)
+        before = {w: ring.node_for(w) for w in WALLETS}
+        sizes = Counter(before.values())
+        self.assertEqual(set(sizes), {0, 1, 2})
+        self.assertGreater(min(sizes.values()), len(WALLETS) / 3 * 0.7)
+
+        ring.add(3)
+        after = {w: ring.node_for(w) for w in WALLETS}
+        moved = [w for w in WALLETS if before[w] != after[w]]
+        # Every move goes to the new node, about a quarter of the wallets
+        self.assertEqual({after[w] for w in moved}, {3})
+        self.assertLess(len(moved), len(WALLETS) / 4 * 1.4)
+
+        ring.remove(3)
+        self.assertEqual({w: ring.node_for(w) for w in WALLETS}, before)
+        self.assertEqual(ring.node_for(WALLETS[5].upper()), before[WALLETS[5]])
+
+
+class TestShardedCopier(unittest.TestCase):
+    def test_shards_poll_their_wallets_into_one_sink(self):
+        with tempfile.TemporaryDirectory() as tmp, FakeServer(
+            FakeMarket(tokens=5, wallets=40)
+        ) as server:
+            signals = SignalStore(os.path.join(tmp, "signals.db"), legacy_path=None)
+            copier = ShardedCopier(
+                shards=2,
+                signals=signals,
+                bitquery_url=server.bitquery_url,
+                budget_path=os.path.join(tmp, "budgets.db"),
+            )
+            thread = None
+            try:
+                wallets = server.market.wallets
+                copier.update_watchlist(wallets[:30])
+                members = dict(copier.members)
+                self.assertEqual(set(members.values()), {0, 1})
+
+                # Diffs only: dropped wallets leave, kept ones stay put
+                copier.update_watchlist(wallets[10:40], scores={wallets[20]: 90})
+                self.assertEqual(len(copier.members), 30)
+                self.assertNotIn(wallets[0], copier.members)
+                for wallet in wallets[10:30]:
+                    self.assertEqual(copier.members[wallet], members[wallet])
+
+                # One recent trade per shard
+                picks = {}
+                for wallet in wallets[10:40]:
+                    picks.setdefault(copier.members[wallet], wallet)
+                for wallet in picks.values():
+                    server.inject_trade(wallet)
+
+                thread = threading.Thread(target=copier.start_listening)
+                thread.start()
+                self.assertTrue(_wait_for(lambda: signals.count() == 2))
+                self.assertEqual(
+                    {s["wallet"] for s in signals.recent()}, set(picks.values())
+                )
+
+                # A third shard takes over only the wallets that hash onto it
+                before = dict(copier.members)
+                copier.add_shard()
+                moved = [w for w in before if copier.members[w] != before[w]]
+                self.assertTrue(moved)
+                self.assertEqual({copier.members[w] for w in moved}, {2})
+                self.assertTrue(
+                    _wait_for(
+                        lambda: copier.shard_stats()["2"].get("wallets") == len(moved)
+                        and copier.shard_stats()["2"].get("last_scan_at")
+                    )
+                )
+                # Re-polling a moved wallet does not duplicate its signal
+                self.assertEqual(signals.count(), 2)
+
+                # The shards' own metrics are exported by this process
+                self.assertTrue(
+                    _wait_for(
+                        lambda: {
+                            s["labels"].get("shard")
+                            for s in get_metrics().snapshot()["counters"]
+                            if s["name"] == "copier_wallets_polled_total"
+                        }
+                        >= {"0", "1"}
+                    )
+                )
+            finally:
+                copier.stop_listening()
+                if thread is not None:
+                    thread.join(timeout=10)
+                copier.close()
+                signals.close()
+
+    def test_sink_executes_with_the_shards_detection_time(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            signals = SignalStore(os.path.join(tmp, "signals.db"), legacy_path=None)
+            copier = ShardedCopier.__new__(ShardedCopier)
+            copier.signals = signals
+            copier.executor = mock.Mock()
+            signal = {"tx_hash": "0x1", "wallet": "0xAAA", "token_address": "0xpepe"}
+
+            copier._handle(("signals", 0, ([signal], 1000.0)))
+            copier._handle(("signals", 1, ([dict(signal)], 1001.0)))  # duplicate
+
+            copier.executor.submit.assert_called_once()
+            self.assertEqual(
+                copier.executor.submit.call_args.kwargs["detected_at"], 1000.0
+            )
+            signals.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+from signal_store import SignalStore
+
+
+class TestSignalStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "signals.db")
+        self.legacy_path = os.path.join(self.tmp.name, "signals.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _signal(self, tx_hash, wallet="0xabc"):
+        return {"tx_hash": tx_hash, "wallet": wallet, "token": "PEPE", "type": "BUY"}
+
+    def test_dedup_by_tx_hash(self):
+        store = SignalStore(self.db_path, legacy_path=None)
+        added = store.add([self._signal("0x1"), self._signal("0x2")])
+        self.assertEqual(len(added), 2)
+
+        # Re-adding a known hash is a no-op
+        added = store.add([self._signal("0x2"), self._signal("0x3")])
+        self.assertEqual([s["tx_hash"] for s in added], ["0x3"])
+        self.assertTrue(store.contains("0x1"))
+        self.assertFalse(store.contains("0x4"))
+        self.assertEqual(store.count(), 3)
+        store.close()
+
+    def test_recent_is_newest_first(self):
+        store = SignalStore(self.db_path, legacy_path=None)
+        store.add([self._signal(f"0x{i}") for i in range(5)])
+        hashes = [s["tx_hash"] for s in store.recent(limit=2)]
+        self.assertEqual(hashes, ["0x4", "0x3"])
+        hashes = [s["tx_hash"] for s in store.recent(limit=2, offset=2)]
+        self.assertEqual(hashes, ["0x2", "0x1"])
+        store.close()
+
+    def test_filtered_query_and_tail(self):
+        store = SignalStore(self.db_path, legacy_path=None)
+        store.add(
+            [
+                {**self._signal("0x1", "0xAAA"), "timestamp": "2024-01-01 10:00:00"},
+                {**self._signal("0x2", "0xbbb"), "timestamp": "2024-01-02 10:00:00"},
+                {**self._signal("0x3", "0xaaa"), "timestamp": "2024-01-03 10:00:00"},
+            ]
+        )
+
+        rows = store.query(wallet="0xaaa")
+        self.assertEqual([s["tx_hash"] for s in rows], ["0x3", "0x1"])
+        self.assertEqual(store.count(wallet="0xaaa"), 2)
+
+        rows = store.query(start="2024-01-02 00:00:00", end="2024-01-02 23:59:59")
+        self.assertEqual([s["tx_hash"] for s in rows], ["0x2"])
+        self.assertEqual(store.count(token="pepe"), 3)
+
+        # Tail: only signals stored after the last id seen
+        last_id = store.last_id()
+        store.add([self._signal("0x4")])
+        self.assertEqual([s["tx_hash"] for s in store.query(after_id=last_id)], ["0x4"])
+        store.close()
+
+    def test_imports_legacy_json_once(self):
+        # Legacy file is stored newest first
+        with open(self.legacy_path, "w") as f:
+            json.dump([self._signal("0xnew"), self._signal("0xold")], f)
+
+        store = SignalStore(self.db_path, legacy_path=self.legacy_path)
+        self.assertEqual([s["tx_hash"] for s in store.recent()], ["0xnew", "0xold"])
+        store.close()
+
+        # Reopening an existing store does not import again
+        store = SignalStore(self.db_path, legacy_path=self.legacy_path)
+        self.assertEqual(store.count(), 2)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import pandas as pd
+import trade_store
+from brain import Brain
+from scoring import LEG_COLUMNS
+
+
+@unittest.skipIf(trade_store.pa is None, "pyarrow not installed")
+class TestTradeStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = trade_store.TradeStore(os.path.join(self.tmp.name, "trades"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _legs(self, rows):
+        # rows: (wallet, token, side, day, block, tx_hash)
+        return pd.DataFrame(
+            [
+                {
+                    "wallet": wallet,
+                    "token": token,
+                    "symbol": token.upper(),
+                    "side": side,
+                    "qty": 10.0,
+                    "usd": 100.0,
+                    "time": pd.Timestamp(f"2024-01-{day:02d} 12:00", tz="UTC"),
+                    "block": block,
+                    "tx_hash": tx_hash,
+                }
+                for wallet, token, side, day, block, tx_hash in rows
+            ],
+            columns=LEG_COLUMNS,
+        )
+
+    def test_partitions_filters_and_duplicates(self):
+        first = self._legs(
+            [
+                ("0xaaa", "0xt1", "buy", 1, 1, "a1"),
+                ("0xbbb", "0xt1", "buy", 1, 1, "b1"),
+                ("0xaaa", "0xt1", "sell", 3, 3, "a2"),
+            ]
+        )
+        self.assertEqual(self.store.append(first), 3)
+        # Overlapping fetch: a2 again plus one new leg
+        self.store.append(
+            self._legs(
+                [
+                    ("0xaaa", "0xt1", "sell", 3, 3, "a2"),
+                    ("0xaaa", "0xt2", "buy", 4, 4, "a3"),
+                ]
+            )
+        )
+        self.store.append(self._legs([("0xaaa", "0xt9", "buy", 1, 1, "z")]), "base")
+
+        days = sorted(os.listdir(os.path.join(self.store.root, "chain=ethereum")))
+        self.assertEqual(
+            days, ["date=2024-01-01", "date=2024-01-03", "date=2024-01-04"]
+        )
+
+        legs = self.store.read("ethereum")
+        self.assertEqual(list(legs["tx_hash"]), ["a1", "b1", "a2", "a3"])
+        self.assertEqual(str(legs["time"].dt.tz), "UTC")
+
+        legs = self.store.read(
+            "ethereum", wallets=["0xAAA"], start="2024-01-02", end="2024-01-03 23:00"
+        )
+        self.assertEqual(list(legs["tx_hash"]), ["a2"])
+        self.assertEqual(list(self.store.read("base")["token"]), ["0xt9"])
+        self.assertTrue(self.store.read("solana").empty)
+
+        before = self.store.read("ethereum")
+        self.assertEqual(self.store.compact("ethereum"), 1)
+        pd.testing.assert_frame_equal(self.store.read("ethereum"), before)
+        files = os.listdir(
+            os.path.join(self.store.root, "chain=ethereum", "date=2024-01-03")
+        )
+        self.assertEqual(len(files), 1)
+
+    def test_new_brain_starts_from_stored_history(self):
+        today = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+        trades = [
+            {
+                "transaction": {"hash": f"tx{n}"},
+                "taker": {"address": "0xAAA"},
+                "buyCurrency": {"symbol": "T", "address": "0xt1"},
+                "sellCurrency": {"symbol": "WETH", "address": "-"},
+                "buyAmount": 10,
+                "sellAmount": 1,
+                "buyAmountInUsd": 100,
+                "block": {
+                    "height": n,
+                    "timestamp": {"time": f"{today - timedelta(days=3 - n)}"},
+                },
+            }
+            for n in (1, 2)
+        ]
+        brain = Brain(trade_store=self.store)
+        with mock.patch.object(brain, "get_trade_history", return_value=trades):
+            brain.refresh_aggregates(["0xAAA"])
+
+        # After a restart only trades past the stored blocks are fetched
+        restarted = Brain(trade_store=self.store)
+        with mock.patch.object(
+            restarted, "get_trade_history", return_value=[]
+        ) as fetch:
+            restarted.refresh_aggregates(["0xAAA"])
+        self.assertEqual(fetch.call_args.kwargs["since_blocks"], {"0xAAA": 2})
+        self.assertEqual(restarted.aggregates.wallets.loc["0xaaa", "trades"], 2)
+
+    def test_store_is_read_once_per_wallet(self):
+        brain = Brain(trade_store=self.store)
+        with mock.patch.object(brain, "get_trade_history", return_value=[]):
+            with mock.patch.object(self.store, "read", wraps=self.store.read) as read:
+                brain.refresh_aggregates(["0xAAA"])
+                brain.refresh_aggregates(["0xAAA"])
+        self.assertEqual(read.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+import requests
+from transport import RateLimiter, Transport
+
+
+def fake_response(status, headers=None):
+    response = mock.Mock()
+    response.status_code = status
+    response.headers = headers or {}
+    return response
+
+
+class TestTransport(unittest.TestCase):
+    def setUp(self):
+        self.transport = Transport(
+            timeouts={"bitquery": 7}, max_retries=2, backoff_base=0
+        )
+        self.calls = []
+        self.transport.add_hook(lambda *args: self.calls.append(args))
+
+    def test_retries_transient_status_then_succeeds(self):
+        responses = [fake_response(503), fake_response(429), fake_response(200)]
+        with mock.patch.object(
+            self.transport.session, "request", side_effect=responses
+        ) as request:
+            response = self.transport.post("http://x", endpoint="bitquery")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.call_count, 3)
+        # Per-endpoint timeout is applied
+        self.assertEqual(request.call_args.kwargs["timeout"], 7)
+        # One hook call per attempt, with status and attempt number
+        self.assertEqual(
+            [(c[3], c[5]) for c in self.calls], [(503, 0), (429, 1), (200, 2)]
+        )
+
+    def test_client_errors_are_not_retried(self):
+        with mock.patch.object(
+            self.transport.session, "request", return_value=fake_response(400)
+        ) as request:
+            response = self.transport.get("http://x")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(request.call_count, 1)
+
+    def test_connection_errors_raise_after_retries(self):
+        error = requests.ConnectionError("down")
+        with mock.patch.object(self.transport.session, "request", side_effect=error):
+            with self.assertRaises(requests.ConnectionError):
+                self.transport.get("http://x")
+
+        self.assertEqual(len(self.calls), 3)
+        self.assertIsNone(self.calls[-1][3])
+
+    def test_backoff_honours_retry_after(self):
+        response = fake_response(429, {"Retry-After": "3"})
+        self.assertEqual(self.transport._backoff(0, response), 3.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_blocks_once_the_burst_is_spent(self):
+        limiter = RateLimiter(requests_per_minute=2)
+        with mock.patch("transport.time.sleep") as sleep:
+            limiter.acquire()
+            limiter.acquire()
+            sleep.assert_not_called()
+            # The third call waits for a refill; let the clock move meanwhile
+            with mock.patch("transport.time.monotonic", side_effect=[0.0, 1e9]):
+                limiter._refilled_at = 0.0
+                limiter.acquire()
+            self.assertAlmostEqual(sleep.call_args.args[0], 30.0, places=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+Columnar on-disk history of every trade Brain fetches.
+
+Trades are stored as flat token legs (scoring.LEG_COLUMNS: wallet, token,
+symbol, side, qty, usd, time, block, tx_hash) in uncompressed Arrow IPC
+files, partitioned by chain and UTC day:
+
+    trade_history/chain=ethereum/date=2024-01-01/part-<ns>.arrow
+
+Files are append-only and read through memory maps, so scans are
+zero-copy until the final conversion to pandas. Legs fetched twice are
+dropped at read time. Every append adds a file per day, so compact()
+(run after each discovery pass) merges each day back into one; a read
+that races it lists the files again. Requires pyarrow; without it
+get_trade_store() returns None and nothing is recorded.
+"""
+
+import glob
+import os
+import threading
+import time
+import pandas as pd
+import config
+from scoring import LEG_COLUMNS, LEG_DTYPES
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional dependency
+    pa = None
+
+# A leg is one side of one swap
+LEG_KEY = ["tx_hash", "token", "side"]
+
+
+class TradeStore:
+    def __init__(self, root="trade_history"):
+        if pa is None:
+            raise RuntimeError("TradeStore needs pyarrow (pip install pyarrow)")
+        self.root = root
+        self._lock = threading.Lock()
+        self._schema = pa.schema(
+            [
+                ("wallet", pa.string()),
+                ("token", pa.string()),
+                ("symbol", pa.string()),
+                ("side", pa.string()),
+                ("qty", pa.float64()),
+                ("usd", pa.float64()),
+                ("time", pa.timestamp("ns", tz="UTC")),
+                ("block", pa.int64()),
+                ("tx_hash", pa.string()),
+            ]
+        )
+
+    def append(self, legs, chain=None):
+        """
+        Writes legs (a trades_to_legs frame) as one new file per UTC day.
+        Returns the number of rows written.
+        """
+        chain = chain or config.TARGET_CHAIN
+        legs = legs.dropna(subset=["time"])
+        if legs.empty:
+            return 0
+
+        days = legs["time"].dt.strftime("%Y-%m-%d")
+        with self._lock:
+            for day, part in legs.groupby(days):
+                directory = self._partition(chain, day)
+                os.makedirs(directory, exist_ok=True)
+                table = pa.Table.from_pandas(
+                    part[LEG_COLUMNS], schema=self._schema, preserve_index=False
+                )
+                self._write(directory, table)
+        return len(legs)
+
+    def read(
+        self, chain=None, wallets=None, tokens=None, start=None, end=None, columns=None
+    ):
+        """
+        Returns stored legs as a DataFrame in LEG_DTYPES, oldest first.
+        Day partitions outside [start, end] are not opened; the wallet,
+        token and time filters run on the Arrow tables before conversion.
+        """
+        chain = chain or config.TARGET_CHAIN
+        start, end = _utc(start), _utc(end)
+
+        for attempt in range(3):
+            try:
+                tables = [
+                    self._read_file(path) for path in self._files(chain, start, end)
+                ]
+                break
+            except FileNotFoundError:
+                # compact() replaced a day's files after they were listed
+                if attempt == 2:
+                    raise
+        if not tables:
+            return pd.DataFrame({c: pd.Series(dtype=t) for c, t in LEG_DTYPES.items()})
+        table = pa.concat_tables(tables)
+
+        mask = None
+        for column, values in (("wallet", wallets), ("token", tokens)):
+            if values is not None:
+                lowered = pa.array([v.lower() for v in values], pa.string())
+                mask = _and(mask, pc.is_in(table[column], value_set=lowered))
+        if start is not None:
+            mask = _and(mask, pc.greater_equal(table["time"], pa.scalar(start)))
+        if end is not None:
+            mask = _and(mask, pc.less_equal(table["time"], pa.scalar(end)))
+        if mask is not None:
+            table = table.filter(mask)
+
+        legs = table.to_pandas()
+        legs = legs.drop_duplicates(LEG_KEY).sort_values(
+            ["time", "block"], kind="stable"
+        )
+        legs = legs.reset_index(drop=True)
+        return legs[columns] if columns else legs
+
+    def compact(self, chain=None):
+        """
+        Rewrites each day partition with more than one file as a single
+        deduplicated file. Returns the number of partitions compacted.
+        """
+        chain = chain or config.TARGET_CHAIN
+        compacted = 0
+        with self._lock:
+            for directory in sorted(glob.glob(self._partition(chain, "*"))):
+                files = sorted(glob.glob(os.path.join(directory, "*.arrow")))
+                if len(files) < 2:
+                    continue
+                legs = pa.concat_tables([self._read_file(f) for f in files])
+                legs = legs.to_pandas().drop_duplicates(LEG_KEY)
+                table = pa.Table.from_pandas(
+                    legs[LEG_COLUMNS], schema=self._schema, preserve_index=False
+                )
+                self._write(directory, table)
+                for path in files:
+                    os.remove(path)
+                compacted += 1
+        return compacted
+
+    def _partition(self, chain, day):
+        return os.path.join(self.root, f"chain={chain}", f"date={day}")
+
+    def _files(self, chain, start, end):
+        first = start.strftime("%Y-%m-%d") if start is not None else None
+        last = end.strftime("%Y-%m-%d") if end is not None else None
+        for directory in sorted(glob.glob(self._partition(chain, "*"))):
+            day = directory.rsplit("date=", 1)[1]
+            if (first and day < first) or (last and day > last):
+                continue
+            yield from sorted(glob.glob(os.path.join(directory, "*.arrow")))
+
+    def _read_file(self, path):
+        # Buffers point into the memory map; nothing is copied here
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write(self, directory, table):
+        # Write to a temp name first so readers never see a partial file
+        name = f"part-{time.time_ns()}-{os.getpid()}"
+        tmp = os.path.join(directory, f".{name}.tmp")
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, self._schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, os.path.join(directory, f"{name}.arrow"))
+
+
+def _utc(value):
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value
+
+
+def _and(mask, condition):
+    return condition if mask is None else pc.and_(mask, condition)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_trade_store():
+    """
+    Returns the process-wide TradeStore, or None when TRADE_STORE_PATH is
+    empty or pyarrow is not installed.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None and config.TRADE_STORE_PATH:
+            if pa is None:
+                print("[TradeStore] pyarrow not installed; trade history not stored.")
+                return None
+            _shared = TradeStore(config.TRADE_STORE_PATH)
+        return _shared
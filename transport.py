@@ -0,0 +1,166 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import config
+from metrics import get_metrics
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class Transport:
+    """
+    Shared HTTP client for all API wrappers.
+
+    One pooled keep-alive Session, a timeout per endpoint, and jittered
+    exponential backoff on 429/5xx and connection errors. Hooks are called
+    after every attempt with its latency, so callers can record metrics.
+    """
+
+    def __init__(
+        self,
+        timeouts=None,
+        max_retries=3,
+        backoff_base=0.5,
+        backoff_max=30.0,
+        pool_size=20,
+    ):
+        self.timeouts = dict(timeouts or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hooks = []
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def add_hook(self, hook):
+        """
+        Registers hook(endpoint, method, url, status, elapsed, attempt, error).
+        'status' is None when the attempt failed without a response.
+        """
+        self.hooks.append(hook)
+
+    def get(self, url, endpoint="default", **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint="default", **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def request(self, method, url, endpoint="default", **kwargs):
+        """
+        Sends a request, retrying transient failures.
+        Returns the last response (which may still be a 429/5xx once retries
+        run out) or raises the last connection error.
+        """
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, 30))
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            error = None
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            elapsed = time.perf_counter() - start
+
+            status = response.status_code if response is not None else None
+            self._emit(endpoint, method, url, status, elapsed, attempt, error)
+
+            if response is not None and status not in RETRY_STATUSES:
+                return response
+
+            if attempt == self.max_retries:
+                if response is not None:
+                    return response
+                raise error
+
+            time.sleep(self._backoff(attempt, response))
+
+    def _backoff(self, attempt, response):
+        # Honour an explicit Retry-After from the server when it sends one
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def _emit(self, *args):
+        for hook in self.hooks:
+            try:
+                hook(*args)
+            except Exception as e:
+                print(f"Exception in transport hook: {e}")
+
+
+class RateLimiter:
+    """
+    Token bucket allowing 'requests_per_minute' calls, with bursts up to one
+    minute's worth. acquire() blocks until a call is allowed.
+    None means unlimited.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.requests_per_minute = requests_per_minute
+        self._lock = threading.Lock()
+        self._tokens = float(requests_per_minute or 0)
+        self._refilled_at = time.monotonic()
+
+    def acquire(self):
+        if self.requests_per_minute is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.requests_per_minute),
+                    self._tokens
+                    + (now - self._refilled_at) * self.requests_per_minute / 60,
+                )
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * 60 / self.requests_per_minute
+            time.sleep(wait)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+_limiters = {}
+
+
+def get_transport():
+    """
+    Returns the process-wide Transport, creating it from config on first use.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Transport(
+                timeouts=config.HTTP_TIMEOUTS,
+                max_retries=config.HTTP_MAX_RETRIES,
+                backoff_base=config.HTTP_BACKOFF_BASE,
+                pool_size=config.HTTP_POOL_SIZE,
+            )
+            _shared.add_hook(get_metrics().request_hook)
+        return _shared
+
+
+def get_rate_limiter(name, requests_per_minute):
+    """
+    Returns the process-wide RateLimiter called 'name' (e.g. one per API and
+    chain), creating it on first use.
+    """
+    with _shared_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(requests_per_minute)
+        return _limiters[name]